@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "field.instrumentation.InstrumentationMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -140,6 +141,82 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOWED_CREDENTIALS = True
 
+# Satellite observation cache (see field/cache.py)
+FIELD_OBSERVATION_CACHE = {
+    "BACKEND": "memory",
+    "TTL": 6 * 60 * 60,
+    "MAX_ENTRIES": 1024,
+}
+
+# Load the CNN/LSTM weights at startup rather than on first use
+MODEL_WARMUP = False
+
+# Threads used by the async field views to run Earth Engine sub-queries
+FIELD_EE_MAX_WORKERS = 16
+
+# Write pest photos to MEDIA_ROOT in the background, after prediction
+PEST_ASYNC_SAVE = True
+
+# In-process STRtree over field polygons (see field/spatial.py)
+FIELD_SPATIAL_INDEX = {
+    "REBUILD_FRACTION": 0.1,
+    "MAX_AGE": 5 * 60,
+}
+
+# Refuse SavePolygon when the polygon overlaps another user's field;
+# otherwise the overlap count is only reported
+FIELD_REJECT_OVERLAPS = False
+
+# Sentinel-2 cloud handling, applied server-side before any reduction:
+# scenes above MAX_SCENE_CLOUD_PCT (CLOUDY_PIXEL_PERCENTAGE) are skipped,
+# cloudy pixels are masked with the "SCL" or "QA60" band (None disables
+# masking), and scenes with more than MAX_FIELD_CLOUD_FRACTION of the field
+# under cloud are left out of the time series
+S2_CLOUD_FILTER = {
+    "MAX_SCENE_CLOUD_PCT": 60,
+    "MASK": "SCL",
+    "MAX_FIELD_CLOUD_FRACTION": 0.7,
+}
+
+# Sentinel-2 scenes from the last S2_INGEST_MARGIN_DAYS days are re-fetched
+# on later refreshes, since scenes are often ingested days after acquisition
+S2_INGEST_MARGIN_DAYS = 5
+
+# Local tile store for index rasters (field/rasters.py): when enabled, the
+# Sentinel-2 index sections are reduced locally from per-tile rasters
+# instead of one Earth Engine reduceRegion per field
+FIELD_RASTER_STORE = {
+    "ENABLED": False,
+    "ROOT": BASE_DIR / "rasters",
+    "SOURCE": "earthengine",
+    "TILE_DEGREES": 0.1,
+    "PIXEL_DEGREES": 0.0001,
+}
+
+# Crop seasons as (month, day) start and end, end exclusive; a season
+# ending before it starts runs into the next year and is named by the year
+# it starts in (rabi 2024 = Nov 2024 - Mar 2025). See field/seasons.py
+CROP_SEASONS = {
+    "kharif": {"start": (6, 1), "end": (11, 1)},
+    "rabi": {"start": (11, 1), "end": (4, 1)},
+}
+
+# Longest ?start=&end= window the field endpoints accept, in days
+FIELD_MAX_WINDOW_DAYS = 366
+
+# Side of the pest heatmap tiles in degrees (field/heatmap.py); run
+# rebuild_pest_tiles after changing it
+PEST_TILE_DEGREES = 0.05
+
+# Sampled cProfile dumps for slow requests (field/instrumentation.py);
+# 0 disables profiling. Dumps go to REQUEST_PROFILE_DIR (default BASE_DIR/profiles)
+REQUEST_PROFILE_SAMPLE_RATE = 0.0
+REQUEST_PROFILE_SLOW_MS = 1000
+REQUEST_PROFILE_DIR = None
+
+# Bearer token for scraping /metrics; without it only staff sessions can read it
+METRICS_TOKEN = None
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
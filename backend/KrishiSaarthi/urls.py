@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from . import views
 from field.views import PestReport
+from field.instrumentation import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,4 +13,5 @@ urlpatterns = [
     path('login', views.Login.as_view(), name='login'),
     path('signup', views.Signup.as_view(), name='signup'),
     path('test_token', views.TestToken.as_view(), name='test_token'),
+    path('metrics', metrics_view, name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
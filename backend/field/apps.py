@@ -1,4 +1,6 @@
 from django.apps import AppConfig
+from django.conf import settings
+import threading
 import ee
 
 class FieldConfig(AppConfig):
@@ -6,7 +8,16 @@ class FieldConfig(AppConfig):
     name = 'field'
 
     def ready(self):
+        # Keeps the spatial index in step with FieldData saves/deletes, and the
+        # pest heatmap with Pest deletes
+        from . import heatmap, spatial  # noqa: F401
+
         try: 
             ee.Initialize(project="nabard-field-data")
         except Exception as e:
-            print("Earth Engine initialization failed: ", e)
\ No newline at end of file
+            print("Earth Engine initialization failed: ", e)
+
+        if getattr(settings, "MODEL_WARMUP", False):
+            # Load the ML models in the background instead of on the first request
+            from models.registry import registry
+            threading.Thread(target=registry.warm_up, name="model-warmup", daemon=True).start()
\ No newline at end of file
@@ -0,0 +1,127 @@
+# async_views.py
+"""
+Async counterparts of the field endpoints for ASGI deployments.
+
+Earth Engine sub-queries are awaited concurrently on a thread pool, so a
+request takes as long as its slowest sub-query and the event loop stays free
+to serve other requests meanwhile.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+
+from .models import FieldData
+from .serializers import FieldDataResponseSerializer, FieldWindowQuerySerializer
+from .utils import (
+    afetch_field_data, arefresh_observations, field_area, latest_ndvi,
+    stored_time_series,
+)
+
+from models.cc import calculate_carbon_metrics
+from models.awd import detect_awd_from_ndwi
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPIView(View):
+    """Token-authenticated async view returning JSON, like APIView + IsAuthenticated."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await sync_to_async(TokenAuthentication().authenticate)(Request(request))
+        except AuthenticationFailed as e:
+            return JsonResponse({"detail": str(e.detail)}, status=401)
+        if auth is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=401
+            )
+        request.user = auth[0]
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except WindowError as e:
+            return JsonResponse(e.errors, status=400)
+
+
+class WindowError(Exception):
+    """Invalid window query params; AsyncAPIView answers with 400."""
+
+    def __init__(self, errors):
+        self.errors = errors
+
+
+def _window(request):
+    """``(start, end)`` from the query string, as the sync views' _window."""
+    query = FieldWindowQuerySerializer(data=request.GET)
+    if not query.is_valid():
+        raise WindowError(query.errors)
+    return query.validated_data["start"], query.validated_data["end"]
+
+
+class AsyncFieldDataView(AsyncAPIView):
+    async def get(self, request):
+        start, end = _window(request)
+        field_data = await aget_object_or_404(FieldData, user=request.user)
+        try:
+            response_data = await afetch_field_data(field_data, start, end)
+
+            resp_serializer = FieldDataResponseSerializer(data=response_data)
+            resp_serializer.is_valid(raise_exception=True)
+
+            return JsonResponse(resp_serializer.validated_data)
+
+        except Exception as e:
+            logger.exception("Field data fetch failed for user %s", request.user.pk)
+            return JsonResponse({"error": str(e)}, status=500)
+
+
+class AsyncAWDreport(AsyncAPIView):
+    async def get(self, request):
+        start, end = _window(request)
+        field_data = await aget_object_or_404(FieldData, user=request.user)
+        await arefresh_observations(field_data, start, end)
+        ndwi_data = await sync_to_async(stored_time_series)(field_data, start, end)
+
+        # awd.py
+        report = detect_awd_from_ndwi(ndwi_series=ndwi_data)
+        return JsonResponse(report)
+
+
+class AsyncCarbonCredit(AsyncAPIView):
+    async def get(self, request):
+        field_data = await aget_object_or_404(FieldData, user=request.user)
+        # utils.py
+        area = await sync_to_async(field_area)(field_data)
+
+        # cc.py
+        result = calculate_carbon_metrics(area_hectare=area, ndwi_based_awd=True)
+        return JsonResponse(result)
+
+
+class AsyncPestPrediction(AsyncAPIView):
+    async def get(self, request):
+        field_data = await aget_object_or_404(FieldData, user=request.user)
+        data = await afetch_field_data(field_data, *_window(request))
+
+        # lstm.py, off the event loop
+        from models.lstm import predict_risk_from_values
+        result = await sync_to_async(predict_risk_from_values, thread_sensitive=False)(data)
+        return JsonResponse(result)
+
+
+class AsyncHealthScore(AsyncAPIView):
+    async def get(self, request):
+        field_data = await aget_object_or_404(FieldData, user=request.user)
+        data = await afetch_field_data(field_data, *_window(request))
+
+        # health_score.py, off the event loop
+        from models.health_score import get_health_score
+        result = await sync_to_async(get_health_score, thread_sensitive=False)(
+            image_path='../sample.jpg', ndvi_latest=latest_ndvi(data), sequence=data
+        )
+        return JsonResponse(result, safe=False)
@@ -0,0 +1,92 @@
+"""
+Multi-field index extraction for cooperatives and agronomists.
+
+Instead of one reduceRegion per field, fields are packed into a
+FeatureCollection and reduced with reduceRegions, so N fields cost
+ceil(N / chunk_size) Earth Engine round-trips rather than N.
+"""
+import ee
+
+from .utils import (
+    DEFAULT_END_DATE, DEFAULT_START_DATE, TIME_SERIES_INDICES, _clear_scenes, _cloud_settings,
+    _index_image, _index_time_series, _mask_clouds, _s2_scenes, _scene_stats_image, getinfo,
+)
+
+# Features per reduceRegions request; keeps each request under EE payload limits
+FIELD_BATCH_CHUNK_SIZE = 1000
+
+
+def _fields_collection(fields):
+    return ee.FeatureCollection(
+        [ee.Feature(ee.Geometry(polygon), {"field_id": field_id}) for field_id, polygon in fields]
+    )
+
+
+def _batch_queries(fc, start_date, end_date, time_series):
+    scenes = _s2_scenes(fc, start_date, end_date)
+
+    composite_columns = ["field_id", *TIME_SERIES_INDICES]
+    composite = _index_image(scenes.map(_mask_clouds).median()).reduceRegions(
+        collection=fc, reducer=ee.Reducer.mean(), scale=10
+    )
+    queries = {
+        "composite": composite.reduceColumns(
+            ee.Reducer.toList(len(composite_columns)), composite_columns
+        ).get("list"),
+    }
+
+    if time_series:
+        series_columns = ["field_id", "date", "cloud_fraction", *TIME_SERIES_INDICES]
+        # Without a pixel mask, cloud_fraction is a scene property rather than a band
+        scene_cloud = not _cloud_settings()["MASK"]
+
+        def per_field(img):
+            stats_image = _scene_stats_image(img)
+            features = stats_image.reduceRegions(collection=fc, reducer=ee.Reducer.mean(), scale=10)
+            return features.map(
+                lambda f: (f.set("cloud_fraction", stats_image.get("cloud_fraction")) if scene_cloud else f)
+                .set("date", img.date().format("YYYY-MM-dd"))
+            )
+
+        per_scene = _clear_scenes(scenes.map(per_field).flatten())
+        queries["series"] = per_scene.reduceColumns(
+            ee.Reducer.toList(len(series_columns)), series_columns
+        ).get("list")
+
+    return queries
+
+
+def fetch_fields_indices(fields, start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE,
+                         time_series=False, chunk_size=FIELD_BATCH_CHUNK_SIZE):
+    """
+    Mean NDVI/NDWI/EVI/SAVI for many fields at once.
+
+    ``fields`` is an iterable of ``(field_id, geojson_polygon)`` pairs. Returns
+    ``{field_id: {"NDVI": ..., "NDWI": ..., "EVI": ..., "SAVI": ...}}``, with an
+    ``index_time_series`` list per field when ``time_series`` is set. Fields
+    without usable scenes get ``None`` values.
+    """
+    fields = list(fields)
+    results = {
+        field_id: {name: None for name in TIME_SERIES_INDICES} for field_id, _ in fields
+    }
+    if time_series:
+        for entry in results.values():
+            entry["index_time_series"] = []
+
+    for offset in range(0, len(fields), chunk_size):
+        chunk = fields[offset:offset + chunk_size]
+        queries = _batch_queries(_fields_collection(chunk), start_date, end_date, time_series)
+        info = getinfo(ee.Dictionary(queries)) or {}
+
+        for field_id, *values in info.get("composite") or []:
+            results[field_id].update(zip(TIME_SERIES_INDICES, values))
+
+        if time_series:
+            rows_by_field = {}
+            for field_id, *row in info.get("series") or []:
+                rows_by_field.setdefault(field_id, []).append(row)
+            for field_id, rows in rows_by_field.items():
+                results[field_id]["index_time_series"] = _index_time_series(rows)
+
+    return results
@@ -0,0 +1,215 @@
+"""
+Offline endpoint benchmarks.
+
+Drives the field endpoints through the Django test client against a
+throwaway database, with the Earth Engine client replaced by FakeEE
+(synthetic or recorded responses, configurable latency). For each endpoint
+it reports throughput, latency percentiles, Earth Engine round-trips and
+memory, and compares them with a stored baseline. Memory is reported twice:
+the peak Python heap (tracemalloc, which does not see torch/NumPy buffers)
+and the process's peak RSS so far (which does, but never goes down, so an
+endpoint only shows up there when it raises the high-water mark).
+
+Run it with ``python manage.py benchmark`` from backend/.
+"""
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from models.registry import registry
+
+from .cache import get_observation_cache
+from .models import FieldData, FieldObservation, Pest
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_RECORDING = os.path.join(BENCHMARK_DIR, "ee_recording.json")
+
+# name -> (method, path); "pest" posts an image upload
+ENDPOINTS = {
+    "ee": ("get", "/field/ee"),
+    "awd": ("get", "/field/awd"),
+    "cc": ("get", "/field/cc"),
+    "pestpredict": ("get", "/field/pestpredict"),
+    "healthscore": ("get", "/field/healthscore"),
+    "pest": ("post", "/pest"),
+}
+
+# Relative change (or, for ee_calls_per_request, any increase) that counts as a regression
+REGRESSION_CHECKS = {
+    "p95_ms": "higher",
+    "throughput_rps": "lower",
+    "peak_python_heap_mb": "higher",
+    "max_rss_mb": "higher",
+    "ee_calls_per_request": "higher",
+}
+
+
+def _polygon(i):
+    """Small square field, shifted per user so each one is a distinct polygon."""
+    x, y = 77.20 + 0.03 * (i % 100), 28.60 + 0.03 * (i // 100)
+    return {
+        "type": "Polygon",
+        "coordinates": [[[x, y], [x + 0.02, y], [x + 0.02, y + 0.02], [x, y + 0.02], [x, y]]],
+    }
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 2)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class EndpointBenchmark:
+    """
+    ``fields`` distinct users/fields are created; request i uses field
+    i % fields, so fields >= requests measures cold (uncached) requests and
+    fields=1 measures the cached path.
+    """
+
+    def __init__(self, fake_ee, requests=50, concurrency=4, fields=None, image_path="../sample.jpg"):
+        self.fake_ee = fake_ee
+        self.requests = requests
+        self.concurrency = concurrency
+        self.fields = fields or requests
+        with open(image_path, "rb") as f:
+            self.image = f.read()
+        self.tokens = []
+
+    def setup(self):
+        User.objects.bulk_create([User(username=f"bench{i}") for i in range(self.fields)])
+        users = list(User.objects.filter(username__startswith="bench").order_by("pk"))
+        FieldData.objects.bulk_create([
+            FieldData(user=user, cropType="Rice", polygon=_polygon(i)) for i, user in enumerate(users)
+        ])
+        self.tokens = [Token.objects.create(user=user).key for user in users]
+
+    def _request(self, name, i):
+        method, path = ENDPOINTS[name]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.tokens[i % self.fields])
+        started = time.perf_counter()
+        try:
+            if method == "post":
+                # distinct bytes per request, so upload deduplication doesn't kick in
+                upload = io.BytesIO(self.image + i.to_bytes(4, "big"))
+                upload.name = f"leaf{i}.jpg"
+                response = client.post(path, {"image": upload}, format="multipart")
+            else:
+                response = client.get(path)
+            ok = response.status_code < 400
+        finally:
+            close_old_connections()
+        return time.perf_counter() - started, ok
+
+    def reset_state(self):
+        """Forget cached metrics, stored scenes and uploads so endpoints don't warm each other up."""
+        get_observation_cache().clear()
+        FieldObservation.objects.all().delete()
+        FieldData.objects.update(observations_synced_from=None, observations_synced_until=None)
+        Pest.objects.all().delete()
+
+    def run_endpoint(self, name):
+        self.reset_state()
+        self.fake_ee.reset()
+        tracemalloc.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(lambda i: self._request(name, i), range(self.requests)))
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies = sorted(seconds * 1000 for seconds, _ in results)
+        return {
+            "requests": self.requests,
+            "errors": sum(1 for _, ok in results if not ok),
+            "throughput_rps": round(self.requests / wall, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "ee_calls": self.fake_ee.getinfo_calls,
+            "ee_calls_per_request": round(self.fake_ee.getinfo_calls / self.requests, 3),
+            "ee_replayed": self.fake_ee.replayed_calls,
+            "peak_python_heap_mb": round(peak / 2**20, 2),
+            "max_rss_mb": max_rss_mb(),
+        }
+
+    def run(self, names):
+        # field.batch imports ee separately from field.utils
+        with mock.patch("field.utils.ee", self.fake_ee), mock.patch("field.batch.ee", self.fake_ee):
+            # Load the models up front so the first endpoint doesn't pay for it
+            registry.warm_up()
+            return {name: self.run_endpoint(name) for name in names}
+
+
+def environment(options):
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        **{k: options[k] for k in ("requests", "concurrency", "fields", "latency_ms", "jitter_ms")},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline`` as human-readable strings."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for metric, bad in REGRESSION_CHECKS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "ee_calls_per_request":
+                regressed = new > old
+            elif bad == "higher":
+                regressed = new > old * (1 + tolerance)
+            else:
+                regressed = new < old * (1 - tolerance)
+            if regressed:
+                regressions.append(f"{name}: {metric} {old} -> {new}")
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, env):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": env, "endpoints": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
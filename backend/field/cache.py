@@ -0,0 +1,193 @@
+"""
+Cache for satellite observations fetched from Earth Engine.
+
+Entries are keyed on (field polygon hash, dataset, date window), so every
+endpoint asking for the same field and window shares one Earth Engine fetch.
+The backend is chosen with the ``FIELD_OBSERVATION_CACHE`` setting:
+
+    FIELD_OBSERVATION_CACHE = {
+        "BACKEND": "memory",    # "memory", "django" or "database"
+        "TTL": 6 * 60 * 60,     # seconds
+        "MAX_ENTRIES": 1024,    # LRU bound ("memory" and "database")
+        "ALIAS": "default",     # Django cache alias ("django")
+    }
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import ObservationCacheEntry
+
+DEFAULTS = {
+    "BACKEND": "memory",
+    "TTL": 6 * 60 * 60,
+    "MAX_ENTRIES": 1024,
+    "ALIAS": "default",
+}
+
+
+def polygon_hash(polygon):
+    """Stable hash of a GeoJSON polygon, independent of key order."""
+    encoded = json.dumps(polygon, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def cache_key(poly_hash, dataset, start_date, end_date):
+    return f"{poly_hash}:{dataset}:{start_date}:{end_date}"
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry. Not shared between workers."""
+
+    def __init__(self, ttl, max_entries, **kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, poly_hash, dataset, start_date, end_date):
+        key = cache_key(poly_hash, dataset, start_date, end_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, poly_hash, dataset, start_date, end_date, value):
+        key = cache_key(poly_hash, dataset, start_date, end_date)
+        # Copied on the way in too, so later edits to the caller's dict don't leak in
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, poly_hash):
+        prefix = f"{poly_hash}:"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Stores entries in a configured Django cache. Size bounds and eviction are
+    left to that cache's own settings; a per-polygon key index makes
+    invalidation possible without key scans.
+    """
+
+    def __init__(self, ttl, alias="default", **kwargs):
+        self.ttl = ttl
+        self.cache = caches[alias]
+
+    def _index_key(self, poly_hash):
+        return f"field-obs-index:{poly_hash}"
+
+    def get(self, poly_hash, dataset, start_date, end_date):
+        return self.cache.get(
+            "field-obs:" + cache_key(poly_hash, dataset, start_date, end_date)
+        )
+
+    def set(self, poly_hash, dataset, start_date, end_date, value):
+        key = "field-obs:" + cache_key(poly_hash, dataset, start_date, end_date)
+        self.cache.set(key, value, self.ttl)
+        index_key = self._index_key(poly_hash)
+        keys = set(self.cache.get(index_key) or ())
+        keys.add(key)
+        self.cache.set(index_key, keys, self.ttl)
+
+    def invalidate(self, poly_hash):
+        index_key = self._index_key(poly_hash)
+        keys = self.cache.get(index_key) or ()
+        self.cache.delete_many([*keys, index_key])
+
+    def clear(self):
+        self.cache.clear()
+
+
+class DatabaseBackend:
+    """Persists entries in the ``ObservationCacheEntry`` table (SQLite by default)."""
+
+    model = ObservationCacheEntry
+
+    def __init__(self, ttl, max_entries, **kwargs):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, poly_hash, dataset, start_date, end_date):
+        now = timezone.now()
+        key = cache_key(poly_hash, dataset, start_date, end_date)
+        entry = self.model.objects.filter(key=key, expires_at__gt=now).first()
+        if entry is None:
+            return None
+        self.model.objects.filter(pk=entry.pk).update(last_used_at=now)
+        return entry.payload
+
+    def set(self, poly_hash, dataset, start_date, end_date, value):
+        now = timezone.now()
+        self.model.objects.update_or_create(
+            key=cache_key(poly_hash, dataset, start_date, end_date),
+            defaults={
+                "polygon_hash": poly_hash,
+                "dataset": dataset,
+                "start_date": start_date,
+                "end_date": end_date,
+                "payload": value,
+                "expires_at": now + timedelta(seconds=self.ttl),
+                "last_used_at": now,
+            },
+        )
+        self._evict(now)
+
+    def _evict(self, now):
+        self.model.objects.filter(expires_at__lte=now).delete()
+        stale = self.model.objects.order_by("-last_used_at", "-pk").values_list(
+            "pk", flat=True
+        )[self.max_entries:]
+        stale = list(stale)
+        if stale:
+            self.model.objects.filter(pk__in=stale).delete()
+
+    def invalidate(self, poly_hash):
+        self.model.objects.filter(polygon_hash=poly_hash).delete()
+
+    def clear(self):
+        self.model.objects.all().delete()
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "django": DjangoCacheBackend,
+    "database": DatabaseBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_observation_cache():
+    """Return the process-wide cache backend configured in settings."""
+    config = {**DEFAULTS, **getattr(settings, "FIELD_OBSERVATION_CACHE", {})}
+    backend = BACKENDS[config["BACKEND"]]
+    return backend(
+        ttl=config["TTL"],
+        max_entries=config["MAX_ENTRIES"],
+        alias=config["ALIAS"],
+    )
@@ -0,0 +1,776 @@
+"""
+In-process stand-in for the ``ee`` (Earth Engine) client module.
+
+It mirrors the slice of the client API used by ``field.utils`` and evaluates
+it locally against deterministic synthetic datasets, so the backend can be
+exercised without credentials or network access. Every ``getInfo()`` is
+counted as one round-trip, which is what the tests assert on:
+
+    fake = FakeEE()
+    with mock.patch("field.utils.ee", fake):
+        fetchEEData(user)
+    fake.getinfo_calls  # -> 1
+
+For benchmarks it can add per-round-trip latency (``latency`` +/- ``jitter``
+seconds). ``RecordingEE`` wraps either this fake or the real ``ee`` module
+and replays recorded responses, keyed by the serialized query expression:
+
+    recorder = RecordingEE(ee, recording={}, record=True)   # live service
+    ...
+    replayer = RecordingEE(FakeEE(latency=0.05), recording=recorder.recording)
+"""
+import copy
+import datetime
+import hashlib
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import zlib
+
+# Synthetic datasets: band generators and revisit cadence in days.
+DATASETS = {
+    "COPERNICUS/S2_SR_HARMONIZED": {
+        "cadence": 5,
+        "bands": {
+            "B2": (0.04, 0.02),
+            "B3": (0.07, 0.03),
+            "B4": (0.05, 0.03),
+            "B8": (0.30, 0.10),
+        },
+        "properties": {"CLOUDY_PIXEL_PERCENTAGE": (30.0, 30.0)},
+        # Per-scene quality bands: one "pixel" per image, so a scene is either
+        # clear (SCL 4 = vegetation) or cloudy (SCL 9 / QA60 bit 10)
+        "derived_bands": {
+            "SCL": lambda props: 9 if props["CLOUDY_PIXEL_PERCENTAGE"] > 40 else 4,
+            "QA60": lambda props: 1 << 10 if props["CLOUDY_PIXEL_PERCENTAGE"] > 40 else 0,
+        },
+    },
+    "UCSB-CHG/CHIRPS/DAILY": {
+        "cadence": 1,
+        "bands": {"precipitation": (6.0, 6.0)},
+    },
+    "MODIS/061/MOD11A2": {
+        "cadence": 8,
+        "bands": {"LST_Day_1km": (15150.0, 150.0)},
+    },
+    "ECMWF/ERA5_LAND/DAILY_RAW": {
+        "cadence": 1,
+        "bands": {"volumetric_soil_water_layer_1": (0.30, 0.05)},
+    },
+}
+
+STATIC_IMAGES = {
+    "ESA/WorldCover/v100/2020": {"Map": 40},
+}
+
+DEFAULT_WINDOW = ("2024-01-01", "2025-01-01")
+
+
+def _seeded(*parts):
+    """Deterministic value in [-1, 1) derived from ``parts``."""
+    key = "|".join(str(p) for p in parts).encode()
+    return (zlib.crc32(key) % 20000) / 10000.0 - 1.0
+
+
+def _geometry_factor(geometry):
+    """Per-geometry scaling so different fields get different (stable) values."""
+    if not isinstance(geometry, _Geometry):
+        return 1.0
+    return 1.0 + 0.05 * _seeded(json.dumps(geometry.geojson, sort_keys=True))
+
+
+def _scaled(value, factor):
+    return value * factor if isinstance(value, float) else value
+
+
+def _parse_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _resolve(value):
+    """Turn computed objects (possibly nested in dicts/lists) into plain values."""
+    if isinstance(value, _Computed):
+        return _resolve(value._value())
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_resolve(v) for v in value]
+    return value
+
+
+class EEException(Exception):
+    pass
+
+
+class _Computed:
+    """Base for fake server-side objects; ``getInfo`` is the only round-trip."""
+
+    def __init__(self, ee):
+        self._ee = ee
+
+    def _value(self):
+        raise NotImplementedError
+
+    def getInfo(self):
+        self._ee._round_trip()
+        return _resolve(self._value())
+
+
+class _Value(_Computed):
+    def __init__(self, ee, value):
+        super().__init__(ee)
+        self._v = value
+
+    def _value(self):
+        return self._v
+
+    def get(self, key):
+        return _Value(self._ee, (_resolve(self._v) or {}).get(key))
+
+    def format(self, fmt=None):
+        value = _resolve(self._v)
+        if isinstance(value, datetime.date):
+            return _Value(self._ee, value.isoformat())
+        return _Value(self._ee, value)
+
+
+class _List(_Value):
+    def cat(self, other):
+        return _List(self._ee, list(_resolve(self._v) or []) + list(_resolve(other) or []))
+
+
+class _Dictionary(_Value):
+    def __init__(self, ee, mapping=None):
+        super().__init__(ee, dict(mapping or {}))
+
+
+class _Number(_Value):
+    def _op(self, other, fn):
+        a, b = _resolve(self._v), _resolve(other)
+        return _Number(self._ee, None if a is None or b is None else fn(a, b))
+
+    def divide(self, other):
+        return self._op(other, lambda a, b: a / b)
+
+    def multiply(self, other):
+        return self._op(other, lambda a, b: a * b)
+
+    def subtract(self, other):
+        return self._op(other, lambda a, b: a - b)
+
+
+class _Filter:
+    OPS = {
+        "lt": lambda a, b: a < b,
+        "lte": lambda a, b: a <= b,
+        "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b,
+        "eq": lambda a, b: a == b,
+    }
+
+    def __init__(self, op, name, value):
+        self.op, self.name, self.value = op, name, value
+
+    def test(self, properties):
+        value = properties.get(self.name)
+        return value is not None and self.OPS[self.op](value, self.value)
+
+
+class _FilterFactory:
+    def __getattr__(self, op):
+        if op not in _Filter.OPS:
+            raise AttributeError(op)
+        return lambda name, value: _Filter(op, name, value)
+
+
+class _Geometry(_Computed):
+    def __init__(self, ee, geojson, *args, **kwargs):
+        super().__init__(ee)
+        if isinstance(geojson, _Geometry):
+            geojson = geojson.geojson
+        self.geojson = geojson
+
+    def _value(self):
+        return self.geojson
+
+
+class _Reducer:
+    def __init__(self, name, **params):
+        self.name = name
+        self.params = params
+
+    def apply(self, values):
+        if self.name == "count":
+            return sum(1 for v in values if v is not None)
+        values = [v for v in values if v is not None]
+        if not values:
+            return None
+        if self.name == "mean":
+            return sum(values) / len(values)
+        if self.name == "median":
+            return statistics.median(values)
+        if self.name == "mode":
+            return statistics.mode(values)
+        if self.name == "stdDev":
+            return statistics.pstdev(values)
+        if self.name == "fixedHistogram":
+            low, high, bins = self.params["min"], self.params["max"], self.params["steps"]
+            width = (high - low) / bins
+            counts = [0] * bins
+            for v in values:
+                if low <= v < high:
+                    counts[int((v - low) / width)] += 1
+            return [[low + i * width, c] for i, c in enumerate(counts)]
+        raise EEException(f"Unsupported reducer: {self.name}")
+
+    def outputs(self, values):
+        """``{output name: value}``; None names the single output of a plain reducer."""
+        return {None: self.apply(values)}
+
+    def combine(self, reducer2, outputPrefix="", sharedInputs=False):
+        return _CombinedReducer([self, reducer2])
+
+
+class _PercentileReducer(_Reducer):
+    def __init__(self, percentiles):
+        super().__init__("percentile")
+        self.percentiles = list(percentiles)
+
+    def outputs(self, values):
+        values = sorted(v for v in values if v is not None)
+        return {
+            f"p{p}": values[max(0, math.ceil(len(values) * p / 100) - 1)] if values else None
+            for p in self.percentiles
+        }
+
+
+class _CombinedReducer(_Reducer):
+    """Outputs are named after each part: ``mean``, ``stdDev``, ``p10``, ``histogram``..."""
+
+    OUTPUT_NAMES = {"fixedHistogram": "histogram"}
+
+    def __init__(self, parts):
+        super().__init__("combined")
+        self.parts = parts
+
+    def outputs(self, values):
+        merged = {}
+        for part in self.parts:
+            for name, value in part.outputs(values).items():
+                merged[name or self.OUTPUT_NAMES.get(part.name, part.name)] = value
+        return merged
+
+
+class _ReducerFactory:
+    @staticmethod
+    def mean():
+        return _Reducer("mean")
+
+    @staticmethod
+    def median():
+        return _Reducer("median")
+
+    @staticmethod
+    def mode():
+        return _Reducer("mode")
+
+    @staticmethod
+    def toList(numInputs=1):
+        return _Reducer("toList")
+
+    @staticmethod
+    def count():
+        return _Reducer("count")
+
+    @staticmethod
+    def stdDev():
+        return _Reducer("stdDev")
+
+    @staticmethod
+    def percentile(percentiles):
+        return _PercentileReducer(percentiles)
+
+    @staticmethod
+    def fixedHistogram(min, max, steps):
+        return _Reducer("fixedHistogram", min=min, max=max, steps=steps)
+
+
+class _Image(_Computed):
+    def __init__(self, ee, bands=None, properties=None):
+        super().__init__(ee)
+        if isinstance(bands, str):
+            bands = dict(STATIC_IMAGES[bands])
+        self.bands = dict(bands or {})
+        self.properties = dict(properties or {})
+
+    def _value(self):
+        return {"bands": self.bands, "properties": self.properties}
+
+    def _derive(self, bands):
+        return _Image(self._ee, bands, self.properties)
+
+    def select(self, names):
+        names = [names] if isinstance(names, str) else list(names)
+        return self._derive({n: self.bands[n] for n in names})
+
+    def rename(self, names):
+        names = [names] if isinstance(names, str) else list(names)
+        return self._derive(dict(zip(names, self.bands.values())))
+
+    def normalizedDifference(self, names):
+        a, b = (self.bands[n] for n in names)
+        return self._derive({"nd": (a - b) / (a + b) if a + b else 0.0})
+
+    def expression(self, expr, mapping):
+        scope = {k: next(iter(v.bands.values())) for k, v in mapping.items()}
+        if None in scope.values():
+            return self._derive({"constant": None})
+        return self._derive({"constant": float(eval(expr, {"__builtins__": {}}, scope))})
+
+    def _map(self, fn):
+        return self._derive({k: None if v is None else fn(v) for k, v in self.bands.items()})
+
+    def _first(self):
+        return next(iter(self.bands.values()))
+
+    def multiply(self, factor):
+        return self._map(lambda v: v * factor)
+
+    def toFloat(self):
+        return self._map(float)
+
+    def eq(self, value):
+        return self._map(lambda v: int(v == value))
+
+    def neq(self, value):
+        return self._map(lambda v: int(v != value))
+
+    def bitwiseAnd(self, value):
+        return self._map(lambda v: int(v) & value)
+
+    def Not(self):
+        return self._map(lambda v: int(not v))
+
+    def Or(self, other):
+        b = other._first()
+        return self._map(lambda v: int(bool(v) or bool(b)))
+
+    def And(self, other):
+        b = other._first()
+        return self._map(lambda v: int(bool(v) and bool(b)))
+
+    def updateMask(self, mask):
+        """Masked "pixels" become None, which reducers skip."""
+        if mask._first():
+            return self
+        return self._derive({k: None for k in self.bands})
+
+    def addBands(self, other):
+        return self._derive({**self.bands, **other.bands})
+
+    def set(self, key, value):
+        properties = dict(self.properties)
+        properties[key] = _resolve(value)
+        return _Image(self._ee, self.bands, properties)
+
+    def get(self, key):
+        return _Value(self._ee, self.properties.get(key))
+
+    def getNumber(self, key):
+        return _Number(self._ee, self.properties.get(key))
+
+    def date(self):
+        return _Value(self._ee, self.properties.get("system:time_start"))
+
+    def reduceRegion(self, reducer=None, geometry=None, scale=None, **kwargs):
+        factor = _geometry_factor(geometry)
+        return _Dictionary(
+            self._ee,
+            # integer (class/mask) bands aren't perturbed per geometry
+            {k if name is None else f"{k}_{name}": _scaled(value, factor if isinstance(v, float) else 1.0)
+             for k, v in self.bands.items()
+             for name, value in reducer.outputs([v]).items()},
+        )
+
+    def reduceRegions(self, collection=None, reducer=None, scale=None, **kwargs):
+        features = []
+        for feature in collection.features:
+            stats = self.reduceRegion(reducer, feature.geometry, scale)._value()
+            features.append(_Feature(self._ee, feature.geometry, {**feature.properties, **stats}))
+        return _FeatureCollection(self._ee, features)
+
+    @staticmethod
+    def cat(images):
+        merged = {}
+        for image in images:
+            merged.update(image.bands)
+        return _Image(images[0]._ee, merged)
+
+
+class _ImageFactory:
+    def __init__(self, ee):
+        self._ee = ee
+
+    def __call__(self, source=None):
+        return _Image(self._ee, source)
+
+    def cat(self, images):
+        return _Image.cat(images)
+
+
+class _Feature(_Computed):
+    def __init__(self, ee, geometry=None, properties=None):
+        super().__init__(ee)
+        self.geometry = geometry
+        self.properties = dict(_resolve(properties) or {})
+
+    def _value(self):
+        return {"type": "Feature", "geometry": None, "properties": self.properties}
+
+    def get(self, key):
+        return _Value(self._ee, self.properties.get(key))
+
+    def set(self, key, value):
+        properties = dict(self.properties)
+        properties[key] = _resolve(value)
+        return _Feature(self._ee, self.geometry, properties)
+
+
+class _FeatureCollection(_Computed):
+    def __init__(self, ee, features=None):
+        super().__init__(ee)
+        self.features = list(features or [])
+
+    def _value(self):
+        return {"type": "FeatureCollection", "features": self.features}
+
+    def map(self, fn):
+        return _FeatureCollection(self._ee, [fn(f) for f in self.features])
+
+    def filter(self, flt):
+        return _FeatureCollection(self._ee, [f for f in self.features if flt.test(f.properties)])
+
+    def aggregate_array(self, prop):
+        return _Value(self._ee, [f.properties.get(prop) for f in self.features
+                                 if f.properties.get(prop) is not None])
+
+    def size(self):
+        return _Value(self._ee, len(self.features))
+
+    def flatten(self):
+        return _FeatureCollection(
+            self._ee, [f for collection in self.features for f in collection.features]
+        )
+
+    def reduceColumns(self, reducer, selectors):
+        rows = [[f.properties.get(s) for s in selectors] for f in self.features]
+        # Like Earth Engine, rows with a null in any selector are skipped.
+        rows = [row for row in rows if None not in row]
+        return _Dictionary(self._ee, {"list": rows})
+
+
+class _ImageCollection(_Computed):
+    def __init__(self, ee, dataset, start=None, end=None, images=None):
+        super().__init__(ee)
+        self.dataset = dataset
+        self.start = start
+        self.end = end
+        self._images = images
+
+    def _value(self):
+        return [image._value() for image in self.images()]
+
+    def images(self):
+        if self._images is None:
+            self._images = self._ee._generate(self.dataset, self.start, self.end)
+        return self._images
+
+    def filterBounds(self, geometry):
+        return self
+
+    def filter(self, flt):
+        return self._with_images([i for i in self.images() if flt.test(i.properties)])
+
+    def filterDate(self, start, end):
+        if self._images is not None:
+            lo, hi = _parse_date(start), _parse_date(end)
+            images = [i for i in self._images
+                      if lo <= i.properties["system:time_start"] < hi]
+            return _ImageCollection(self._ee, self.dataset, start, end, images)
+        return _ImageCollection(self._ee, self.dataset, start, end)
+
+    def _reduce(self, reducer):
+        images = self.images()
+        bands = images[0].bands.keys() if images else []
+        return _Image(self._ee, {b: reducer.apply([i.bands[b] for i in images]) for b in bands})
+
+    def mean(self):
+        return self._reduce(_Reducer("mean"))
+
+    def median(self):
+        return self._reduce(_Reducer("median"))
+
+    def select(self, names):
+        return self._with_images([i.select(names) for i in self.images()])
+
+    def map(self, fn):
+        results = [fn(image) for image in self.images()]
+        if results and isinstance(results[0], (_Feature, _FeatureCollection)):
+            return _FeatureCollection(self._ee, results)
+        return self._with_images(results)
+
+    def size(self):
+        return _Value(self._ee, len(self.images()))
+
+    def _with_images(self, images):
+        return _ImageCollection(self._ee, self.dataset, self.start, self.end, images)
+
+
+class FakeEE:
+    """Drop-in replacement for the ``ee`` module with round-trip accounting."""
+
+    EEException = EEException
+
+    def __init__(self, latency=0.0, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.getinfo_calls = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self.Reducer = _ReducerFactory()
+        self.Filter = _FilterFactory()
+        self.Image = _ImageFactory(self)
+
+    def Initialize(self, *args, **kwargs):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.getinfo_calls = 0
+            self._failures = []
+
+    def fail_next(self, count=1, message="Too many concurrent aggregations."):
+        """Make the next ``count`` round-trips raise ``EEException(message)``."""
+        with self._lock:
+            self._failures.extend([message] * count)
+
+    def _round_trip(self):
+        with self._lock:
+            self.getinfo_calls += 1
+            failure = self._failures.pop(0) if self._failures else None
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if failure is not None:
+            raise EEException(failure)
+
+    def _generate(self, dataset, start, end):
+        spec = DATASETS[dataset]
+        lo = _parse_date(start or DEFAULT_WINDOW[0])
+        hi = _parse_date(end or DEFAULT_WINDOW[1])
+        images = []
+        day = lo
+        while day < hi:
+            bands = {
+                name: mean + spread * _seeded(dataset, name, day)
+                for name, (mean, spread) in spec["bands"].items()
+            }
+            properties = {
+                name: max(0.0, mean + spread * _seeded(dataset, name, day))
+                for name, (mean, spread) in spec.get("properties", {}).items()
+            }
+            for name, derive in spec.get("derived_bands", {}).items():
+                bands[name] = derive(properties)
+            properties["system:time_start"] = day
+            images.append(_Image(self, bands, properties))
+            day += datetime.timedelta(days=spec["cadence"])
+        return images
+
+    # --- module-level constructors ---
+    def Geometry(self, geojson, *args, **kwargs):
+        return _Geometry(self, geojson)
+
+    def ImageCollection(self, dataset):
+        return _ImageCollection(self, dataset)
+
+    def Feature(self, geometry=None, properties=None):
+        return _Feature(self, geometry, properties)
+
+    def FeatureCollection(self, features):
+        return _FeatureCollection(self, features)
+
+    def Dictionary(self, mapping=None):
+        return _Dictionary(self, mapping)
+
+    def List(self, value):
+        return _List(self, value)
+
+    def Number(self, value):
+        return _Number(self, value)
+
+
+# --- recorded responses ---
+class _Function:
+    """A Python callable handed to the client (``.map(fn)``), traced on its first call."""
+
+    def __init__(self, fn, session):
+        self.fn = fn
+        self.session = session
+        self.body = None
+
+    def __call__(self, *args):
+        local = self.session._local
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        try:
+            params = [_Traced(arg, ["var", depth, i], self.session) for i, arg in enumerate(args)]
+            result = self.fn(*params)
+        finally:
+            local.depth = depth
+        if self.body is None:
+            self.body = self.session._encode(result)
+        return self.session._unwrap(result)
+
+    def expression(self):
+        # Never called (e.g. mapped over an empty collection): fall back to its name
+        if self.body is None:
+            return ["fn", f"{self.fn.__module__}.{getattr(self.fn, '__qualname__', repr(self.fn))}"]
+        return ["fn", self.body]
+
+
+class _Traced:
+    """A client object (fake or live) together with the expression that built it."""
+
+    def __init__(self, target, expr, session):
+        self._target = target
+        self._expr = expr
+        self._session = session
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name == "getInfo":
+            return lambda: self._session._get_info(self)
+        if isinstance(value, type) and issubclass(value, BaseException):
+            return value
+        return _Traced(value, [self._expr, name], self._session)
+
+    def __call__(self, *args, **kwargs):
+        session = self._session
+        args = [session._wrap_functions(a) for a in args]
+        kwargs = {k: session._wrap_functions(v) for k, v in kwargs.items()}
+        result = self._target(*session._unwrap(args), **session._unwrap(kwargs))
+        # Encode after the call: a mapped function's body is only known once it has run
+        expr = [self._expr, "()", session._encode(args), session._encode(kwargs)]
+        return session._wrap(result, expr)
+
+
+class RecordingEE:
+    """
+    Drop-in ``ee`` module that records and replays ``getInfo()`` responses.
+
+    Every object built through it carries the expression that built it
+    (constructor and method calls with their arguments), and a getInfo() is
+    keyed on the sha1 of that serialized expression, so a recording made
+    against the live service replays against FakeEE. Misses go to
+    ``backend``, and with ``record=True`` their responses are added to
+    ``recording``. Replays still pay the backend's simulated latency and
+    injected failures when it has them (FakeEE).
+    """
+
+    def __init__(self, backend, recording=None, record=False):
+        self.backend = backend
+        self.recording = {} if recording is None else recording
+        self.record = record
+        self.getinfo_calls = 0
+        self.replayed_calls = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        value = getattr(self.backend, name)
+        if isinstance(value, type) and issubclass(value, BaseException):
+            return value
+        return _Traced(value, ["ee", name], self)
+
+    def reset(self):
+        with self._lock:
+            self.getinfo_calls = 0
+            self.replayed_calls = 0
+        if hasattr(self.backend, "reset"):
+            self.backend.reset()
+
+    @staticmethod
+    def fingerprint(expr):
+        body = json.dumps(expr, sort_keys=True, default=str)
+        return hashlib.sha1(body.encode()).hexdigest()
+
+    def _get_info(self, query):
+        key = self.fingerprint(query._expr)
+        with self._lock:
+            self.getinfo_calls += 1
+            recorded = self.recording.get(key)
+        if recorded is not None:
+            if hasattr(self.backend, "_round_trip"):
+                self.backend._round_trip()
+            with self._lock:
+                self.replayed_calls += 1
+            return copy.deepcopy(recorded)
+        # JSON round trip, so recorded and live responses look the same
+        value = json.loads(json.dumps(query._target.getInfo(), default=str))
+        if self.record:
+            with self._lock:
+                self.recording[key] = value
+        return value
+
+    # --- expression plumbing ---
+    def _wrap(self, value, expr):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return _Traced(value, expr, self)
+
+    def _wrap_functions(self, value):
+        if callable(value) and not isinstance(value, (_Traced, type)):
+            return _Function(value, self)
+        if isinstance(value, (list, tuple)):
+            return type(value)(self._wrap_functions(v) for v in value)
+        if isinstance(value, dict):
+            return {k: self._wrap_functions(v) for k, v in value.items()}
+        return value
+
+    def _unwrap(self, value):
+        if isinstance(value, _Traced):
+            return value._target
+        if isinstance(value, (list, tuple)):
+            return type(value)(self._unwrap(v) for v in value)
+        if isinstance(value, dict):
+            return {k: self._unwrap(v) for k, v in value.items()}
+        return value
+
+    def _encode(self, value):
+        if isinstance(value, _Traced):
+            return value._expr
+        if isinstance(value, _Function):
+            return value.expression()
+        if isinstance(value, (list, tuple)):
+            return [self._encode(v) for v in value]
+        if isinstance(value, dict):
+            return {str(k): self._encode(v) for k, v in value.items()}
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def load_recording(path):
+        with open(path) as f:
+            return json.load(f)
+
+    def save_recording(self, path):
+        with self._lock:
+            recording = dict(self.recording)
+        with open(path, "w") as f:
+            json.dump(recording, f, sort_keys=True)
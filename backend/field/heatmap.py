@@ -0,0 +1,218 @@
+"""
+Pest outbreak heatmap.
+
+Every Pest report is tagged at upload with the centroid of the reporter's
+field and the CNN verdict, and counted into PestTileCount: one row per
+fixed-degree tile per day, incremented in place and decremented when the
+report is deleted. An outbreak map for a region and date range is then a
+lookup on the (day, tile) index rather than a join of every report against
+its field polygon plus re-inference.
+
+A user re-uploading a photo they already reported (same image hash) is one
+report, not several: only the first copy is counted (``Pest.counted``), and
+if it is deleted the next remaining copy is counted in its place.
+
+Tiles are PEST_TILE_DEGREES on a side (0.05 degrees, ~5 km, by default).
+After changing it, recount with ``python manage.py rebuild_pest_tiles``.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import FieldData, Pest, PestTileCount
+from .spatial import polygon_geometry
+
+DEFAULT_TILE_DEGREES = 0.05
+
+# Largest region (in tiles) one outbreak_map call may cover
+MAX_MAP_TILES = 250_000
+
+
+def tile_degrees():
+    return getattr(settings, "PEST_TILE_DEGREES", DEFAULT_TILE_DEGREES)
+
+
+def tile_for(lon, lat, size=None):
+    """``(tile_x, tile_y)`` of the tile containing a point."""
+    size = size or tile_degrees()
+    return math.floor(lon / size), math.floor(lat / size)
+
+
+def tile_bounds(tile_x, tile_y, size=None):
+    size = size or tile_degrees()
+    return [round(tile_x * size, 6), round(tile_y * size, 6),
+            round((tile_x + 1) * size, 6), round((tile_y + 1) * size, 6)]
+
+
+def field_centroid(polygon):
+    centroid = polygon_geometry(polygon).centroid
+    return centroid.x, centroid.y
+
+
+def is_infested(result):
+    """CNN verdict from a stored result (cnn.py's "class"), or None without one."""
+    if not result or "class" not in result:
+        return None
+    return result["class"] == "Infested"
+
+
+def tag_report(user_id, result):
+    """Pest fields locating a new report at its reporter's field, plus its verdict."""
+    field = FieldData.objects.filter(user_id=user_id).only("pk", "polygon").first()
+    tags = {"field": field, "lon": None, "lat": None, "infested": is_infested(result)}
+    if field is not None:
+        tags["lon"], tags["lat"] = field_centroid(field.polygon)
+    return tags
+
+
+def _report_day(uploaded_at):
+    return timezone.localdate(uploaded_at) if timezone.is_aware(uploaded_at) else uploaded_at.date()
+
+
+def _add_to_tile(pest, step):
+    tile_x, tile_y = tile_for(pest.lon, pest.lat)
+    day = _report_day(pest.uploaded_at)
+    if step > 0:
+        PestTileCount.objects.get_or_create(day=day, tile_x=tile_x, tile_y=tile_y)
+    tiles = PestTileCount.objects.filter(day=day, tile_x=tile_x, tile_y=tile_y)
+    # F() so concurrent uploads to the same tile don't lose counts
+    tiles.update(reports=F("reports") + step, infested=F("infested") + step * int(bool(pest.infested)))
+    if step < 0:
+        tiles.filter(reports=0).delete()
+
+
+def count_report(pest):
+    """
+    Add a tagged report to its tile's count for the day. Untagged reports and
+    re-uploads of a photo the same user already has counted are skipped.
+    """
+    if pest.lon is None or pest.lat is None:
+        return
+    copies = Pest.objects.filter(user_id=pest.user_id, image_hash=pest.image_hash, counted=True)
+    if pest.image_hash and copies.exclude(pk=pest.pk).exists():
+        return
+    with transaction.atomic():
+        _add_to_tile(pest, 1)
+        Pest.objects.filter(pk=pest.pk).update(counted=True)
+    pest.counted = True
+
+
+def uncount_report(pest):
+    """Take a counted report off its tile, counting the user's next copy of the photo instead."""
+    with transaction.atomic():
+        _add_to_tile(pest, -1)
+        if pest.image_hash:
+            replacement = (
+                Pest.objects.filter(user_id=pest.user_id, image_hash=pest.image_hash, counted=False)
+                .exclude(lon=None).exclude(lat=None).exclude(pk=pest.pk)
+                .order_by("pk").first()
+            )
+            if replacement is not None:
+                count_report(replacement)
+
+
+# Sent per row for queryset deletes and user cascades too
+@receiver(post_delete, sender=Pest)
+def _uncount_deleted_report(sender, instance, **kwargs):
+    if instance.counted:
+        uncount_report(instance)
+
+
+def aggregate_tiles(reports, size):
+    """``{(day, tile_x, tile_y): [reports, infested]}`` from ``(uploaded_at, lon, lat, infested)`` rows."""
+    counts = {}
+    for uploaded_at, lon, lat, infested in reports:
+        key = (_report_day(uploaded_at), *tile_for(lon, lat, size))
+        entry = counts.setdefault(key, [0, 0])
+        entry[0] += 1
+        entry[1] += int(bool(infested))
+    return counts
+
+
+def counted_reports(rows):
+    """
+    Split ``(pk, user_id, image_hash, uploaded_at, lon, lat, infested)`` rows,
+    in upload order, into the pks that count_report would count and their
+    ``(uploaded_at, lon, lat, infested)`` rows.
+    """
+    pks, reports, seen = [], [], set()
+    for pk, user_id, image_hash, uploaded_at, lon, lat, infested in rows:
+        if lon is None or lat is None or (image_hash and (user_id, image_hash) in seen):
+            continue
+        if image_hash:
+            seen.add((user_id, image_hash))
+        pks.append(pk)
+        reports.append((uploaded_at, lon, lat, infested))
+    return pks, reports
+
+
+def rebuild_tile_counts(retag=False):
+    """
+    Recount every tile from the tagged Pest rows. With ``retag``, reports
+    without a location are first tagged from their user's current field.
+    Returns the number of tile-days written.
+    """
+    with transaction.atomic():
+        if retag:
+            for pest in Pest.objects.filter(lon=None).iterator():
+                for name, value in tag_report(pest.user_id, pest.result).items():
+                    setattr(pest, name, value)
+                pest.save(update_fields=["field", "lon", "lat", "infested"])
+
+        pks, reports = counted_reports(Pest.objects.order_by("pk").values_list(
+            "pk", "user_id", "image_hash", "uploaded_at", "lon", "lat", "infested"
+        ).iterator())
+        Pest.objects.update(counted=False)
+        for i in range(0, len(pks), 1000):
+            Pest.objects.filter(pk__in=pks[i:i + 1000]).update(counted=True)
+
+        counts = aggregate_tiles(reports, tile_degrees())
+        PestTileCount.objects.all().delete()
+        PestTileCount.objects.bulk_create(
+            [
+                PestTileCount(day=day, tile_x=x, tile_y=y, reports=total, infested=infested)
+                for (day, x, y), (total, infested) in counts.items()
+            ],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+def outbreak_map(min_lon, min_lat, max_lon, max_lat, start_date, end_date):
+    """
+    Report counts per tile over ``[start_date, end_date)`` for tiles
+    touching the box, busiest first.
+    """
+    size = tile_degrees()
+    x0, y0 = tile_for(min_lon, min_lat, size)
+    x1, y1 = tile_for(max_lon, max_lat, size)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_MAP_TILES:
+        raise ValueError(f"Region covers more than {MAX_MAP_TILES} tiles of {size} degrees")
+
+    rows = (
+        PestTileCount.objects.filter(
+            day__gte=start_date, day__lt=end_date,
+            tile_x__range=(x0, x1), tile_y__range=(y0, y1),
+        )
+        .values("tile_x", "tile_y")
+        .annotate(reports=Sum("reports"), infested=Sum("infested"))
+        .order_by("-infested", "-reports", "tile_y", "tile_x")
+    )
+    return {
+        "tile_degrees": size,
+        "cells": [
+            {
+                "tile": [row["tile_x"], row["tile_y"]],
+                "bounds": tile_bounds(row["tile_x"], row["tile_y"], size),
+                "reports": row["reports"],
+                "infested": row["infested"],
+                "infested_fraction": round(row["infested"] / row["reports"], 4) if row["reports"] else None,
+            }
+            for row in rows
+        ],
+    }
@@ -0,0 +1,250 @@
+"""
+Request latency instrumentation.
+
+``span(name)`` times a stage of the current request and ``count(name)``
+bumps a counter (e.g. Earth Engine round-trips). InstrumentationMiddleware
+reports the stages of each request in a Server-Timing header, and
+``metrics_view`` serves process-wide totals in Prometheus text format to
+staff and to scrapers holding METRICS_TOKEN.
+Slow requests can be profiled with cProfile on a sampled basis (see the
+REQUEST_PROFILE_* settings).
+
+Spans outside a request (management commands, worker threads) only feed
+the process-wide metrics.
+"""
+import cProfile
+import contextvars
+import hmac
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Histogram buckets in seconds, for both request and stage durations
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_request = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+class Metrics:
+    """Process-wide request/stage histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}   # (view, method, status) -> Histogram
+        self.stages = {}     # stage -> Histogram
+        self.counters = {}   # name -> int
+
+    def observe_request(self, view, method, status, seconds):
+        with self._lock:
+            self.requests.setdefault((view, method, str(status)), Histogram()).observe(seconds)
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            self.stages.setdefault(stage, Histogram()).observe(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.stages.clear()
+            self.counters.clear()
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            lines = []
+            _render_histogram(
+                lines, "krishisaarthi_request_duration_seconds", "Request latency by view.",
+                {(("view", v), ("method", m), ("status", s)): h for (v, m, s), h in self.requests.items()},
+            )
+            _render_histogram(
+                lines, "krishisaarthi_stage_duration_seconds", "Time spent per stage (span).",
+                {(("stage", stage),): h for stage, h in self.stages.items()},
+            )
+            for name, value in sorted(self.counters.items()):
+                metric = f"krishisaarthi_{name.replace('.', '_')}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            return "\n".join(lines) + "\n"
+
+
+def _labels(pairs, **extra):
+    pairs = [*pairs, *extra.items()]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _render_histogram(lines, metric, help_text, series):
+    lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+    for labels, hist in sorted(series.items()):
+        for bound, count in zip(BUCKETS, hist.buckets):
+            lines.append(f"{metric}_bucket{_labels(labels, le=bound)} {count}")
+        lines.append(f"{metric}_bucket{_labels(labels, le='+Inf')} {hist.count}")
+        lines.append(f"{metric}_sum{_labels(labels)} {hist.sum:.6f}")
+        lines.append(f"{metric}_count{_labels(labels)} {hist.count}")
+
+
+metrics = Metrics()
+
+
+class RequestTimings:
+    """Stage durations and counters for one request; shared by its worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}     # stage -> seconds, summed over repeated spans
+        self.counters = {}
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def server_timing(self, total_seconds):
+        entries = [f"{_token(stage)};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        entries += [f'{_token(name)};desc="{value}"' for name, value in self.counters.items()]
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def _token(name):
+    return name.replace(".", "-").replace(" ", "_")
+
+
+@contextmanager
+def span(name):
+    """Time a stage; recorded on the current request (if any) and process-wide."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe_stage(name, elapsed)
+        timings = _request.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def count(name, amount=1):
+    """Bump a counter, e.g. ``count("ee_calls")`` per Earth Engine round-trip."""
+    metrics.increment(name, amount)
+    timings = _request.get()
+    if timings is not None:
+        timings.increment(name, amount)
+
+
+# --- Middleware ---
+
+_profile_lock = threading.Lock()
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return (match.view_name or match.url_name) if match else "unmatched"
+
+
+def _profile_path(request):
+    directory = getattr(settings, "REQUEST_PROFILE_DIR", None) or os.path.join(settings.BASE_DIR, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    slug = request.path.strip("/").replace("/", "_") or "root"
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{os.getpid()}.prof")
+
+
+class InstrumentationMiddleware:
+    """
+    Times every request, adds a Server-Timing header with its spans, and
+    feeds the /metrics histograms. With REQUEST_PROFILE_SAMPLE_RATE > 0, that
+    fraction of sync requests runs under cProfile and is dumped to
+    REQUEST_PROFILE_DIR when slower than REQUEST_PROFILE_SLOW_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = _request.set(timings)
+        started = time.perf_counter()
+        profiler = None
+        # cProfile allows one active profiler per process, so sampled
+        # requests that overlap another profiled one just run unprofiled
+        if (random.random() < getattr(settings, "REQUEST_PROFILE_SAMPLE_RATE", 0.0)
+                and _profile_lock.acquire(blocking=False)):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+            _request.reset(token)
+        elapsed = time.perf_counter() - started
+
+        if profiler is not None and elapsed * 1000 >= getattr(settings, "REQUEST_PROFILE_SLOW_MS", 1000):
+            profiler.dump_stats(_profile_path(request))
+        return self._finish(request, response, timings, elapsed)
+
+    async def __acall__(self, request):
+        # cProfile can't attribute time to one request on a shared event loop,
+        # so async requests are timed but never profiled
+        timings = RequestTimings()
+        token = _request.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, elapsed):
+        metrics.observe_request(_view_name(request), request.method, response.status_code, elapsed)
+        response["Server-Timing"] = timings.server_timing(elapsed)
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, for staff sessions or an
+    ``Authorization: Bearer <METRICS_TOKEN>`` header (Prometheus' bearer_token).
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    bearer = request.headers.get("Authorization", "")
+    allowed = request.user.is_staff or (
+        bool(token) and hmac.compare_digest(bearer.encode(), f"Bearer {token}".encode())
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
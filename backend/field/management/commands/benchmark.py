@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from field.benchmark import (
+    DEFAULT_BASELINE, DEFAULT_RECORDING, ENDPOINTS, EndpointBenchmark, compare, environment,
+    load_baseline, save_baseline,
+)
+from field.fake_ee import FakeEE, RecordingEE
+from field.utils import _upload_executor
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the field endpoints offline: throughput, p50/p95/p99, Earth Engine "
+        "round-trips and peak Python heap/RSS per endpoint, compared with a stored baseline. "
+        "Runs against a throwaway database with a fake Earth Engine client."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+        parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients.")
+        parser.add_argument("--fields", type=int, default=None,
+                            help="Distinct users/fields (default: one per request, i.e. uncached).")
+        parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake Earth Engine round-trip latency.")
+        parser.add_argument("--jitter-ms", type=float, default=10.0, help="Uniform +/- jitter on that latency.")
+        parser.add_argument("--recording", default=DEFAULT_RECORDING,
+                            help="Recorded Earth Engine responses to replay (JSON).")
+        parser.add_argument("--record", action="store_true",
+                            help="Add responses missing from --recording and save it.")
+        parser.add_argument("--live-ee", action="store_true",
+                            help="With --record, answer misses from the real Earth Engine service "
+                                 "instead of the fake (needs credentials).")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare with.")
+        parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Relative slack before a latency/throughput/memory change is a regression.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        options["fields"] = options["fields"] or options["requests"]
+        if options["live_ee"] and not options["record"]:
+            raise CommandError("--live-ee only makes sense with --record.")
+        recording = {}
+        if os.path.exists(options["recording"]):
+            recording = RecordingEE.load_recording(options["recording"])
+        if options["live_ee"]:
+            # initialised by FieldConfig.ready
+            import ee
+            backend = ee
+        else:
+            backend = FakeEE(latency=options["latency_ms"] / 1000, jitter=options["jitter_ms"] / 1000)
+        fake_ee = RecordingEE(backend, recording=recording, record=options["record"])
+
+        with tempfile.TemporaryDirectory() as workdir:
+            results = self.run_isolated(fake_ee, options, workdir)
+
+        if options["record"]:
+            os.makedirs(os.path.dirname(os.path.abspath(options["recording"])), exist_ok=True)
+            fake_ee.save_recording(options["recording"])
+            self.stdout.write(f"Saved {len(fake_ee.recording)} recorded responses to {options['recording']}")
+
+        self.report(results)
+        env = environment(options)
+        baseline = load_baseline(options["baseline"])
+        if options["save_baseline"]:
+            save_baseline(options["baseline"], results, env)
+            self.stdout.write(f"Baseline written to {options['baseline']}")
+        elif baseline is not None:
+            if baseline.get("environment") != env:
+                self.stdout.write(self.style.WARNING("Baseline was recorded with different settings/hardware."))
+            regressions = compare(results, baseline, options["tolerance"])
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
+            elif options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+
+    def run_isolated(self, fake_ee, options, workdir):
+        """Run in a temporary database and media root, like the test runner."""
+        setup_test_environment()
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(workdir, "bench.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(MEDIA_ROOT=os.path.join(workdir, "media")):
+                bench = EndpointBenchmark(
+                    fake_ee, requests=options["requests"], concurrency=options["concurrency"],
+                    fields=options["fields"],
+                )
+                bench.setup()
+                results = bench.run(options["endpoints"])
+                # let background pest-upload writes finish before the database goes away
+                _upload_executor().submit(lambda: None).result()
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, results):
+        header = f"{'endpoint':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ee/req':>7} {'heap MB':>8} {'RSS MB':>8} {'errors':>6}"
+        self.stdout.write(header)
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<12} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                f"{r['p99_ms']:>8.1f} {r['ee_calls_per_request']:>7.2f} {r['peak_python_heap_mb']:>8.1f} {r['max_rss_mb'] or 0:>8.1f} {r['errors']:>6}"
+            )
@@ -0,0 +1,21 @@
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from field.rasters import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve many fields from one synthetic raster tile and report fetch and "
+        "per-field serve times. Writes only to a temporary directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fields", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root:
+            results = benchmark(root, n_fields=options["fields"])
+        for name, value in results.items():
+            self.stdout.write(f"{name:<24} {value}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from field.spatial import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the field spatial index (build, bbox and nearest queries) on synthetic "
+        "polygons against linear scans. Touches no database rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fields", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+
+    def handle(self, *args, **options):
+        results = benchmark(n_fields=options["fields"], n_queries=options["queries"])
+        for name, value in results.items():
+            self.stdout.write(f"{name:<24} {value}")
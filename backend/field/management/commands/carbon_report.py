@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from field.models import FieldData, FieldObservation
+from field.utils import DEFAULT_END_DATE, DEFAULT_START_DATE, calculate_areas_in_hectares
+from models.awd import detect_awd_batch, ndwi_matrix
+from models.cc import awd_compliance_fraction, write_carbon_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a carbon-credit report for every field as CSV or Parquet. AWD "
+        "compliance comes from the stored NDWI observations (run refresh_fields first)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Output file path.")
+        parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+        parser.add_argument("--start", default=DEFAULT_START_DATE, help="Window start (YYYY-MM-DD).")
+        parser.add_argument("--end", default=DEFAULT_END_DATE, help="Window end, exclusive (YYYY-MM-DD).")
+        parser.add_argument("--crop-days", type=int, default=100, help="Season length in days.")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Fields per write.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        fields = list(FieldData.objects.order_by("pk"))
+
+        # Stored at SavePolygon time; older rows are computed in bulk
+        areas = np.array([field.area_hectares for field in fields], dtype=float)
+        missing = np.flatnonzero(np.isnan(areas))
+        if len(missing):
+            areas[missing] = calculate_areas_in_hectares(
+                [fields[i].polygon["coordinates"][0] for i in missing]
+            )
+        # One query for every field's NDWI series, oldest first
+        series = {field.pk: [] for field in fields}
+        observations = FieldObservation.objects.filter(
+            field_id__in=list(series), date__gte=options["start"], date__lt=options["end"]
+        ).order_by("field_id", "date").values_list("field_id", "ndwi")
+        for field_id, value in observations.iterator():
+            series[field_id].append({"NDWI": value})
+        ndwi = ndwi_matrix(list(series.values()))
+        awd = detect_awd_batch(ndwi)
+        compliance = awd_compliance_fraction(awd["awd_detected"], awd["cycles_count"], awd["dry_fraction"])
+
+        rows = write_carbon_report(
+            options["output"], [field.pk for field in fields], areas, compliance,
+            fmt=options["format"], chunk_size=options["chunk_size"], crop_days=options["crop_days"],
+        )
+        self.stdout.write(
+            f"Wrote {rows} fields to {options['output']} in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from field.heatmap import rebuild_tile_counts, tile_degrees
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the pest heatmap tiles from the stored reports, e.g. after "
+        "changing PEST_TILE_DEGREES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retag", action="store_true",
+                            help="First locate reports that have no coordinates from their user's field.")
+
+    def handle(self, *args, **options):
+        written = rebuild_tile_counts(retag=options["retag"])
+        self.stdout.write(f"Wrote {written} tile-days at {tile_degrees()} degrees")
@@ -0,0 +1,91 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from field.cache import MemoryBackend, get_observation_cache
+from field.models import FieldData
+from field.utils import (
+    DEFAULT_END_DATE, DEFAULT_START_DATE, is_quota_error, request_field_data,
+    save_field_data,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-warm satellite metrics for every field so the field endpoints can "
+        "serve them from the observation cache. Needs a shared cache backend "
+        "(\"database\" or \"django\"): an in-memory cache dies with this process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", default=DEFAULT_START_DATE, help="Window start (YYYY-MM-DD).")
+        parser.add_argument("--end", default=DEFAULT_END_DATE, help="Window end, exclusive (YYYY-MM-DD).")
+        parser.add_argument("--concurrency", type=int, default=4,
+                            help="Maximum Earth Engine requests in flight.")
+        parser.add_argument("--retries", type=int, default=5,
+                            help="Retries per field on quota errors.")
+        parser.add_argument("--backoff", type=float, default=2.0,
+                            help="Base delay in seconds, doubled on every retry.")
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Repeat every N seconds; 0 runs once.")
+        parser.add_argument("--allow-memory-cache", action="store_true",
+                            help="Run even with the in-memory cache backend; only the "
+                                 "stored observations outlive the command.")
+
+    def handle(self, *args, **options):
+        if isinstance(get_observation_cache(), MemoryBackend) and not options["allow_memory_cache"]:
+            raise CommandError(
+                "FIELD_OBSERVATION_CACHE uses the in-memory backend, so the web server "
+                "would never see what this command caches. Set BACKEND to \"database\" "
+                "or \"django\", or pass --allow-memory-cache."
+            )
+        while True:
+            self.refresh_all(options)
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def refresh_all(self, options):
+        fields = list(FieldData.objects.all())
+        total = len(fields)
+        started = time.perf_counter()
+        done = failed = 0
+
+        # Earth Engine calls run in the pool; database writes stay on this thread.
+        with ThreadPoolExecutor(max_workers=max(1, options["concurrency"])) as pool:
+            futures = {
+                pool.submit(self.fetch_with_retry, field, options): field
+                for field in fields
+            }
+            for future in as_completed(futures):
+                field = futures[future]
+                done += 1
+                try:
+                    results, windows, elapsed = future.result()
+                    save_field_data(field, options["start"], options["end"], results, windows)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"[{done}/{total}] field {field.pk} failed: {e}")
+                    continue
+                self.stdout.write(f"[{done}/{total}] field {field.pk} refreshed in {elapsed:.2f}s")
+
+        duration = time.perf_counter() - started
+        rate = total / duration if duration else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {total - failed}/{total} fields ({failed} failed) "
+            f"in {duration:.1f}s, {rate:.2f} fields/s"
+        ))
+
+    def fetch_with_retry(self, field, options):
+        started = time.perf_counter()
+        for attempt in range(options["retries"] + 1):
+            try:
+                results, windows = request_field_data(field, options["start"], options["end"])
+                return results, windows, time.perf_counter() - started
+            except Exception as e:
+                if attempt == options["retries"] or not is_quota_error(e):
+                    raise
+                delay = options["backoff"] * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay / 2))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from models.registry import registry
+
+
+class Command(BaseCommand):
+    help = "Load the ML models and report load time and resident memory per model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help=f"Models to load (default: {', '.join(registry.names())}).")
+
+    def handle(self, *args, **options):
+        registry.warm_up(options["names"] or None)
+        for name, stats in registry.stats().items():
+            if not stats["loaded"]:
+                continue
+            rss = stats["rss_delta_bytes"]
+            rss_text = f"{rss / 2**20:.1f} MiB" if rss is not None else "n/a"
+            self.stdout.write(f"{name}: loaded in {stats['load_seconds']:.2f}s, rss +{rss_text}")
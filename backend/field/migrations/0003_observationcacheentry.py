@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0002_pest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObservationCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=160, unique=True)),
+                ('polygon_hash', models.CharField(db_index=True, max_length=40)),
+                ('dataset', models.CharField(max_length=64)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('payload', models.JSONField()),
+                ('expires_at', models.DateTimeField()),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0003_observationcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fielddata',
+            name='observations_synced_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fielddata',
+            name='observations_synced_until',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FieldObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('ndvi', models.FloatField(null=True)),
+                ('ndwi', models.FloatField(null=True)),
+                ('evi', models.FloatField(null=True)),
+                ('savi', models.FloatField(null=True)),
+                ('cloud_fraction', models.FloatField(null=True)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observations', to='field.fielddata')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'date'), name='unique_field_observation_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0004_fieldobservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pest',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pest',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pest',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
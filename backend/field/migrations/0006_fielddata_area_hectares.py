@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+def backfill_areas(apps, schema_editor):
+    # Self-contained copy of utils.calculate_area_in_hectares as of this
+    # migration: project to the UTM zone of the centroid and take the area.
+    # Rows that fail are left NULL for utils.field_area() to fill on use.
+    import numpy as np
+    import shapely
+    from pyproj import Transformer
+
+    transformers = {}
+
+    def area_hectares(polygon):
+        ring = np.asarray(polygon['coordinates'][0], dtype=float)[:, :2]
+        shape = shapely.Polygon(ring)
+        centroid = shape.centroid
+        zone = int((centroid.x + 180) // 6) % 60 + 1
+        epsg = (32600 if centroid.y >= 0 else 32700) + zone
+        if epsg not in transformers:
+            transformers[epsg] = Transformer.from_crs('EPSG:4326', f'EPSG:{epsg}', always_xy=True)
+        x, y = transformers[epsg].transform(ring[:, 0], ring[:, 1])
+        return float(shapely.Polygon(np.column_stack([x, y])).area) / 10000
+
+    FieldData = apps.get_model('field', 'FieldData')
+    fields = []
+    for field in FieldData.objects.all():
+        try:
+            field.area_hectares = area_hectares(field.polygon)
+        except Exception:
+            continue
+        fields.append(field)
+    FieldData.objects.bulk_update(fields, ['area_hectares'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0005_pest_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fielddata',
+            name='area_hectares',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_areas, migrations.RunPython.noop),
+    ]
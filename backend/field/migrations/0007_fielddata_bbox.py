@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_bounds(apps, schema_editor):
+    # Self-contained copy of spatial.polygon_bounds as of this migration;
+    # rows with malformed polygons are left NULL
+    FieldData = apps.get_model('field', 'FieldData')
+    fields = []
+    for field in FieldData.objects.all():
+        try:
+            lons, lats = zip(*((float(c[0]), float(c[1])) for c in field.polygon['coordinates'][0]))
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        field.min_lon, field.min_lat = min(lons), min(lats)
+        field.max_lon, field.max_lat = max(lons), max(lats)
+        fields.append(field)
+    FieldData.objects.bulk_update(fields, ['min_lon', 'min_lat', 'max_lon', 'max_lat'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0006_fielddata_area_hectares'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fielddata',
+            name='max_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fielddata',
+            name='max_lon',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fielddata',
+            name='min_lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fielddata',
+            name='min_lon',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fielddata',
+            index=models.Index(fields=['min_lat', 'min_lon'], name='fielddata_bbox_idx'),
+        ),
+        migrations.RunPython(backfill_bounds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def tag_and_count_reports(apps, schema_editor):
+    # Self-contained copy of heatmap.py's tagging and tile counting as of this
+    # migration; reports whose field polygon is malformed are left untagged
+    import math
+
+    import shapely
+    from django.conf import settings
+    from django.utils import timezone
+
+    Pest = apps.get_model('field', 'Pest')
+    FieldData = apps.get_model('field', 'FieldData')
+    PestTileCount = apps.get_model('field', 'PestTileCount')
+
+    centroids = {}
+    for field in FieldData.objects.all():
+        try:
+            shell, *holes = field.polygon['coordinates']
+            centroid = shapely.polygons(shell, holes=holes or None).centroid
+        except (KeyError, TypeError, ValueError, shapely.errors.ShapelyError):
+            continue
+        centroids[field.user_id] = (field, centroid.x, centroid.y)
+
+    pests = list(Pest.objects.all())
+    for pest in pests:
+        result = pest.result
+        pest.infested = result['class'] == 'Infested' if result and 'class' in result else None
+        if pest.user_id in centroids:
+            pest.field, pest.lon, pest.lat = centroids[pest.user_id]
+    Pest.objects.bulk_update(pests, ['field', 'lon', 'lat', 'infested'], batch_size=1000)
+
+    size = getattr(settings, 'PEST_TILE_DEGREES', 0.05)
+    counts = {}
+    for pest in pests:
+        if pest.lon is None:
+            continue
+        uploaded_at = pest.uploaded_at
+        day = timezone.localdate(uploaded_at) if timezone.is_aware(uploaded_at) else uploaded_at.date()
+        entry = counts.setdefault((day, math.floor(pest.lon / size), math.floor(pest.lat / size)), [0, 0])
+        entry[0] += 1
+        entry[1] += int(bool(pest.infested))
+    PestTileCount.objects.bulk_create(
+        [
+            PestTileCount(day=day, tile_x=x, tile_y=y, reports=total, infested=infested)
+            for (day, x, y), (total, infested) in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0007_fielddata_bbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pest',
+            name='field',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='field.fielddata'),
+        ),
+        migrations.AddField(
+            model_name='pest',
+            name='infested',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pest',
+            name='lat',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pest',
+            name='lon',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PestTileCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('tile_x', models.IntegerField()),
+                ('tile_y', models.IntegerField()),
+                ('reports', models.PositiveIntegerField(default=0)),
+                ('infested', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'tile_y', 'tile_x'), name='unique_pest_tile_day')],
+            },
+        ),
+        migrations.RunPython(tag_and_count_reports, migrations.RunPython.noop),
+    ]
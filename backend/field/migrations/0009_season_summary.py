@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0008_pest_heatmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeasonSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(max_length=16)),
+                ('year', models.IntegerField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('payload', models.JSONField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_summaries', to='field.fielddata')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'season', 'year'), name='unique_field_season_year')],
+            },
+        ),
+    ]
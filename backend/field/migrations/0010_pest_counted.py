@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+def recount_without_duplicates(apps, schema_editor):
+    # Self-contained copy of heatmap.rebuild_tile_counts as of this migration:
+    # a user's re-uploads of the same photo stop counting as extra reports
+    import math
+
+    from django.conf import settings
+    from django.utils import timezone
+
+    Pest = apps.get_model('field', 'Pest')
+    PestTileCount = apps.get_model('field', 'PestTileCount')
+
+    size = getattr(settings, 'PEST_TILE_DEGREES', 0.05)
+    counts, seen, counted = {}, set(), []
+    for pest in Pest.objects.exclude(lon=None).exclude(lat=None).order_by('pk').iterator():
+        if pest.image_hash:
+            if (pest.user_id, pest.image_hash) in seen:
+                continue
+            seen.add((pest.user_id, pest.image_hash))
+        counted.append(pest.pk)
+        uploaded_at = pest.uploaded_at
+        day = timezone.localdate(uploaded_at) if timezone.is_aware(uploaded_at) else uploaded_at.date()
+        entry = counts.setdefault((day, math.floor(pest.lon / size), math.floor(pest.lat / size)), [0, 0])
+        entry[0] += 1
+        entry[1] += int(bool(pest.infested))
+
+    for i in range(0, len(counted), 1000):
+        Pest.objects.filter(pk__in=counted[i:i + 1000]).update(counted=True)
+    PestTileCount.objects.all().delete()
+    PestTileCount.objects.bulk_create(
+        [
+            PestTileCount(day=day, tile_x=x, tile_y=y, reports=total, infested=infested)
+            for (day, x, y), (total, infested) in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field', '0009_season_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pest',
+            name='counted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(recount_without_duplicates, migrations.RunPython.noop),
+    ]
@@ -6,14 +6,109 @@ class FieldData(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     cropType = models.CharField(max_length=32)
     polygon = models.JSONField()
+    # Hectares, computed when the polygon is saved (utils.field_area)
+    area_hectares = models.FloatField(null=True, blank=True)
+    # Polygon bounding box, for region queries in SQL (see field/spatial.py)
+    min_lon = models.FloatField(null=True, blank=True)
+    min_lat = models.FloatField(null=True, blank=True)
+    max_lon = models.FloatField(null=True, blank=True)
+    max_lat = models.FloatField(null=True, blank=True)
+    # Window of Sentinel-2 scenes already synced into FieldObservation
+    observations_synced_from = models.DateField(null=True, blank=True)
+    observations_synced_until = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["min_lat", "min_lon"], name="fielddata_bbox_idx")]
 
     def __self__(self):
         return self.polygon
+
+
+class FieldObservation(models.Model):
+    field = models.ForeignKey(FieldData, on_delete=models.CASCADE, related_name="observations")
+    date = models.DateField()
+    ndvi = models.FloatField(null=True)
+    ndwi = models.FloatField(null=True)
+    evi = models.FloatField(null=True)
+    savi = models.FloatField(null=True)
+    cloud_fraction = models.FloatField(null=True)
+
+    class Meta:
+        # Also serves as the (field, date) index for date-range queries
+        constraints = [
+            models.UniqueConstraint(fields=["field", "date"], name="unique_field_observation_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.field_id} - {self.date}"
     
 class Pest(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     image = models.ImageField(upload_to="pest/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # sha256 of the upload; identical photos share one stored file and CNN result
+    image_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    model_version = models.CharField(max_length=64, blank=True, default="")
+    result = models.JSONField(null=True, blank=True)
+    # Tagged at upload: the reporter's field and its centroid, and the CNN verdict
+    field = models.ForeignKey(FieldData, null=True, blank=True, on_delete=models.SET_NULL)
+    lon = models.FloatField(null=True, blank=True)
+    lat = models.FloatField(null=True, blank=True)
+    infested = models.BooleanField(null=True, blank=True)
+    # In PestTileCount; False for untagged reports and for re-uploads of a photo
+    # the same user already has counted
+    counted = models.BooleanField(default=False)
 
     def __self__(self):
-        return f"{self.user.username} - {self.uploaded_at.strftime('&Y-%m-%d %H:%M:%S')}"
\ No newline at end of file
+        return f"{self.user.username} - {self.uploaded_at.strftime('&Y-%m-%d %H:%M:%S')}"
+
+class ObservationCacheEntry(models.Model):
+    key = models.CharField(max_length=160, unique=True)
+    polygon_hash = models.CharField(max_length=40, db_index=True)
+    dataset = models.CharField(max_length=64)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    payload = models.JSONField()
+    expires_at = models.DateTimeField()
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class PestTileCount(models.Model):
+    """Pest reports per fixed-degree tile per day (see field/heatmap.py)."""
+    day = models.DateField()
+    tile_x = models.IntegerField()
+    tile_y = models.IntegerField()
+    reports = models.PositiveIntegerField(default=0)
+    infested = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Also the (day, tile) index behind region + date range lookups
+        constraints = [
+            models.UniqueConstraint(fields=["day", "tile_y", "tile_x"], name="unique_pest_tile_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} ({self.tile_x}, {self.tile_y}): {self.infested}/{self.reports}"
+
+
+class SeasonSummary(models.Model):
+    """Index aggregates of one field over one crop season (see field/seasons.py)."""
+    field = models.ForeignKey(FieldData, on_delete=models.CASCADE, related_name="season_summaries")
+    season = models.CharField(max_length=16)
+    year = models.IntegerField()
+    # Window the payload covers; short of the season's end while it is in progress
+    start_date = models.DateField()
+    end_date = models.DateField()
+    payload = models.JSONField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["field", "season", "year"], name="unique_field_season_year"),
+        ]
+
+    def __str__(self):
+        return f"{self.field_id} - {self.season} {self.year}"
@@ -0,0 +1,487 @@
+"""
+Local tile store for index rasters.
+
+Per-field ``reduceRegion`` calls make neighbouring fields pay for the same
+Sentinel-2 pixels over and over. With the raster store enabled, index
+rasters (NDVI/NDWI/EVI/SAVI plus a cloud band) are fetched once per tile and
+scene date into memory-mapped ``.npy`` files, and per-field zonal means are
+computed locally with a vectorized polygon mask:
+
+    FIELD_RASTER_STORE = {
+        "ENABLED": False,
+        "ROOT": BASE_DIR / "rasters",
+        "SOURCE": "earthengine",    # or "synthetic" (offline stand-in)
+        "TILE_DEGREES": 0.1,        # ~11 km tiles
+        "PIXEL_DEGREES": 0.0001,    # ~10 m pixels
+    }
+
+Layout: ``ROOT/<tile_x>_<tile_y>/<date>.npy`` holds a float16
+(band, row, col) array, north-up, with NaN where a pixel is masked, and
+``manifest.json`` beside it lists the date windows already fetched. The
+last S2_INGEST_MARGIN_DAYS are never recorded as fetched, so scenes Earth
+Engine ingests late still get picked up. Updates to a tile are serialized
+across processes with an flock on ``manifest.lock`` (POSIX only).
+Cloud filtering (S2_CLOUD_FILTER) is applied when a tile is fetched, so
+clear the store after changing it.
+"""
+import copy
+import datetime
+import hashlib
+import json
+import math
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+import ee
+import numpy as np
+import shapely
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: tiles are only locked within a process
+    fcntl = None
+
+from .instrumentation import count, span
+from .spatial import polygon_geometry
+from .utils import (
+    TIME_SERIES_INDICES, _cloud_band, _cloud_settings, _index_image, _mask_clouds, _s2_scenes,
+    settled_until,
+)
+
+BANDS = (*TIME_SERIES_INDICES, "cloud")
+CLOUD = BANDS.index("cloud")
+
+DEFAULTS = {
+    "ENABLED": False,
+    "ROOT": None,
+    "SOURCE": "earthengine",
+    "TILE_DEGREES": 0.1,
+    "PIXEL_DEGREES": 0.0001,
+}
+
+# Memory-mapped rasters kept open per process
+MAX_OPEN_RASTERS = 512
+
+# Stand-in for masked pixels in computePixels output (it has no NaN fill)
+NODATA = -9999.0
+
+
+def raster_settings():
+    config = {**DEFAULTS, **getattr(settings, "FIELD_RASTER_STORE", {})}
+    if config["ROOT"] is None:
+        config["ROOT"] = os.path.join(settings.BASE_DIR, "rasters")
+    return config
+
+
+def raster_store_enabled():
+    return raster_settings()["ENABLED"]
+
+
+def _missing_intervals(fetched, start, end):
+    """Parts of [start, end) not covered by the ``fetched`` (start, end) intervals."""
+    missing, cursor = [], start
+    for lo, hi in sorted(fetched):
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def _merge_intervals(intervals):
+    """Sorted union of (start, end) intervals, touching ones joined."""
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+# --- Sources ---
+
+class EarthEngineTileSource:
+    """Cloud-masked index rasters of each scene date, via ``ee.data.computePixels``."""
+
+    def scenes(self, bounds, size, start, end):
+        west, south, east, north = bounds
+        region = ee.Geometry.Rectangle([west, south, east, north])
+        collection = _s2_scenes(region, start.isoformat(), end.isoformat())
+        count("ee_calls")
+        with span("ee"):
+            dates = collection.aggregate_array("system:time_start").map(
+                lambda t: ee.Date(t).format("YYYY-MM-dd")
+            ).distinct().getInfo()
+
+        for date in sorted(dates):
+            day = datetime.date.fromisoformat(date)
+            scene = collection.filterDate(date, (day + datetime.timedelta(days=1)).isoformat()).mosaic()
+            mask = _cloud_settings()["MASK"]
+            cloud = _cloud_band(scene, mask) if mask else ee.Image.constant(0)
+            image = _index_image(_mask_clouds(scene)).addBands(cloud.rename("cloud")).select(list(BANDS))
+            request = {
+                "expression": image.unmask(NODATA).toFloat(),
+                "fileFormat": "NUMPY_NDARRAY",
+                "grid": {
+                    "dimensions": {"width": size, "height": size},
+                    "affineTransform": {
+                        "scaleX": (east - west) / size, "shearX": 0, "translateX": west,
+                        "shearY": 0, "scaleY": -(north - south) / size, "translateY": north,
+                    },
+                    "crsCode": "EPSG:4326",
+                },
+            }
+            count("ee_calls")
+            with span("ee"):
+                pixels = ee.data.computePixels(request)
+            array = np.stack([pixels[band] for band in BANDS]).astype(np.float32)
+            array[array == NODATA] = np.nan
+            yield day, array
+
+
+class SyntheticTileSource:
+    """
+    Deterministic rasters for tests and offline benchmarks: a scene every
+    five days with smooth in-field variation, a seasonal trend and cloud
+    blobs over part of some scenes.
+    """
+
+    revisit_days = 5
+
+    def __init__(self):
+        self.fetches = 0
+
+    def scenes(self, bounds, size, start, end):
+        west, south, _, _ = bounds
+        seed = int(hashlib.sha1(f"{west:.6f},{south:.6f}".encode()).hexdigest()[:8], 16)
+        epoch = datetime.date(2024, 1, 1)
+        day = start + datetime.timedelta(days=(epoch - start).days % self.revisit_days)
+        rows, cols = np.mgrid[0:size, 0:size].astype(np.float32) / size
+        max_scene_cloud = _cloud_settings()["MAX_SCENE_CLOUD_PCT"]
+        while day < end:
+            rng = np.random.default_rng([seed, day.toordinal()])
+            scene_cloud = float(rng.uniform(0, 60))
+            if scene_cloud <= max_scene_cloud:
+                self.fetches += 1
+                yield day, self._scene(rng, rows, cols, day, scene_cloud)
+            day += datetime.timedelta(days=self.revisit_days)
+
+    def _scene(self, rng, rows, cols, day, scene_cloud):
+        season = math.sin(2 * math.pi * day.timetuple().tm_yday / 365)
+        ndvi = 0.45 + 0.15 * season + 0.1 * np.sin(9 * rows) * np.cos(7 * cols)
+        ndvi += rng.normal(0, 0.02, ndvi.shape).astype(np.float32)
+        ndwi = -0.6 * ndvi + 0.1 + 0.05 * np.cos(5 * cols)
+        evi = 2.5 * ndvi / (1 + ndvi)
+        savi = 0.9 * ndvi
+        cx, cy = rng.uniform(0, 1, 2)
+        cloud = ((rows - cy) ** 2 + (cols - cx) ** 2 < (scene_cloud / 100) ** 2 * 1.5).astype(np.float32)
+        indices = np.stack([ndvi, ndwi, evi, savi])
+        indices[:, cloud == 1] = np.nan
+        return np.concatenate([indices, cloud[None]]).astype(np.float32)
+
+
+SOURCES = {"earthengine": EarthEngineTileSource, "synthetic": SyntheticTileSource}
+
+
+# --- Store ---
+
+class RasterStore:
+    def __init__(self, root, source, tile_degrees=0.1, pixel_degrees=0.0001):
+        self.root = str(root)
+        self.source = source
+        self.tile_degrees = tile_degrees
+        self.pixel_degrees = pixel_degrees
+        self.size = round(tile_degrees / pixel_degrees)
+        self._lock = threading.Lock()
+        self._tile_locks = {}
+        # path -> (mtime_ns, contents), so a serve doesn't re-read or re-map files
+        self._manifests = {}
+        self._arrays = OrderedDict()
+
+    def _tile_dir(self, tile):
+        return os.path.join(self.root, f"{tile[0]}_{tile[1]}")
+
+    def tile_bounds(self, tile):
+        x, y = tile
+        d = self.tile_degrees
+        return (x * d, y * d, (x + 1) * d, (y + 1) * d)
+
+    def _tile_lock(self, tile):
+        with self._lock:
+            return self._tile_locks.setdefault(tile, threading.Lock())
+
+    def _manifest(self, tile):
+        path = os.path.join(self._tile_dir(tile), "manifest.json")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {"windows": [], "dates": []}
+        cached = self._manifests.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path) as f:
+                cached = self._manifests[path] = (mtime, json.load(f))
+        return copy.deepcopy(cached[1])
+
+    def _write(self, path, write, mode="wb"):
+        # Write-then-rename, so readers in other processes never see half a file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, mode) as f:
+            write(f)
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _locked(self, tile):
+        with self._tile_lock(tile):
+            if fcntl is None:
+                yield
+                return
+            directory = self._tile_dir(tile)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "manifest.lock"), "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def ensure(self, tile, start, end):
+        """
+        Fetch the tile's scenes in [start, end) not stored yet. Returns how
+        many were fetched. Days from settled_until() on are fetched on every
+        call but not recorded, since Earth Engine may still add scenes there.
+        """
+        settled = settled_until()
+        with self._locked(tile):
+            # Read under the lock, so windows another process just added are kept
+            manifest = self._manifest(tile)
+            fetched = [tuple(map(datetime.date.fromisoformat, w)) for w in manifest["windows"]]
+            missing = _missing_intervals(fetched, start, end)
+            if not missing:
+                return 0
+            directory = self._tile_dir(tile)
+            os.makedirs(directory, exist_ok=True)
+            added = 0
+            for lo, hi in missing:
+                for day, array in self.source.scenes(self.tile_bounds(tile), self.size, lo, hi):
+                    path = os.path.join(directory, f"{day.isoformat()}.npy")
+                    self._write(path, lambda f, a=array: np.save(f, a.astype(np.float16)))
+                    manifest["dates"] = sorted(set(manifest["dates"]) | {day.isoformat()})
+                    added += 1
+                if min(hi, settled) > lo:
+                    fetched.append((lo, min(hi, settled)))
+            manifest["windows"] = [[lo.isoformat(), hi.isoformat()] for lo, hi in _merge_intervals(fetched)]
+            self._write(os.path.join(directory, "manifest.json"), lambda f: json.dump(manifest, f), "w")
+            return added
+
+    def dates(self, tile, start, end):
+        return [
+            datetime.date.fromisoformat(d) for d in self._manifest(tile)["dates"]
+            if start.isoformat() <= d < end.isoformat()
+        ]
+
+    def array(self, tile, day):
+        """The stored (band, row, col) raster, memory-mapped."""
+        path = os.path.join(self._tile_dir(tile), f"{day.isoformat()}.npy")
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._arrays.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._arrays.move_to_end(path)
+                return cached[1]
+        # A plain ndarray view of the map: slicing a np.memmap is several times slower
+        array = np.load(path, mmap_mode="r").view(np.ndarray)
+        with self._lock:
+            self._arrays[path] = (mtime, array)
+            while len(self._arrays) > MAX_OPEN_RASTERS:
+                self._arrays.popitem(last=False)
+        return array
+
+    def field_windows(self, polygon):
+        """
+        ``[(tile, pixels)]`` for each tile a polygon touches, ``pixels`` being
+        the flat indices of the tile pixels whose centre is inside it.
+        """
+        return _field_windows(json.dumps(polygon, sort_keys=True), self.tile_degrees, self.size)
+
+    def field_coords(self, polygon):
+        """Lon/lat of the pixel centres in field_pixels order."""
+        lons, lats = [], []
+        for tile, pixels in self.field_windows(polygon):
+            west, _, _, north = self.tile_bounds(tile)
+            rows, cols = np.divmod(pixels, self.size)
+            lons.append(west + (cols + 0.5) * self.pixel_degrees)
+            lats.append(north - (rows + 0.5) * self.pixel_degrees)
+        if not lons:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(lons), np.concatenate(lats)
+
+    def field_pixels(self, polygon, start, end):
+        """
+        Scene dates over [start, end) and a float32 (date, band, pixel) array
+        of the polygon's pixels, fetching missing tile scenes first. Returns
+        ``(dates, values, scenes fetched)``.
+        """
+        windows = self.field_windows(polygon)
+        fetched = sum(self.ensure(tile, start, end) for tile, _ in windows)
+        dates = sorted({day for tile, _ in windows for day in self.dates(tile, start, end)})
+        n_pixels = sum(len(pixels) for _, pixels in windows)
+        values = np.full((len(dates), len(BANDS), n_pixels), np.nan, dtype=np.float32)
+        offset = 0
+        for tile, pixels in windows:
+            tile_dates = set(self.dates(tile, start, end))
+            for i, day in enumerate(dates):
+                if day in tile_dates:
+                    flat = self.array(tile, day).reshape(len(BANDS), -1)
+                    values[i, :, offset:offset + len(pixels)] = flat[:, pixels]
+            offset += len(pixels)
+        return dates, values, fetched
+
+
+@lru_cache(maxsize=4096)
+def _field_windows(polygon_json, tile_degrees, size):
+    # Masks depend only on the polygon and grid, so they are built once per field
+    geometry = polygon_geometry(json.loads(polygon_json))
+    pixel = tile_degrees / size
+    min_lon, min_lat, max_lon, max_lat = geometry.bounds
+    windows = []
+    for x in range(math.floor(min_lon / tile_degrees), math.floor(max_lon / tile_degrees) + 1):
+        for y in range(math.floor(min_lat / tile_degrees), math.floor(max_lat / tile_degrees) + 1):
+            west, north = x * tile_degrees, (y + 1) * tile_degrees
+            c0 = max(0, math.floor((min_lon - west) / pixel))
+            c1 = min(size, math.ceil((max_lon - west) / pixel))
+            r0 = max(0, math.floor((north - max_lat) / pixel))
+            r1 = min(size, math.ceil((north - min_lat) / pixel))
+            if c0 >= c1 or r0 >= r1:
+                continue
+            lons = west + (np.arange(c0, c1) + 0.5) * pixel
+            lats = north - (np.arange(r0, r1) + 0.5) * pixel
+            rows, cols = np.nonzero(shapely.contains_xy(geometry, *np.meshgrid(lons, lats)))
+            if len(rows):
+                windows.append(((x, y), (rows + r0) * size + cols + c0))
+    return windows
+
+
+@lru_cache(maxsize=None)
+def get_raster_store():
+    """Return the process-wide raster store configured in settings."""
+    config = raster_settings()
+    return RasterStore(
+        config["ROOT"], SOURCES[config["SOURCE"]](),
+        tile_degrees=config["TILE_DEGREES"], pixel_degrees=config["PIXEL_DEGREES"],
+    )
+
+
+# --- Field reductions ---
+
+def _nanmean(values, axis=-1):
+    """np.nanmean without the all-NaN warning; all-NaN slices give NaN."""
+    valid = ~np.isnan(values)
+    total = np.where(valid, values, 0).sum(axis=axis)
+    n = valid.sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / n
+
+
+def _value(x):
+    return None if np.isnan(x) else float(x)
+
+
+def index_rows(polygon, start_date, end_date, store=None):
+    """
+    Per-scene ``[date, cloud_fraction, *indices]`` rows for a field from the
+    raster store, the same shape as _index_rows_query returns, with scenes
+    over MAX_FIELD_CLOUD_FRACTION dropped. Returns (rows, scenes fetched).
+    """
+    store = store or get_raster_store()
+    start, end = (datetime.date.fromisoformat(str(d)) for d in (start_date, end_date))
+    with span("raster"):
+        dates, values, fetched = store.field_pixels(polygon, start, end)
+        means = _nanmean(values)  # (date, band)
+        max_cloud = _cloud_settings()["MAX_FIELD_CLOUD_FRACTION"]
+        keep = (means[:, CLOUD] <= max_cloud) & ~np.isnan(means).any(axis=1)
+        rows = [
+            [day.isoformat(), float(row[CLOUD]), *row[:CLOUD].tolist()]
+            for day, row, ok in zip(dates, means, keep) if ok
+        ]
+    return rows, fetched
+
+
+def composite_pixels(polygon, start_date, end_date, store=None):
+    """
+    Per-pixel median of each index over [start, end), like the EE median
+    composite, as an (index, pixel) array; NaN where a pixel was cloudy on
+    every date. None when there are no scenes.
+    """
+    store = store or get_raster_store()
+    start, end = (datetime.date.fromisoformat(str(d)) for d in (start_date, end_date))
+    with span("raster"):
+        dates, values, _ = store.field_pixels(polygon, start, end)
+        if not dates:
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanmedian(values[:, :CLOUD], axis=0)
+
+
+def composite_stats(polygon, start_date, end_date, store=None):
+    """Field means of the median composite (see composite_pixels)."""
+    median = composite_pixels(polygon, start_date, end_date, store)
+    if median is None:
+        return {name: None for name in TIME_SERIES_INDICES}
+    return {name: _value(m) for name, m in zip(TIME_SERIES_INDICES, _nanmean(median))}
+
+
+# --- Benchmark ---
+
+def benchmark(root, n_fields=500, start_date="2024-06-01", end_date="2024-07-01", field_degrees=0.005):
+    """
+    Fill a store from the synthetic source, then serve ``n_fields`` fields
+    packed into one tile. Earth Engine mode would make one round-trip per
+    field; the store makes one fetch per tile scene, shared by all of them.
+    """
+    import time
+
+    store = RasterStore(root, SyntheticTileSource())
+    rng = np.random.default_rng(0)
+    corners = np.column_stack([
+        rng.uniform(77.0, 77.1 - field_degrees, n_fields), rng.uniform(28.1, 28.2 - field_degrees, n_fields),
+    ])
+    polygons = [
+        {"type": "Polygon", "coordinates": [[
+            [x, y], [x + field_degrees, y], [x + field_degrees, y + field_degrees], [x, y + field_degrees], [x, y],
+        ]]}
+        for x, y in corners.tolist()
+    ]
+
+    started = time.perf_counter()
+    _, fetched = index_rows(polygons[0], start_date, end_date, store)
+    fetch_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for polygon in polygons:
+        index_rows(polygon, start_date, end_date, store)
+    cold_ms = (time.perf_counter() - started) * 1000 / n_fields
+
+    started = time.perf_counter()
+    for polygon in polygons:
+        index_rows(polygon, start_date, end_date, store)
+    warm_ms = (time.perf_counter() - started) * 1000 / n_fields
+
+    return {
+        "fields": n_fields,
+        "tile_scenes_fetched": fetched,
+        "fetch_s": round(fetch_s, 2),
+        "serve_ms_first": round(cold_ms, 3),
+        "serve_ms_repeat": round(warm_ms, 3),
+    }
@@ -0,0 +1,146 @@
+"""
+Crop seasons and multi-season history.
+
+Seasons (kharif, rabi, ...) are month/day windows from the CROP_SEASONS
+setting, named by the year they start in. ``season_history`` compares a
+field across the last few occurrences of a season from SeasonSummary rows:
+a season is fetched once it has settled (ended S2_INGEST_MARGIN_DAYS ago,
+so late-ingested scenes are in) and then served from its row, a season in
+progress is refetched at most once a day (its window grows), and all
+seasons that need fetching share a single Earth Engine round-trip.
+"""
+from datetime import date
+
+import ee
+from django.conf import settings
+from django.db import transaction
+
+from .models import SeasonSummary
+from .utils import (
+    TIME_SERIES_INDICES, _index_rows_query, _index_time_series, _rasters, getinfo, settled_until,
+)
+
+DEFAULT_SEASONS = {
+    "kharif": {"start": (6, 1), "end": (11, 1)},
+    "rabi": {"start": (11, 1), "end": (4, 1)},
+}
+
+# Most seasons one history request may cover
+MAX_HISTORY_SEASONS = 10
+
+
+def crop_seasons():
+    return getattr(settings, "CROP_SEASONS", DEFAULT_SEASONS)
+
+
+def season_window(season, year):
+    """``(start, end)`` dates of ``season`` starting in ``year``, end exclusive."""
+    try:
+        spec = crop_seasons()[season]
+    except KeyError:
+        raise ValueError(f"Unknown season {season!r}; use one of {', '.join(crop_seasons())}")
+    start = date(year, *spec["start"])
+    end = date(year, *spec["end"])
+    if end <= start:
+        end = date(year + 1, *spec["end"])
+    return start, end
+
+
+def latest_season_year(season, today=None):
+    """Year of the most recent ``season`` that has started by ``today``."""
+    today = today or date.today()
+    start, _ = season_window(season, today.year)
+    return today.year if start <= today else today.year - 1
+
+
+def recent_season_years(season, count, today=None):
+    """The last ``count`` years of ``season``, oldest first, including one in progress."""
+    latest = latest_season_year(season, today)
+    return list(range(latest - count + 1, latest + 1))
+
+
+def summarize_rows(rows):
+    """
+    Season aggregates from ``[date, cloud_fraction, *indices]`` rows: the
+    scene count, and per index its mean, min, max and the date of its peak.
+    """
+    series = _index_time_series(rows)
+    summary = {"scenes": len(series)}
+    for name in TIME_SERIES_INDICES:
+        values = [(row[name], row["date"]) for row in series if row[name] is not None]
+        if not values:
+            summary[name] = None
+            continue
+        peak, peak_date = max(values)
+        summary[name] = {
+            "mean": sum(v for v, _ in values) / len(values),
+            "min": min(v for v, _ in values),
+            "max": peak,
+            "peak_date": peak_date,
+        }
+    return summary
+
+
+def _fetch_rows(polygon, windows):
+    """``{year: rows}`` for ``{year: (start, end)}``, in one Earth Engine round-trip."""
+    rasters = _rasters()
+    if rasters is not None:
+        return {
+            year: rasters.index_rows(polygon, start.isoformat(), end.isoformat())[0]
+            for year, (start, end) in windows.items()
+        }
+    aoi = ee.Geometry(polygon)
+    results = getinfo(ee.Dictionary({
+        str(year): _index_rows_query(aoi, start.isoformat(), end.isoformat())
+        for year, (start, end) in windows.items()
+    })) or {}
+    return {year: results.get(str(year)) for year in windows}
+
+
+def season_history(field_data, season, years=5, today=None):
+    """
+    Aggregates of the last ``years`` occurrences of ``season`` on the field,
+    oldest first, and the number of seasons that had to be fetched.
+    """
+    if not 1 <= years <= MAX_HISTORY_SEASONS:
+        raise ValueError(f"years must be between 1 and {MAX_HISTORY_SEASONS}")
+    today = today or date.today()
+    settled = settled_until(today)
+    wanted = {}
+    for year in recent_season_years(season, years, today):
+        start, end = season_window(season, year)
+        # Scenes after ``settled`` may still be missing in Earth Engine; the row
+        # is refetched as the window grows
+        wanted[year] = (start, max(start, min(end, settled)))
+
+    stored = {
+        summary.year: summary
+        for summary in field_data.season_summaries.filter(season=season, year__in=list(wanted))
+    }
+    missing = {
+        year: window for year, window in wanted.items()
+        if year not in stored or (stored[year].start_date, stored[year].end_date) != window
+    }
+    if missing:
+        fetched = _fetch_rows(field_data.polygon, missing)
+        with transaction.atomic():
+            for year, (start, end) in missing.items():
+                stored[year], _ = SeasonSummary.objects.update_or_create(
+                    field=field_data, season=season, year=year,
+                    defaults={
+                        "start_date": start, "end_date": end,
+                        "payload": summarize_rows(fetched[year]),
+                    },
+                )
+
+    history = []
+    for year, (start, end) in wanted.items():
+        history.append({
+            "season": season,
+            "year": year,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "complete": season_window(season, year)[1] <= settled,
+            **stored[year].payload,
+        })
+    return history, len(missing)
@@ -1,5 +1,34 @@
+from collections import Counter
+
+from django.conf import settings
 from rest_framework import serializers
 
+from .seasons import MAX_HISTORY_SEASONS, crop_seasons, latest_season_year, season_window
+from .utils import DEFAULT_END_DATE, DEFAULT_START_DATE
+
+def _is_position(value):
+    return (
+        isinstance(value, (list, tuple)) and len(value) >= 2
+        and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value[:2])
+        and -180 <= value[0] <= 180 and -90 <= value[1] <= 90
+    )
+
+
+def validate_polygon(value):
+    """A GeoJSON Polygon: closed rings of at least four lon/lat positions."""
+    if not isinstance(value, dict) or value.get("type") != "Polygon":
+        raise serializers.ValidationError("Expected a GeoJSON Polygon")
+    rings = value.get("coordinates")
+    if not isinstance(rings, list) or not rings:
+        raise serializers.ValidationError("A Polygon needs at least one ring")
+    for ring in rings:
+        if not isinstance(ring, list) or len(ring) < 4 or not all(_is_position(p) for p in ring):
+            raise serializers.ValidationError("Each ring needs at least four [lon, lat] positions")
+        if list(ring[0]) != list(ring[-1]):
+            raise serializers.ValidationError("Rings must be closed")
+    return value
+
+
 class FieldDataResponseSerializer(serializers.Serializer):
     NDVI = serializers.FloatField(allow_null=True)
     EVI = serializers.FloatField(allow_null=True)
@@ -18,3 +47,108 @@ class FieldDataResponseSerializer(serializers.Serializer):
         allow_empty=True,
         required=False
     )
+    index_time_series = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=True,
+        required=False
+    )
+
+
+class PestHeatmapQuerySerializer(serializers.Serializer):
+    """Query string of PestHeatmap: ``bbox=min_lon,min_lat,max_lon,max_lat&start=...&end=...``."""
+    bbox = serializers.CharField()
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate_bbox(self, value):
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+        except ValueError:
+            raise serializers.ValidationError("Expected min_lon,min_lat,max_lon,max_lat")
+        if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+            raise serializers.ValidationError("Not a valid lon/lat box")
+        return min_lon, min_lat, max_lon, max_lat
+
+
+class FieldWindowQuerySerializer(serializers.Serializer):
+    """
+    Date window of the field endpoints: ``start=&end=`` (end exclusive), or
+    ``season=kharif`` with an optional ``year`` (default: the latest one
+    that has started). Without either, the default window. Validated data
+    carries ``start`` and ``end`` as ISO dates.
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    season = serializers.CharField(required=False)
+    year = serializers.IntegerField(required=False, min_value=2015, max_value=2100)
+
+    def validate_season(self, value):
+        if value not in crop_seasons():
+            raise serializers.ValidationError(f"Use one of {', '.join(crop_seasons())}")
+        return value
+
+    def validate(self, attrs):
+        start, end, season = attrs.get("start"), attrs.get("end"), attrs.get("season")
+        if season:
+            if start or end:
+                raise serializers.ValidationError("Give either a season or start/end, not both")
+            start, end = season_window(season, attrs.get("year") or latest_season_year(season))
+        elif "year" in attrs:
+            raise serializers.ValidationError("year needs a season")
+        elif start or end:
+            if not (start and end):
+                raise serializers.ValidationError("Give both start and end")
+            if start >= end:
+                raise serializers.ValidationError("start must be before end")
+            max_days = getattr(settings, "FIELD_MAX_WINDOW_DAYS", 366)
+            if (end - start).days > max_days:
+                raise serializers.ValidationError(f"Windows are limited to {max_days} days")
+        else:
+            return {**attrs, "start": DEFAULT_START_DATE, "end": DEFAULT_END_DATE}
+        return {**attrs, "start": start.isoformat(), "end": end.isoformat()}
+
+
+class SeasonHistoryQuerySerializer(serializers.Serializer):
+    """Query string of SeasonHistory: ``season=kharif&years=5``."""
+    season = serializers.CharField()
+    years = serializers.IntegerField(min_value=1, max_value=MAX_HISTORY_SEASONS, default=5)
+
+    def validate_season(self, value):
+        if value not in crop_seasons():
+            raise serializers.ValidationError(f"Use one of {', '.join(crop_seasons())}")
+        return value
+
+
+class ManagementZonesQuerySerializer(FieldWindowQuerySerializer):
+    """Query string of ManagementZones, plus the field window."""
+    cell_m = serializers.IntegerField(min_value=10, max_value=1000, default=30)
+    index = serializers.ChoiceField(choices=["NDVI", "NDWI", "EVI", "SAVI"], default="NDVI")
+    zones = serializers.IntegerField(min_value=2, max_value=7, default=3)
+
+
+
+class BatchFieldSerializer(serializers.Serializer):
+    id = serializers.JSONField()
+    polygon = serializers.JSONField(validators=[validate_polygon])
+
+    def validate_id(self, value):
+        if not isinstance(value, (str, int)) or isinstance(value, bool):
+            raise serializers.ValidationError("Ids must be strings or integers")
+        return value
+
+
+class BatchFieldIndicesSerializer(FieldWindowQuerySerializer):
+    """Body of BatchFieldIndices, plus the field window. Ids must be unique across both lists."""
+    fields = BatchFieldSerializer(many=True, required=False, default=list)
+    field_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    time_series = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if not attrs["fields"] and not attrs["field_ids"]:
+            raise serializers.ValidationError("No fields given")
+        ids = Counter([entry["id"] for entry in attrs["fields"]] + attrs["field_ids"])
+        duplicates = sorted(str(field_id) for field_id, n in ids.items() if n > 1)
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate field ids: {', '.join(duplicates)}")
+        return attrs
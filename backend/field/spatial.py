@@ -0,0 +1,340 @@
+"""
+Spatial index over field polygons.
+
+FieldData.polygon is plain GeoJSON, so region queries (fields in a
+district, fields near a pest report, overlap checks) would otherwise load
+and parse every row. FieldIndex keeps the polygons in a shapely STRtree,
+one per process, loaded on first use.
+
+An STRtree can't be modified once built, so saves and deletes go to a
+small delta (new or moved polygons, searched linearly) and a tombstone set
+(tree entries that are gone). The tree is rebuilt once those reach
+REBUILD_FRACTION of its size. Changes made by other worker processes show
+up after the next full reload, every MAX_AGE seconds:
+
+    FIELD_SPATIAL_INDEX = {
+        "REBUILD_FRACTION": 0.1,
+        "MAX_AGE": 5 * 60,      # seconds; None never reloads
+    }
+
+Distances are planar, in degrees: fine for ranking nearby fields, not for
+measuring them.
+"""
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import shapely
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import FieldData
+
+DEFAULTS = {
+    "REBUILD_FRACTION": 0.1,
+    "MAX_AGE": 5 * 60,
+}
+
+# Pending changes always tolerated before a rebuild, however small the tree
+MIN_REBUILD_PENDING = 256
+
+# Share of the new polygon that must be covered before SavePolygon calls it an overlap;
+# fields that only share a boundary (or differ by digitising noise) don't count
+OVERLAP_MIN_FRACTION = 0.01
+
+
+def polygon_geometry(polygon):
+    """Shapely polygon from a GeoJSON Polygon dict."""
+    shell, *holes = polygon["coordinates"]
+    return shapely.polygons(shell, holes=holes or None)
+
+
+def polygon_geometries(polygons):
+    """
+    Shapely polygons for many GeoJSON Polygon dicts. Hole-free polygons (the
+    usual case) are built in one vectorized call, which is what keeps a
+    full index load fast.
+    """
+    polygons = list(polygons)
+    geoms = np.empty(len(polygons), dtype=object)
+    simple = [i for i, p in enumerate(polygons) if len(p["coordinates"]) == 1]
+    if simple:
+        shells = [polygons[i]["coordinates"][0] for i in simple]
+        coords = np.asarray([point[:2] for shell in shells for point in shell], dtype=float)
+        ring_ids = np.repeat(np.arange(len(shells)), [len(shell) for shell in shells])
+        geoms[simple] = shapely.polygons(shapely.linearrings(coords, indices=ring_ids))
+    for i in set(range(len(polygons))) - set(simple):
+        geoms[i] = polygon_geometry(polygons[i])
+    return geoms
+
+
+def polygon_bounds(polygon):
+    """``{min_lon, min_lat, max_lon, max_lat}`` of a GeoJSON polygon, as stored on FieldData."""
+    ring = np.asarray(polygon["coordinates"][0], dtype=float)
+    (min_lon, min_lat), (max_lon, max_lat) = ring.min(axis=0), ring.max(axis=0)
+    return {
+        "min_lon": float(min_lon), "min_lat": float(min_lat),
+        "max_lon": float(max_lon), "max_lat": float(max_lat),
+    }
+
+
+def fields_in_bbox(min_lon, min_lat, max_lon, max_lat):
+    """FieldData rows whose stored bounding box overlaps the given one, filtered in SQL."""
+    return FieldData.objects.filter(
+        min_lon__lte=max_lon, max_lon__gte=min_lon,
+        min_lat__lte=max_lat, max_lat__gte=min_lat,
+    )
+
+
+class FieldIndex:
+    def __init__(self, rebuild_fraction=0.1, max_age=None):
+        self.rebuild_fraction = rebuild_fraction
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._tree = None
+        self._loaded_at = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._geoms = np.empty(0, dtype=object)
+        self._positions = {}     # field_id -> position in the tree, live entries only
+        self._tombstones = set()  # tree positions that were deleted or moved
+        self._delta = {}         # field_id -> geometry saved since the last build
+
+    # --- Building ---
+
+    def load(self, fields=None):
+        """(Re)build from ``(field_id, polygon)`` pairs; every FieldData row by default."""
+        if fields is None:
+            fields = FieldData.objects.values_list("pk", "polygon").iterator(chunk_size=2000)
+        ids, polygons = [], []
+        for field_id, polygon in fields:
+            ids.append(field_id)
+            polygons.append(polygon)
+        geoms = polygon_geometries(polygons)
+        with self._lock:
+            self._build(np.asarray(ids, dtype=np.int64), geoms)
+            self._loaded_at = time.monotonic()
+
+    def reset(self):
+        """Forget everything; the next query reloads from the database."""
+        with self._lock:
+            self._tree = None
+            self._loaded_at = None
+
+    def _build(self, ids, geoms):
+        self._ids, self._geoms = ids, geoms
+        self._tree = shapely.STRtree(geoms)
+        self._positions = dict(zip(ids.tolist(), range(len(ids))))
+        self._tombstones = set()
+        self._delta = {}
+
+    def _ensure_loaded(self):
+        stale = (
+            self.max_age is not None and self._loaded_at is not None
+            and time.monotonic() - self._loaded_at > self.max_age
+        )
+        if self._tree is None or stale:
+            self.load()
+
+    def _rebuild(self):
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[list(self._tombstones)] = False
+        ids = np.concatenate([self._ids[keep], np.fromiter(self._delta, dtype=np.int64)])
+        geoms = np.concatenate([self._geoms[keep], np.asarray(list(self._delta.values()), dtype=object)])
+        self._build(ids, geoms)
+
+    # --- Updates ---
+
+    def add(self, field_id, polygon):
+        """Insert or move a field. A no-op until the index is first loaded."""
+        with self._lock:
+            if self._tree is None:
+                return
+            self._discard(field_id)
+            self._delta[field_id] = polygon_geometry(polygon)
+            self._maybe_rebuild()
+
+    def remove(self, field_id):
+        with self._lock:
+            if self._tree is None:
+                return
+            self._discard(field_id)
+            self._maybe_rebuild()
+
+    def _discard(self, field_id):
+        self._delta.pop(field_id, None)
+        position = self._positions.pop(field_id, None)
+        if position is not None:
+            self._tombstones.add(position)
+
+    def _maybe_rebuild(self):
+        pending = len(self._delta) + len(self._tombstones)
+        if pending > max(MIN_REBUILD_PENDING, self.rebuild_fraction * len(self._ids)):
+            self._rebuild()
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._positions) + len(self._delta)
+
+    # --- Queries ---
+
+    def _search(self, geometry, predicate, **kwargs):
+        """``(field_ids, geometries)`` of live fields matching ``predicate`` against ``geometry``."""
+        with self._lock:
+            self._ensure_loaded()
+            positions = self._tree.query(geometry, predicate=predicate, **kwargs)
+            if self._tombstones:
+                positions = positions[~np.isin(positions, list(self._tombstones))]
+            ids = self._ids[positions].tolist()
+            geoms = list(self._geoms[positions])
+            if self._delta:
+                delta_geoms = np.asarray(list(self._delta.values()), dtype=object)
+                if predicate == "dwithin":
+                    hits = shapely.dwithin(delta_geoms, geometry, kwargs["distance"])
+                else:
+                    hits = shapely.intersects(delta_geoms, geometry)
+                ids += [field_id for field_id, hit in zip(self._delta, hits) if hit]
+                geoms += list(delta_geoms[hits])
+        return ids, geoms
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Ids of fields whose polygon intersects the box."""
+        return self._search(shapely.box(min_lon, min_lat, max_lon, max_lat), "intersects")[0]
+
+    def intersecting(self, polygon):
+        """Ids of fields whose polygon intersects (or touches) a GeoJSON polygon."""
+        return self._search(polygon_geometry(polygon), "intersects")[0]
+
+    def nearest(self, lon, lat, k=1, max_distance=180.0):
+        """Ids of the ``k`` fields closest to a point, nearest first."""
+        point = shapely.Point(lon, lat)
+        radius = 0.01
+        while True:
+            ids, geoms = self._search(point, "dwithin", distance=radius)
+            if len(ids) >= k or radius >= max_distance:
+                break
+            radius = min(radius * 4, max_distance)
+        if not ids:
+            return []
+        distances = shapely.distance(np.asarray(geoms, dtype=object), point)
+        return [ids[i] for i in np.argsort(distances, kind="stable")[:k]]
+
+
+def find_overlaps(polygon, user, min_fraction=OVERLAP_MIN_FRACTION):
+    """
+    ``{field_id: fraction}`` of other users' fields covering more than
+    ``min_fraction`` of ``polygon``. Candidates come from the index and are
+    checked against the stored polygons, so a stale index can't invent overlaps.
+    """
+    candidates = get_field_index().intersecting(polygon)
+    if not candidates:
+        return {}
+    geometry = polygon_geometry(polygon)
+    rows = list(
+        FieldData.objects.filter(pk__in=candidates).exclude(user=user).values_list("pk", "polygon")
+    )
+    if not rows or geometry.area == 0:
+        return {}
+    others = polygon_geometries(other for _, other in rows)
+    fractions = shapely.area(shapely.intersection(others, geometry)) / geometry.area
+    return {
+        field_id: float(fraction)
+        for (field_id, _), fraction in zip(rows, fractions)
+        if fraction > min_fraction
+    }
+
+
+@lru_cache(maxsize=None)
+def get_field_index():
+    """Return the process-wide field index configured in settings."""
+    config = {**DEFAULTS, **getattr(settings, "FIELD_SPATIAL_INDEX", {})}
+    return FieldIndex(rebuild_fraction=config["REBUILD_FRACTION"], max_age=config["MAX_AGE"])
+
+
+def _polygon_unchanged(update_fields):
+    # Partial saves (observation sync state, area) leave the polygon alone
+    return update_fields is not None and "polygon" not in update_fields
+
+
+@receiver(pre_save, sender=FieldData)
+def _store_bounds(sender, instance, update_fields=None, **kwargs):
+    # bulk_create/update skip this; SavePolygon also passes the bounds explicitly
+    if _polygon_unchanged(update_fields):
+        return
+    for name, value in polygon_bounds(instance.polygon).items():
+        setattr(instance, name, value)
+
+
+# Applied on commit, so a rolled-back save never reaches the index
+@receiver(post_save, sender=FieldData)
+def _index_saved_field(sender, instance, update_fields=None, **kwargs):
+    if _polygon_unchanged(update_fields):
+        return
+    transaction.on_commit(lambda: get_field_index().add(instance.pk, instance.polygon))
+
+
+@receiver(post_delete, sender=FieldData)
+def _index_deleted_field(sender, instance, **kwargs):
+    field_id = instance.pk
+    transaction.on_commit(lambda: get_field_index().remove(field_id))
+
+
+# --- Benchmark ---
+
+def benchmark(n_fields=100_000, n_queries=200, linear_queries=3, seed=0):
+    """
+    Index build and query times, in ms per query, against two linear scans:
+    parsing every GeoJSON dict (what a region query costs today) and a
+    vectorized test over already-built geometries.
+    """
+    rng = np.random.default_rng(seed)
+    # ~1-4 ha squares scattered over a 3 x 3 degree region
+    origins = rng.uniform([75.0, 26.0], [78.0, 29.0], size=(n_fields, 2))
+    sizes = rng.uniform(0.001, 0.002, size=n_fields)
+    fields = [
+        (i, {"type": "Polygon", "coordinates": [[
+            [x, y], [x + s, y], [x + s, y + s], [x, y + s], [x, y],
+        ]]})
+        for i, ((x, y), s) in enumerate(zip(origins.tolist(), sizes.tolist()))
+    ]
+    boxes = [(x, y, x + 0.05, y + 0.05) for x, y in rng.uniform([75.0, 26.0], [78.0, 29.0], size=(n_queries, 2))]
+
+    index = FieldIndex()
+    started = time.perf_counter()
+    index.load(fields)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = [sorted(index.in_bbox(*box)) for box in boxes]
+    index_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+    started = time.perf_counter()
+    linear = [
+        sorted(i for i, polygon in fields if polygon_geometry(polygon).intersects(shapely.box(*box)))
+        for box in boxes[:linear_queries]
+    ]
+    linear_ms = (time.perf_counter() - started) * 1000 / linear_queries
+    assert linear == indexed[:linear_queries]
+
+    geoms = polygon_geometries(polygon for _, polygon in fields)
+    started = time.perf_counter()
+    for box in boxes:
+        np.flatnonzero(shapely.intersects(geoms, shapely.box(*box)))
+    scan_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+    started = time.perf_counter()
+    for x, y, _, _ in boxes:
+        index.nearest(x, y, k=5)
+    nearest_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+    return {
+        "fields": n_fields,
+        "build_s": round(build_s, 3),
+        "bbox_ms": round(index_ms, 3),
+        "nearest_ms": round(nearest_ms, 3),
+        "geojson_scan_bbox_ms": round(linear_ms, 1),
+        "vectorized_scan_bbox_ms": round(scan_ms, 2),
+    }
@@ -1,3 +1,1370 @@
-from django.test import TestCase
+import csv
+import datetime
+import importlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+import shapely
+import numpy as np
+from PIL import Image
+from pyproj import Geod
+
+from models.awd import detect_awd_batch, detect_awd_from_ndwi, ndwi_matrix
+from models.batching import MicroBatcher
+from models.cc import calculate_carbon_metrics, calculate_carbon_metrics_batch, write_carbon_report
+from models import cnn
+from models.cnn import predict_health_batched, preprocess, transform
+from models.cnn_export import (
+    check_parity, export_torchscript, load_exported, load_fixtures, main as cnn_export_main, parity_failures,
+)
+from models.lstm import predict_risk_batch, predict_risk_from_values
+from models.registry import ModelRegistry
+
+from .batch import fetch_fields_indices
+from .benchmark import compare, percentile
+from .cache import DatabaseBackend, MemoryBackend, get_observation_cache
+from .fake_ee import FakeEE, RecordingEE
+from .instrumentation import metrics
+from .models import FieldData, FieldObservation, Pest, PestTileCount, SeasonSummary
+from .serializers import FieldDataResponseSerializer
+from .seasons import recent_season_years, season_history, season_window
+from .rasters import (
+    RasterStore, SyntheticTileSource, composite_pixels, get_raster_store, index_rows as raster_index_rows,
+)
+from .spatial import FieldIndex, fields_in_bbox, get_field_index, polygon_bounds, polygon_geometry
+from .zonal import HISTOGRAM_BINS, MAX_ZONE_CELLS, ZoneGrid, management_zones, zonal_stats
+from .utils import (
+    _index_rows_query, afetch_field_data, calculate_area_in_hectares, calculate_areas_in_hectares, fetchEEData,
+    field_area,
+    refresh_observations, save_pest_upload, stored_time_series, utm_epsg,
+)
+
+POLYGON = {
+    "type": "Polygon",
+    "coordinates": [
+        [
+            [77.2090, 28.6139],
+            [77.2290, 28.6139],
+            [77.2290, 28.6339],
+            [77.2090, 28.6339],
+            [77.2090, 28.6139],
+        ]
+    ],
+}
+
+
+class FetchEEDataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="farmer", password="test")
+        FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        self.fake_ee = FakeEE()
+        patcher = mock.patch("field.utils.ee", self.fake_ee)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+
+    def test_batched_fetch_is_one_round_trip(self):
+        data = fetchEEData(self.user)
+
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+        serializer = FieldDataResponseSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertTrue(data["ndvi_time_series"])
+        self.assertTrue(data["ndwi_time_series"])
+
+    def test_batched_matches_sequential_payload(self):
+        batched = fetchEEData(self.user)
+        self.fake_ee.reset()
+        sequential = fetchEEData(self.user, batched=False, use_cache=False, incremental=False)
+
+        self.assertEqual(self.fake_ee.getinfo_calls, 6)
+        self.assertEqual(batched, sequential)
+
+    def test_time_series_has_one_row_per_date_with_all_indices(self):
+        data = fetchEEData(self.user)
+
+        rows = data["index_time_series"]
+        dates = [row["date"] for row in rows]
+        self.assertEqual(dates, sorted(set(dates)))
+        for row in rows:
+            self.assertEqual(set(row), {"date", "NDVI", "NDWI", "EVI", "SAVI", "cloud_fraction"})
+        self.assertEqual([r["NDWI"] for r in rows], [r["NDWI"] for r in data["ndwi_time_series"]])
+
+    def test_repeat_fetch_is_served_from_cache(self):
+        first = fetchEEData(self.user)
+        second = fetchEEData(self.user)
+
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+        self.assertEqual(first, second)
+
+    def test_save_polygon_invalidates_cached_observations(self):
+        fetchEEData(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+        moved = {**POLYGON, "coordinates": [[[x + 0.1, y] for x, y in POLYGON["coordinates"][0]]]}
+
+        client.post("/field/set_polygon", {"polygon": moved, "cropType": "Rice"}, format="json")
+        client.post("/field/set_polygon", {"polygon": POLYGON, "cropType": "Rice"}, format="json")
+        fetchEEData(self.user)
+
+        self.assertEqual(self.fake_ee.getinfo_calls, 2)
+
+
+NO_CLOUD_FILTER = {"MAX_SCENE_CLOUD_PCT": 100, "MASK": None, "MAX_FIELD_CLOUD_FRACTION": 1.0}
+
+
+class CloudFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="farmer", password="test")
+        FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        patcher = mock.patch("field.utils.ee", FakeEE())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def series(self):
+        return fetchEEData(self.user, use_cache=False, incremental=False)["index_time_series"]
+
+    def test_cloudy_scenes_are_dropped(self):
+        with override_settings(S2_CLOUD_FILTER=NO_CLOUD_FILTER):
+            unfiltered = self.series()
+        filtered = self.series()
+
+        self.assertLess(len(filtered), len(unfiltered))
+        self.assertTrue(filtered)
+        self.assertTrue(all(row["cloud_fraction"] <= 0.7 for row in filtered))
+
+    def test_cloud_fraction_without_pixel_mask_comes_from_scene_cover(self):
+        with override_settings(S2_CLOUD_FILTER=NO_CLOUD_FILTER):
+            rows = self.series()
+
+        self.assertTrue(any(row["cloud_fraction"] > 0.4 for row in rows))
+        self.assertTrue(all(0 <= row["cloud_fraction"] <= 1 for row in rows))
+
+    def test_scene_threshold_is_configurable(self):
+        with override_settings(S2_CLOUD_FILTER={**NO_CLOUD_FILTER, "MAX_SCENE_CLOUD_PCT": 25}):
+            rows = self.series()
+
+        self.assertTrue(rows)
+        self.assertTrue(all(row["cloud_fraction"] <= 0.25 for row in rows))
+
+    def test_qa60_mask_matches_scl(self):
+        scl = self.series()
+        with override_settings(S2_CLOUD_FILTER={"MASK": "QA60"}):
+            qa60 = self.series()
+
+        self.assertEqual(scl, qa60)
+
+
+class RasterStoreTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        # 200 x 200 pixel tiles keep the synthetic rasters small
+        settings_patch = override_settings(FIELD_RASTER_STORE={
+            "ENABLED": True, "ROOT": root, "SOURCE": "synthetic", "PIXEL_DEGREES": 0.0005,
+        })
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        get_raster_store.cache_clear()
+        self.addCleanup(get_raster_store.cache_clear)
+        self.fake_ee = FakeEE()
+        patcher = mock.patch("field.utils.ee", self.fake_ee)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+
+    def test_zonal_means_match_full_tile_masking(self):
+        store = get_raster_store()
+        rows, _ = raster_index_rows(POLYGON, "2024-06-01", "2024-07-01")
+        self.assertTrue(rows)
+
+        geometry = polygon_geometry(POLYGON)
+        (tile, _), = store.field_windows(POLYGON)
+        west, _, _, north = store.tile_bounds(tile)
+        centres = (np.arange(store.size) + 0.5) * store.pixel_degrees
+        inside = shapely.contains_xy(geometry, *np.meshgrid(west + centres, north - centres))
+        for date, cloud, *indices in rows:
+            raster = store.array(tile, datetime.date.fromisoformat(date)).astype(np.float32)
+            self.assertAlmostEqual(cloud, float(raster[-1][inside].mean()), places=5)
+            for value, band in zip(indices, raster[:-1]):
+                self.assertAlmostEqual(value, float(np.nanmean(band[inside])), places=5)
+
+    def test_neighbouring_fields_share_tile_fetches(self):
+        neighbour = {**POLYGON, "coordinates": [[[x + 0.02, y] for x, y in POLYGON["coordinates"][0]]]}
+        source = get_raster_store().source
+
+        raster_index_rows(POLYGON, "2024-06-01", "2024-07-01")
+        fetched = source.fetches
+        raster_index_rows(neighbour, "2024-06-01", "2024-07-01")
+        raster_index_rows(POLYGON, "2024-06-10", "2024-06-20")
+
+        self.assertGreater(fetched, 0)
+        self.assertEqual(source.fetches, fetched)
+
+    def manifest_windows(self, store, tile):
+        with open(os.path.join(store._tile_dir(tile), "manifest.json")) as f:
+            return json.load(f)["windows"]
+
+    def test_unsettled_days_are_refetched(self):
+        store = get_raster_store()
+        (tile, _), = store.field_windows(POLYGON)
+        start, end = datetime.date(2024, 6, 1), datetime.date(2024, 7, 1)
+
+        with mock.patch("field.rasters.settled_until", return_value=datetime.date(2024, 6, 15)):
+            first = store.ensure(tile, start, end)
+            self.assertEqual(self.manifest_windows(store, tile), [["2024-06-01", "2024-06-15"]])
+            # Only the unsettled part is fetched again
+            self.assertEqual(store.ensure(tile, start, end), store.ensure(tile, datetime.date(2024, 6, 15), end))
+            self.assertLess(store.ensure(tile, start, end), first)
+        with mock.patch("field.rasters.settled_until", return_value=datetime.date(2024, 8, 1)):
+            store.ensure(tile, start, end)
+            self.assertEqual(store.ensure(tile, start, end), 0)
+        self.assertEqual(self.manifest_windows(store, tile), [["2024-06-01", "2024-07-01"]])
+
+    def test_concurrent_stores_merge_manifest_windows(self):
+        root = get_raster_store().root
+
+        class SlowSource(SyntheticTileSource):
+            def scenes(self, *args):
+                time.sleep(0.05)
+                yield from super().scenes(*args)
+
+        # Separate stores stand in for separate worker processes: no shared in-process lock
+        stores = [RasterStore(root, SlowSource(), pixel_degrees=0.0005) for _ in range(2)]
+        tile = (772, 286)
+        windows = [(datetime.date(2024, 6, 1), datetime.date(2024, 6, 11)),
+                   (datetime.date(2024, 7, 1), datetime.date(2024, 7, 11))]
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(lambda args: args[0].ensure(tile, *args[1]), zip(stores, windows)))
+
+        self.assertEqual(self.manifest_windows(stores[0], tile),
+                         [["2024-06-01", "2024-06-11"], ["2024-07-01", "2024-07-11"]])
+
+    def test_field_fetch_reads_indices_from_store(self):
+        user = User.objects.create_user(username="farmer")
+        field = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+
+        data = fetchEEData(user)
+
+        # One round-trip for the non-Sentinel sections only
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+        self.assertIsNotNone(data["NDVI"])
+        self.assertTrue(data["index_time_series"])
+        self.assertTrue(all(row["cloud_fraction"] <= 0.7 for row in data["index_time_series"]))
+        self.assertEqual(refresh_observations(field, "2024-06-01", "2024-06-30"), 0)
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+
+
+class ZonalStatsTests(TestCase):
+    def setUp(self):
+        self.fake_ee = FakeEE()
+        for target in ("field.utils.ee", "field.zonal.ee"):
+            patcher = mock.patch(target, self.fake_ee)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+        self.user = User.objects.create_user(username="farmer")
+        FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _use_raster_store(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_patch = override_settings(FIELD_RASTER_STORE={
+            "ENABLED": True, "ROOT": root, "SOURCE": "synthetic", "PIXEL_DEGREES": 0.0005,
+        })
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        get_raster_store.cache_clear()
+        self.addCleanup(get_raster_store.cache_clear)
+
+    def test_stats_endpoint_is_one_round_trip(self):
+        response = self.client.get("/field/zonal_stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+
+        ndvi = response.data["indices"]["NDVI"]
+        self.assertEqual(set(ndvi["percentiles"]), {"10", "25", "50", "75", "90"})
+        self.assertEqual(len(ndvi["histogram"]["counts"]), HISTOGRAM_BINS)
+        self.assertLessEqual(ndvi["percentiles"]["10"], ndvi["percentiles"]["90"])
+
+        self.client.get("/field/zonal_stats")
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+
+    def test_local_stats_match_numpy(self):
+        self._use_raster_store()
+        composite = composite_pixels(POLYGON, "2024-06-01", "2024-07-01")
+        stats = zonal_stats(POLYGON, "2024-06-01", "2024-07-01")
+
+        ndvi = composite[0][~np.isnan(composite[0])]
+        self.assertEqual(stats["NDVI"]["pixels"], len(ndvi))
+        self.assertAlmostEqual(stats["NDVI"]["mean"], float(ndvi.mean()), places=5)
+        self.assertAlmostEqual(stats["NDVI"]["std"], float(ndvi.std()), places=5)
+        self.assertEqual(sum(stats["NDVI"]["histogram"]["counts"]), int(((ndvi >= -1) & (ndvi <= 1)).sum()))
+        self.assertEqual(self.fake_ee.getinfo_calls, 0)
+
+    def test_zones_cover_field_and_rank_cells(self):
+        response = self.client.get("/field/zones", {"cell_m": 500, "zones": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+
+        features = response.data["features"]
+        area = sum(polygon_geometry(f["geometry"]).area for f in features)
+        self.assertAlmostEqual(area, polygon_geometry(POLYGON).area, places=9)
+        by_zone = {}
+        for feature in features:
+            by_zone.setdefault(feature["properties"]["zone"], []).append(feature["properties"]["NDVI"])
+        self.assertEqual(set(by_zone), {1, 2, 3})
+        self.assertLessEqual(max(by_zone[1]), min(by_zone[3]))
+
+    def test_local_zones_average_pixels_per_cell(self):
+        self._use_raster_store()
+        zones = management_zones(POLYGON, "2024-06-01", "2024-07-01", cell_m=500)
+        self.assertTrue(all(f["properties"]["NDVI"] is not None for f in zones["features"]))
+        self.assertEqual(self.fake_ee.getinfo_calls, 0)
+
+    def test_zone_grid_limits_cells(self):
+        grid = ZoneGrid(POLYGON, 500)
+        self.assertEqual(len(grid.ids), grid.nx * grid.ny)
+        with self.assertRaises(ValueError):
+            ZoneGrid(_square(77.0, 28.0, size=1.0), 10)
+        self.assertGreater(len(ZoneGrid(POLYGON, 50).ids), 0)
+        self.assertLessEqual(len(ZoneGrid(POLYGON, 50).ids), MAX_ZONE_CELLS)
+
+        response = self.client.get("/field/zones", {"cell_m": 5})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/field/zones", {"index": "LAI"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SeasonTests(TestCase):
+    def setUp(self):
+        self.fake_ee = FakeEE()
+        for target in ("field.utils.ee", "field.seasons.ee", "field.zonal.ee"):
+            patcher = mock.patch(target, self.fake_ee)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+        self.user = User.objects.create_user(username="farmer")
+        self.field = FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_season_windows(self):
+        self.assertEqual(season_window("kharif", 2024), (datetime.date(2024, 6, 1), datetime.date(2024, 11, 1)))
+        self.assertEqual(season_window("rabi", 2024), (datetime.date(2024, 11, 1), datetime.date(2025, 4, 1)))
+        self.assertEqual(recent_season_years("kharif", 3, datetime.date(2025, 5, 1)), [2022, 2023, 2024])
+        self.assertEqual(recent_season_years("rabi", 2, datetime.date(2025, 2, 1)), [2023, 2024])
+        with self.assertRaises(ValueError):
+            season_window("zaid", 2024)
+
+    def test_history_fetches_each_season_once(self):
+        today = datetime.date(2025, 8, 15)
+        history, fetched = season_history(self.field, "kharif", 5, today=today)
+
+        self.assertEqual(fetched, 5)
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+        self.assertEqual([row["year"] for row in history], [2021, 2022, 2023, 2024, 2025])
+        self.assertTrue(all(row["scenes"] and row["NDVI"]["mean"] is not None for row in history))
+        self.assertEqual([row["complete"] for row in history], [True] * 4 + [False])
+        # Capped at settled_until: the last S2_INGEST_MARGIN_DAYS may still be ingesting
+        self.assertEqual(history[-1]["end"], "2025-08-10")
+
+        # Same day: all stored; next day: only the season in progress
+        again, fetched = season_history(self.field, "kharif", 5, today=today)
+        self.assertEqual((fetched, self.fake_ee.getinfo_calls), (0, 1))
+        self.assertEqual(again, history)
+        _, fetched = season_history(self.field, "kharif", 5, today=today + datetime.timedelta(days=1))
+        self.assertEqual((fetched, self.fake_ee.getinfo_calls), (1, 2))
+        self.assertEqual(SeasonSummary.objects.filter(field=self.field).count(), 5)
+
+    def test_season_ending_inside_ingest_margin_is_refetched(self):
+        # Kharif 2024 ended on 2024-11-01, two days ago
+        today = datetime.date(2024, 11, 3)
+        history, _ = season_history(self.field, "kharif", 1, today=today)
+        self.assertEqual(history[0]["end"], "2024-10-29")
+        self.assertFalse(history[0]["complete"])
+
+        _, fetched = season_history(self.field, "kharif", 1, today=datetime.date(2024, 11, 5))
+        self.assertEqual(fetched, 1)
+        history, fetched = season_history(self.field, "kharif", 1, today=datetime.date(2024, 11, 6))
+        self.assertEqual(fetched, 1)
+        self.assertEqual(history[0]["end"], "2024-11-01")
+        self.assertTrue(history[0]["complete"])
+        # Settled: served from the stored row from now on
+        _, fetched = season_history(self.field, "kharif", 1, today=datetime.date(2024, 12, 1))
+        self.assertEqual(fetched, 0)
+
+    def test_history_endpoint(self):
+        response = self.client.get("/field/seasons", {"season": "rabi", "years": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["seasons"]), 3)
+        self.assertEqual(response.data["fetched_seasons"], 3)
+        self.assertEqual(self.client.get("/field/seasons", {"season": "rabi", "years": 3}).data["fetched_seasons"], 0)
+        self.assertEqual(self.client.get("/field/seasons", {"season": "monsoon"}).status_code, 400)
+
+    def test_endpoints_take_windows(self):
+        response = self.client.get("/field/awd", {"start": "2024-07-01", "end": "2024-08-01"})
+        self.assertEqual(response.status_code, 200)
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.observations_synced_from, datetime.date(2024, 7, 1))
+
+        response = self.client.get("/field/zonal_stats", {"season": "kharif", "year": 2023})
+        self.assertEqual((response.data["start"], response.data["end"]), ("2023-06-01", "2023-11-01"))
+
+        for params in (
+            {"start": "2024-08-01", "end": "2024-07-01"},
+            {"start": "2020-01-01", "end": "2024-01-01"},
+            {"start": "2024-07-01"},
+            {"season": "kharif", "start": "2024-07-01", "end": "2024-08-01"},
+            {"year": 2024},
+        ):
+            self.assertEqual(self.client.get("/field/ee", params).status_code, 400, params)
+
+    def test_async_endpoints_take_windows(self):
+        token = Token.objects.create(user=self.user).key
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + token)
+
+        self.assertEqual(client.get("/field/async/awd", {"season": "kharif", "year": 2024}).status_code, 200)
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.observations_synced_from, datetime.date(2024, 6, 1))
+        self.assertEqual(client.get("/field/async/ee", {"season": "summer"}).status_code, 400)
+
+
+class AsyncFieldDataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="farmer", password="test")
+        self.field = FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        self.fake_ee = FakeEE(latency=0.1)
+        patcher = mock.patch("field.utils.ee", self.fake_ee)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+
+    async def test_sub_queries_run_concurrently(self):
+        started = time.perf_counter()
+        data = await afetch_field_data(self.field, use_cache=False)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(self.fake_ee.getinfo_calls, 6)
+        self.assertLess(elapsed, 0.3)
+        self.assertTrue(data["ndwi_time_series"])
+
+    def test_async_endpoint_matches_sync_endpoint(self):
+        token = Token.objects.create(user=self.user).key
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + token)
+
+        async_data = client.get("/field/async/ee").json()
+        sync_data = client.get("/field/ee").json()
+
+        self.assertEqual(async_data, sync_data)
+        self.assertEqual(client.get("/field/async/awd").status_code, 200)
+        self.assertEqual(APIClient().get("/field/async/ee").status_code, 401)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="farmer", password="test")
+        FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        patcher = mock.patch("field.utils.ee", FakeEE())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+        metrics.reset()
+        self.token = Token.objects.create(user=self.user).key
+
+    def test_server_timing_and_metrics(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+
+        timing = client.get("/field/ee")["Server-Timing"]
+        self.assertRegex(timing, r"ee;dur=[\d.]+")
+        self.assertIn('ee_calls;desc="1"', timing)
+        self.assertRegex(timing, r"total;dur=[\d.]+$")
+        # Served from the observation cache the second time
+        self.assertNotIn("ee_calls", client.get("/field/ee")["Server-Timing"])
+
+        # Not for ordinary users; a scraper presents METRICS_TOKEN
+        self.assertEqual(client.get("/metrics").status_code, 403)
+        with self.settings(METRICS_TOKEN="scrape-secret"):
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret").content.decode()
+        self.assertIn('krishisaarthi_request_duration_seconds_count{view="fieldData",method="GET",status="200"} 2', body)
+        self.assertIn('krishisaarthi_stage_duration_seconds_count{stage="ee"} 1', body)
+        self.assertIn("krishisaarthi_ee_calls_total 1", body)
+
+    def test_staff_can_read_metrics(self):
+        staff = User.objects.create_user(username="ops", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    async def test_async_views_collect_spans_from_worker_threads(self):
+        response = await AsyncClient().get(
+            "/field/async/ee", headers={"Authorization": "Token " + self.token}
+        )
+
+        self.assertIn('ee_calls;desc="6"', response["Server-Timing"])
+
+    def test_slow_requests_are_profiled(self):
+        profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_dir, ignore_errors=True)
+
+        with self.settings(REQUEST_PROFILE_SAMPLE_RATE=1.0, REQUEST_PROFILE_SLOW_MS=0,
+                           REQUEST_PROFILE_DIR=profile_dir):
+            self.client.get("/metrics")
+
+        (dump,) = os.listdir(profile_dir)
+        self.assertTrue(dump.endswith("-metrics-%d.prof" % os.getpid()))
+
+
+class BenchmarkHarnessTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="farmer")
+        self.field = FieldData.objects.create(user=self.user, cropType="Rice", polygon=POLYGON)
+        get_observation_cache().clear()
+
+    def test_fake_ee_replays_recorded_responses(self):
+        recorder = RecordingEE(FakeEE(), recording={}, record=True)
+        with mock.patch("field.utils.ee", recorder):
+            live = fetchEEData(self.user, use_cache=False, incremental=False)
+        self.assertEqual(len(recorder.recording), 1)
+
+        # Doctor the recording: replays must come from it, not the synthetic data
+        (key,) = recorder.recording
+        recorder.recording[key]["rainfall"]["precipitation"] = 123.0
+        get_observation_cache().clear()
+        replayer = RecordingEE(FakeEE(), recording=recorder.recording)
+        # Keys are the query expressions, so they still match when the backend's answers change
+        with mock.patch("field.utils.ee", replayer), mock.patch("field.fake_ee._seeded", return_value=0.0):
+            replayed = fetchEEData(self.user, use_cache=False, incremental=False)
+
+        self.assertEqual(replayer.replayed_calls, 1)
+        self.assertEqual(replayer.backend.getinfo_calls, 1)
+        self.assertEqual(replayed["rainfall_mm"], 123.0)
+        self.assertEqual(replayed["ndvi_time_series"], live["ndvi_time_series"])
+
+        # A different window is a different expression
+        replayer.reset()
+        get_observation_cache().clear()
+        with mock.patch("field.utils.ee", replayer):
+            fetchEEData(self.user, start_date="2024-02-01", use_cache=False, incremental=False)
+        self.assertEqual(replayer.replayed_calls, 0)
+
+    def test_percentiles_and_regressions(self):
+        latencies = sorted(float(ms) for ms in range(1, 101))
+        self.assertEqual([percentile(latencies, p) for p in (50, 95, 99)], [50.0, 95.0, 99.0])
+
+        baseline = {"endpoints": {"ee": {
+            "p95_ms": 100.0, "throughput_rps": 10.0, "peak_python_heap_mb": 5.0, "ee_calls_per_request": 1.0,
+        }}}
+        within = {"ee": {"p95_ms": 120.0, "throughput_rps": 8.0, "peak_python_heap_mb": 5.5, "ee_calls_per_request": 1.0}}
+        worse = {"ee": {"p95_ms": 130.0, "throughput_rps": 7.0, "peak_python_heap_mb": 5.0, "ee_calls_per_request": 2.0}}
+
+        self.assertEqual(compare(within, baseline, tolerance=0.25), [])
+        self.assertEqual(
+            compare(worse, baseline, tolerance=0.25),
+            ["ee: p95_ms 100.0 -> 130.0", "ee: throughput_rps 10.0 -> 7.0", "ee: ee_calls_per_request 1.0 -> 2.0"],
+        )
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="farmer", password="test")
+        FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        self.fake_ee = FakeEE()
+        patcher = mock.patch("field.utils.ee", self.fake_ee)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_observation_cache().clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+
+    def test_all_parts_share_one_fetch(self):
+        response = self.client.get("/field/dashboard")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fake_ee.getinfo_calls, 1)
+        payload = response.json()
+        self.assertEqual(set(payload), {"ee", "awd", "cc", "risk", "health", "timings_ms"})
+        self.assertIn("fetch", payload["timings_ms"])
+
+    def test_parts_selector(self):
+        payload = self.client.get("/field/dashboard?parts=awd,cc").json()
+
+        self.assertEqual(set(payload), {"awd", "cc", "timings_ms"})
+        self.assertNotIn("risk", payload["timings_ms"])
+        self.assertEqual(self.client.get("/field/dashboard?parts=bogus").status_code, 400)
+
+
+class BatchFieldIndicesTests(TestCase):
+    def setUp(self):
+        self.fake_ee = FakeEE()
+        for target in ("field.utils.ee", "field.batch.ee"):
+            patcher = mock.patch(target, self.fake_ee)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.fields = [
+            (f"plot-{i}", {**POLYGON, "coordinates": [[[x + i * 0.01, y] for x, y in POLYGON["coordinates"][0]]]})
+            for i in range(25)
+        ]
+
+    def test_round_trips_grow_with_chunks_not_fields(self):
+        results = fetch_fields_indices(self.fields, chunk_size=10)
+
+        self.assertEqual(self.fake_ee.getinfo_calls, 3)
+        self.assertEqual(len(results), 25)
+        self.assertNotEqual(results["plot-0"]["NDVI"], results["plot-1"]["NDVI"])
+
+    def test_time_series_matches_single_field_fetch(self):
+        user = User.objects.create_user(username="farmer", password="test")
+        FieldData.objects.create(user=user, cropType="Rice", polygon=self.fields[3][1])
+
+        results = fetch_fields_indices(self.fields, time_series=True)
+        single = fetchEEData(user, use_cache=False, incremental=False)
+
+        self.assertEqual(results["plot-3"]["index_time_series"], single["index_time_series"])
+
+    def test_endpoint_validates_window_and_ids(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="farmer"))
+        fields = [{"id": field_id, "polygon": polygon} for field_id, polygon in self.fields[:2]]
+
+        response = client.post("/field/batch", {"fields": fields, "season": "kharif", "year": 2024}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["fields"]), 2)
+
+        for body in (
+            {"fields": fields, "start": "June", "end": "2024-07-01"},
+            {"fields": fields, "start": "2024-07-01", "end": "2024-06-01"},
+            {"fields": fields, "start": "2020-01-01", "end": "2024-01-01"},
+            {"fields": fields + fields[:1]},
+            [fields],
+            {"fields": ["plot-0"]},
+            {"fields": [{"id": ["plot-0"], "polygon": POLYGON}]},
+            {"fields": [{"id": "plot-0", "polygon": {"type": "MultiPolygon", "coordinates": []}}]},
+            {"fields": []},
+        ):
+            self.assertEqual(client.post("/field/batch", body, format="json").status_code, 400, body)
+
+    def test_endpoint_reports_unknown_field_ids(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        field = FieldData.objects.create(user=User.objects.create_user(username="farmer"),
+                                         cropType="Rice", polygon=POLYGON)
+
+        response = client.post("/field/batch", {"field_ids": [field.pk, field.pk + 100]}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["id"] for entry in response.data["fields"]], [field.pk])
+        self.assertEqual(response.data["unknown_field_ids"], [field.pk + 100])
+
+
+class IncrementalObservationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="farmer", password="test")
+        self.field = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        self.fake_ee = FakeEE()
+        patcher = mock.patch("field.utils.ee", self.fake_ee)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_unsynced_days_are_fetched(self):
+        refresh_observations(self.field, "2024-06-01", "2024-06-16")
+        june_first_half = FieldObservation.objects.count()
+
+        self.assertEqual(refresh_observations(self.field, "2024-06-01", "2024-06-16"), 0)
+        self.assertEqual(refresh_observations(self.field, "2024-06-01", "2024-07-01"), 1)
+        self.assertEqual(self.fake_ee.getinfo_calls, 2)
+        self.assertGreater(FieldObservation.objects.count(), june_first_half)
+
+    def test_only_missing_edges_are_fetched(self):
+        refresh_observations(self.field, "2024-06-10", "2024-06-20")
+        with mock.patch("field.utils._index_rows_query", wraps=_index_rows_query) as query:
+            self.assertEqual(refresh_observations(self.field, "2024-06-01", "2024-07-01"), 1)
+
+        windows = [call.args[1:] for call in query.call_args_list]
+        self.assertEqual(windows, [
+            (datetime.date(2024, 6, 1), datetime.date(2024, 6, 10)),
+            (datetime.date(2024, 6, 20), datetime.date(2024, 7, 1)),
+        ])
+        self.field.refresh_from_db()
+        self.assertEqual(
+            (self.field.observations_synced_from, self.field.observations_synced_until),
+            (datetime.date(2024, 6, 1), datetime.date(2024, 7, 1)),
+        )
+
+    @override_settings(S2_INGEST_MARGIN_DAYS=5)
+    def test_recent_days_are_refetched(self):
+        today = datetime.date.today()
+        start, end = today - datetime.timedelta(days=30), today + datetime.timedelta(days=1)
+        refresh_observations(self.field, start.isoformat(), end.isoformat())
+        self.field.refresh_from_db()
+        self.assertEqual(self.field.observations_synced_until, today - datetime.timedelta(days=5))
+
+        # Scenes acquired in the margin may still be ingested: fetched again
+        self.assertEqual(refresh_observations(self.field, start.isoformat(), end.isoformat()), 1)
+        self.assertEqual(self.fake_ee.getinfo_calls, 2)
+
+    def test_incremental_series_matches_full_fetch(self):
+        user = self.field.user
+        refresh_observations(self.field, "2024-06-01", "2024-06-16")
+
+        incremental = fetchEEData(user, use_cache=False)
+        full = fetchEEData(user, use_cache=False, incremental=False)
+
+        self.assertEqual(incremental["index_time_series"], full["index_time_series"])
+        self.assertEqual(
+            stored_time_series(self.field, "2024-06-10", "2024-06-20"),
+            [r for r in full["index_time_series"] if "2024-06-10" <= r["date"] < "2024-06-20"],
+        )
+
+
+class RefreshFieldsCommandTests(TestCase):
+    def setUp(self):
+        settings_patch = override_settings(FIELD_OBSERVATION_CACHE={"BACKEND": "database"})
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        get_observation_cache.cache_clear()
+        self.addCleanup(get_observation_cache.cache_clear)
+
+    def test_refuses_in_memory_cache(self):
+        with override_settings(FIELD_OBSERVATION_CACHE={"BACKEND": "memory"}):
+            get_observation_cache.cache_clear()
+            with self.assertRaises(CommandError):
+                call_command("refresh_fields", stdout=StringIO())
+
+    def test_prewarms_every_field_and_retries_quota_errors(self):
+        users = [User.objects.create_user(username=f"farmer{i}") for i in range(3)]
+        for i, user in enumerate(users):
+            polygon = {**POLYGON, "coordinates": [[[x + i, y] for x, y in POLYGON["coordinates"][0]]]}
+            FieldData.objects.create(user=user, cropType="Rice", polygon=polygon)
+        get_observation_cache().clear()
+        fake_ee = FakeEE()
+        fake_ee.fail_next(2)
+        out = StringIO()
+
+        with mock.patch("field.utils.ee", fake_ee):
+            call_command("refresh_fields", concurrency=2, backoff=0, stdout=out)
+            self.assertEqual(fake_ee.getinfo_calls, 5)
+
+            fake_ee.reset()
+            for user in users:
+                fetchEEData(user)
+            self.assertEqual(fake_ee.getinfo_calls, 0)
+        self.assertIn("Refreshed 3/3 fields (0 failed)", out.getvalue())
+
+
+class ObservationCacheBackendTests(TestCase):
+    def test_memory_backend_evicts_least_recently_used(self):
+        cache = MemoryBackend(ttl=60, max_entries=2)
+        cache.set("a", "ds", "2024-06-01", "2024-06-30", 1)
+        cache.set("b", "ds", "2024-06-01", "2024-06-30", 2)
+        cache.get("a", "ds", "2024-06-01", "2024-06-30")
+        cache.set("c", "ds", "2024-06-01", "2024-06-30", 3)
+
+        self.assertEqual(cache.get("a", "ds", "2024-06-01", "2024-06-30"), 1)
+        self.assertIsNone(cache.get("b", "ds", "2024-06-01", "2024-06-30"))
+
+    def test_memory_backend_copies_on_set(self):
+        cache = MemoryBackend(ttl=60, max_entries=2)
+        payload = {"NDVI": 0.5}
+        cache.set("a", "ds", "2024-06-01", "2024-06-30", payload)
+        payload["NDVI"] = 0.9
+
+        self.assertEqual(cache.get("a", "ds", "2024-06-01", "2024-06-30"), {"NDVI": 0.5})
+
+    def test_expired_entries_are_misses(self):
+        for cache in (MemoryBackend(ttl=-1, max_entries=2), DatabaseBackend(ttl=-1, max_entries=2)):
+            cache.set("a", "ds", "2024-06-01", "2024-06-30", {"NDVI": 0.5})
+            self.assertIsNone(cache.get("a", "ds", "2024-06-01", "2024-06-30"))
+
+    def test_database_backend_is_bounded(self):
+        cache = DatabaseBackend(ttl=60, max_entries=2)
+        for name in "abc":
+            cache.set(name, "ds", "2024-06-01", "2024-06-30", {"NDVI": 0.5})
+
+        self.assertEqual(cache.model.objects.count(), 2)
+        self.assertIsNone(cache.get("a", "ds", "2024-06-01", "2024-06-30"))
+
+
+class MicroBatcherTests(TestCase):
+    def test_concurrent_submissions_share_a_batch(self):
+        batcher = MicroBatcher(lambda items: [i * 2 for i in items], max_batch_size=8, max_latency_ms=200)
+
+        futures = [batcher.submit(i) for i in range(8)]
+
+        self.assertEqual([f.result(timeout=5) for f in futures], [i * 2 for i in range(8)])
+        self.assertEqual(list(batcher.batch_sizes), [8])
+
+    def test_latency_counts_from_submission(self):
+        release = threading.Event()
+        batcher = MicroBatcher(lambda items: [release.wait(5) and i for i in items], max_batch_size=8, max_latency_ms=100)
+
+        # A full first batch keeps the worker busy while the next items queue up
+        first = [batcher.submit(i) for i in range(8)]
+        time.sleep(0.02)
+        waiting = [batcher.submit(i) for i in range(8, 10)]
+        time.sleep(0.2)
+        release.set()
+        started = time.perf_counter()
+        [f.result(timeout=5) for f in first + waiting]
+
+        # Already past their deadline: dispatched at once rather than after another 100 ms
+        self.assertLess(time.perf_counter() - started, 0.08)
+
+    def test_batch_history_is_bounded(self):
+        batcher = MicroBatcher(lambda items: items, max_batch_size=1, max_latency_ms=0, history=4)
+        for i in range(10):
+            batcher.submit(i).result(timeout=5)
+
+        self.assertEqual(list(batcher.batch_sizes), [1] * 4)
+
+    def test_errors_reach_every_caller(self):
+        def fail(items):
+            raise ValueError("bad batch")
+        batcher = MicroBatcher(fail, max_batch_size=2, max_latency_ms=50)
+
+        futures = [batcher.submit(i) for i in range(2)]
+
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+
+
+def _jpeg_bytes(size):
+    buf = io.BytesIO()
+    Image.open("../sample.jpg").convert("RGB").resize(size).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class PestUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_patch = override_settings(MEDIA_ROOT=media_root, PEST_ASYNC_SAVE=False)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        self.user = User.objects.create_user(username="farmer", password="test")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=self.user).key)
+
+    def test_draft_decode_close_to_full_decode(self):
+        data = _jpeg_bytes((4000, 3000))
+
+        fast = preprocess(data)
+        full = transform(Image.open(io.BytesIO(data)).convert("RGB"))
+
+        self.assertEqual(fast.shape, (3, 224, 224))
+        self.assertLess(float((fast - full).abs().mean()), 0.02)
+        self.assertTrue(fast.equal(preprocess(io.BytesIO(data))))
+
+    def test_report_predicts_from_memory_and_saves_upload(self):
+        upload = SimpleUploadedFile("leaf.jpg", _jpeg_bytes((1600, 1200)), content_type="image/jpeg")
+
+        response = self.client.post("/pest", {"image": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(response.json()["class"], {"Healthy", "Infested"})
+        pest = Pest.objects.get(user=self.user)
+        self.assertTrue(pest.image.name.startswith("pest/leaf"))
+        self.assertEqual(pest.image.size, upload.size)
+
+
+    def test_duplicate_upload_reuses_file_and_result(self):
+        data = _jpeg_bytes((800, 600))
+
+        with mock.patch("models.cnn.predict_health_batched", wraps=predict_health_batched) as predict:
+            for name in ("a.jpg", "b.jpg"):
+                upload = SimpleUploadedFile(name, data, content_type="image/jpeg")
+                self.client.post("/pest", {"image": upload}, format="multipart")
+            self.assertEqual(predict.call_count, 1)
+
+            first, second = Pest.objects.order_by("pk")
+            self.assertEqual(first.image.name, second.image.name)
+            self.assertEqual(first.result, second.result)
+
+            # New weights invalidate the cached result but keep the stored file
+            with mock.patch("models.cnn.model_version", return_value="eager:retrained"):
+                upload = SimpleUploadedFile("c.jpg", data, content_type="image/jpeg")
+                self.client.post("/pest", {"image": upload}, format="multipart")
+            self.assertEqual(predict.call_count, 2)
+            self.assertEqual(Pest.objects.latest("pk").image.name, first.image.name)
+
+    def test_failed_background_save_is_logged(self):
+        with override_settings(PEST_ASYNC_SAVE=True), \
+                mock.patch("field.utils._create_pest", side_effect=RuntimeError("disk full")), \
+                self.assertLogs("field.utils", level="ERROR") as logs:
+            future = save_pest_upload(self.user, "leaf.jpg", b"jpeg")
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+            # Callbacks run right after the result is set; give the worker a moment
+            time.sleep(0.05)
+
+        self.assertIn("disk full", "\n".join(logs.output))
+
+
+class PestHeatmapTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_patch = override_settings(MEDIA_ROOT=media_root, PEST_ASYNC_SAVE=False)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        self.clients = []
+        # Two neighbours share a 0.05 degree tile; the third is ~50 km away
+        for i, (x, y) in enumerate(((77.2010, 28.6010), (77.2210, 28.6110), (77.7010, 28.6010))):
+            user = User.objects.create_user(username=f"farmer{i}")
+            FieldData.objects.create(user=user, cropType="Rice", polygon=_square(x, y))
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+            self.clients.append(client)
+
+    def report(self, client, verdict, data=None):
+        # Distinct photos, so duplicate detection doesn't reuse an earlier verdict
+        data = data or _jpeg_bytes((320 + Pest.objects.count(), 240))
+        upload = SimpleUploadedFile("leaf.jpg", data, content_type="image/jpeg")
+        result = {"probability": 0.2 if verdict == "Infested" else 0.8, "class": verdict}
+        with mock.patch("models.cnn.predict_health_batched", return_value=result):
+            return client.post("/pest", {"image": upload}, format="multipart")
+
+    def test_reports_are_tagged_and_counted_per_tile(self):
+        self.report(self.clients[0], "Infested")
+        self.report(self.clients[1], "Healthy")
+        self.report(self.clients[1], "Infested")
+        self.report(self.clients[2], "Infested")
+
+        pest = Pest.objects.filter(user__username="farmer0").get()
+        self.assertAlmostEqual(pest.lon, 77.2060)
+        self.assertAlmostEqual(pest.lat, 28.6060)
+        self.assertTrue(pest.infested)
+
+        response = self.clients[0].get("/field/pest_heatmap", {"bbox": "77.0,28.5,78.0,28.7"})
+        self.assertEqual(response.status_code, 200)
+        cells = response.json()["cells"]
+        self.assertEqual([(c["reports"], c["infested"]) for c in cells], [(3, 2), (1, 1)])
+        self.assertEqual(cells[0]["tile"], [1544, 572])
+
+        nearby = self.clients[0].get("/field/pest_heatmap", {"bbox": "77.1,28.5,77.3,28.7"}).json()
+        self.assertEqual(len(nearby["cells"]), 1)
+        past = self.clients[0].get(
+            "/field/pest_heatmap", {"bbox": "77.0,28.5,78.0,28.7", "start": "2020-01-01", "end": "2020-02-01"}
+        ).json()
+        self.assertEqual(past["cells"], [])
+
+    def test_rebuild_matches_incremental_counts(self):
+        for client, verdict in zip(self.clients, ("Infested", "Healthy", "Healthy")):
+            self.report(client, verdict)
+        incremental = list(PestTileCount.objects.values_list("day", "tile_x", "tile_y", "reports", "infested"))
+
+        call_command("rebuild_pest_tiles", stdout=StringIO())
+
+        rebuilt = PestTileCount.objects.values_list("day", "tile_x", "tile_y", "reports", "infested")
+        self.assertCountEqual(rebuilt, incremental)
+
+    def tile_counts(self):
+        return sorted(PestTileCount.objects.values_list("tile_x", "reports", "infested"))
+
+    def test_deleted_reports_are_uncounted(self):
+        self.report(self.clients[0], "Infested")
+        self.report(self.clients[0], "Healthy")
+        self.report(self.clients[2], "Infested")
+
+        Pest.objects.filter(user__username="farmer0", infested=True).delete()
+        self.assertEqual(self.tile_counts(), [(1544, 1, 0), (1554, 1, 1)])
+
+        # Cascades from a deleted user too, and empty tiles go away
+        User.objects.get(username="farmer2").delete()
+        self.assertEqual(self.tile_counts(), [(1544, 1, 0)])
+
+    def test_duplicate_uploads_count_once_per_user(self):
+        photo = _jpeg_bytes((400, 300))
+        self.report(self.clients[0], "Infested", photo)
+        self.report(self.clients[0], "Infested", photo)
+        # The neighbour sharing the tile reporting the same photo is a second report
+        self.report(self.clients[1], "Infested", photo)
+        self.assertEqual(self.tile_counts(), [(1544, 2, 2)])
+
+        # Deleting the counted copy counts the remaining one instead
+        Pest.objects.filter(user__username="farmer0").order_by("pk").first().delete()
+        self.assertEqual(self.tile_counts(), [(1544, 2, 2)])
+        Pest.objects.filter(user__username="farmer0").delete()
+        self.assertEqual(self.tile_counts(), [(1544, 1, 1)])
+
+        self.report(self.clients[1], "Infested", photo)
+        incremental = self.tile_counts()
+        call_command("rebuild_pest_tiles", stdout=StringIO())
+        self.assertEqual(self.tile_counts(), incremental)
+
+    def test_retag_counts_untagged_reports_once(self):
+        self.report(self.clients[0], "Infested")
+        Pest.objects.create(user=User.objects.get(username="farmer1"), image="pest/old.jpg",
+                            result={"class": "Healthy"})
+        self.assertEqual(self.tile_counts(), [(1544, 1, 1)])
+
+        for _ in range(2):
+            call_command("rebuild_pest_tiles", "--retag", stdout=StringIO())
+            self.assertEqual(self.tile_counts(), [(1544, 2, 1)])
+
+        Pest.objects.filter(user__username="farmer1").delete()
+        self.assertEqual(self.tile_counts(), [(1544, 1, 1)])
+
+    def test_migrations_tag_and_recount_reports(self):
+        heatmap_migration = importlib.import_module("field.migrations.0008_pest_heatmap")
+        counted_migration = importlib.import_module("field.migrations.0010_pest_counted")
+        photo = _jpeg_bytes((400, 300))
+        for client in (self.clients[0], self.clients[0], self.clients[2]):
+            self.report(client, "Infested", photo)
+        expected = self.tile_counts()
+        Pest.objects.update(field=None, lon=None, lat=None, infested=None, counted=False)
+        PestTileCount.objects.all().delete()
+
+        heatmap_migration.tag_and_count_reports(django_apps, None)
+        self.assertEqual(self.tile_counts(), [(1544, 2, 2), (1554, 1, 1)])
+        counted_migration.recount_without_duplicates(django_apps, None)
+        self.assertEqual(self.tile_counts(), expected)
+
+    def test_bad_bbox_is_rejected(self):
+        for bbox in ("1,2,3", "78,28,77,29", "0,0,10,10"):
+            with self.subTest(bbox=bbox), override_settings(PEST_TILE_DEGREES=0.01):
+                response = self.clients[0].get("/field/pest_heatmap", {"bbox": bbox})
+                self.assertEqual(response.status_code, 400)
+
+
+class AWDBatchTests(TestCase):
+    def test_matches_scalar_detector(self):
+        rng = random.Random(7)
+        series = [
+            [{"NDWI": rng.choice([None, rng.uniform(0.05, 0.45)])} for _ in range(rng.randint(0, 30))]
+            for _ in range(300)
+        ]
+
+        batch = detect_awd_batch(ndwi_matrix(series))
+
+        for i, entries in enumerate(series):
+            clear = [e for e in entries if e["NDWI"] is not None]
+            scalar = detect_awd_from_ndwi(clear)
+            self.assertEqual(batch["cycles_count"][i], scalar["cycles_count"])
+            self.assertEqual(batch["dry_days_detected"][i], scalar["dry_days_detected"])
+            self.assertEqual(bool(batch["awd_detected"][i]), scalar["awd_detected"])
+
+    def test_dry_spells_skip_cloudy_dates(self):
+        nan = math.nan
+        batch = detect_awd_batch([
+            [0.35, 0.1, nan, 0.15, 0.25, 0.1, 0.4],
+            [nan, nan, nan, nan, nan, nan, nan],
+        ])
+
+        self.assertEqual(batch["dry_spell_count"].tolist(), [2, 0])
+        self.assertEqual(batch["longest_dry_spell"].tolist(), [2, 0])
+        self.assertEqual(batch["cycles_count"].tolist(), [1, 0])
+        self.assertAlmostEqual(batch["dry_fraction"][0], 3 / 6)
+        self.assertEqual(batch["dry_fraction"][1], 0.0)
+
+
+class CarbonBatchTests(TestCase):
+    def test_water_and_credits_follow_compliance_fraction(self):
+        batch = calculate_carbon_metrics_batch([1.0, 2.0, 2.0], [0.0, 1.0, 0.5], crop_days=[100, 100, 120])
+
+        for i, awd in enumerate([False, True]):
+            scalar = calculate_carbon_metrics(area_hectare=batch["area_hectare"][i], ndwi_based_awd=awd)
+            self.assertEqual(batch["water_saved_mm"][i], scalar["water_saved_mm"])
+            self.assertEqual(batch["water_saved_cubic_m"][i], scalar["water_saved_cubic_m"])
+            for name in ("methane_reduction_kg", "co2e_reduction_ton", "carbon_credits", "estimated_value_inr"):
+                self.assertEqual(batch[name][i], scalar[name], name)
+        # 0.5 * (1.3 kg/ha/day * 2 ha * 120 days - 0.35)
+        self.assertAlmostEqual(batch["methane_reduction_kg"][2], 155.82, places=1)
+        # /field/cc's figures are unchanged
+        self.assertEqual(calculate_carbon_metrics(area_hectare=1.0, ndwi_based_awd=True)["methane_reduction_kg"], 129.65)
+        self.assertEqual(batch["methane_reduction_kg"][0], 0.0)
+
+    def test_report_streams_in_chunks(self):
+        out = StringIO()
+
+        rows = write_carbon_report(out, [10, 11, 12], [1.0, 2.0, 3.0], 1.0, chunk_size=2, crop_days=[90, 100, 110])
+
+        lines = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(rows, 3)
+        self.assertEqual([line["field_id"] for line in lines], ["10", "11", "12"])
+        expected = calculate_carbon_metrics_batch(3.0, 1.0, crop_days=110)
+        self.assertEqual(float(lines[2]["carbon_credits"]), expected["carbon_credits"])
+
+    def test_command_uses_stored_ndwi(self):
+        user = User.objects.create_user(username="farmer")
+        field = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        for day, ndwi in enumerate([0.35, 0.1, 0.15, 0.4, 0.1, 0.35], start=1):
+            FieldObservation.objects.create(field=field, date=f"2024-06-{day:02d}", ndwi=ndwi)
+        path = os.path.join(tempfile.mkdtemp(), "report.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+
+        call_command("carbon_report", path, stdout=StringIO())
+
+        with open(path) as f:
+            (line,) = csv.DictReader(f)
+        self.assertEqual(line["field_id"], str(field.pk))
+        self.assertEqual(float(line["awd_effective_fraction"]), 1.0)
+
+
+class AreaTests(TestCase):
+    def test_backfill_migrations_skip_malformed_polygons(self):
+        area_migration = importlib.import_module("field.migrations.0006_fielddata_area_hectares")
+        bounds_migration = importlib.import_module("field.migrations.0007_fielddata_bbox")
+        user = User.objects.create_user(username="farmer")
+        good = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        bad = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        FieldData.objects.filter(pk=bad.pk).update(polygon={"type": "Polygon", "coordinates": [[[77.2, 28.6]]]})
+        FieldData.objects.update(area_hectares=None, min_lon=None, min_lat=None, max_lon=None, max_lat=None)
+
+        area_migration.backfill_areas(django_apps, None)
+        bounds_migration.backfill_bounds(django_apps, None)
+
+        good.refresh_from_db()
+        self.assertAlmostEqual(good.area_hectares, calculate_area_in_hectares(POLYGON["coordinates"][0]), places=6)
+        self.assertEqual(good.min_lon, 77.2090)
+        bad.refresh_from_db()
+        self.assertIsNone(bad.area_hectares)
+        self.assertEqual(bad.min_lon, 77.2)
+
+    def test_utm_zone_from_centroid(self):
+        self.assertEqual(utm_epsg(77.2, 28.6), 32643)
+        self.assertEqual(utm_epsg(-47.9, -15.8), 32723)
+        self.assertEqual(utm_epsg([3.0, 179.9], [51.0, -10.0]).tolist(), [32631, 32760])
+
+    def test_bulk_matches_geodesic_area(self):
+        geod = Geod(ellps="WGS84")
+        rings = [
+            [[x + dx, y + dy] for dx, dy in ((0, 0), (0.01, 0), (0.01, 0.01), (0, 0.01), (0, 0))]
+            for x, y in ((77.2, 28.6), (-93.5, 42.0), (30.1, -1.9), (145.0, -37.8))
+        ]
+
+        areas = calculate_areas_in_hectares(rings)
+
+        for ring, area in zip(rings, areas):
+            lons, lats = zip(*ring)
+            geodesic = abs(geod.polygon_area_perimeter(lons, lats)[0]) / 10000
+            # UTM scale error stays within a few tenths of a percent inside a zone
+            self.assertAlmostEqual(area / geodesic, 1.0, delta=0.003)
+            self.assertAlmostEqual(calculate_area_in_hectares(ring), area)
+
+    def test_area_stored_at_save_and_reused(self):
+        user = User.objects.create_user(username="farmer")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+
+        response = client.post("/field/set_polygon", {"polygon": POLYGON, "cropType": "Rice"}, format="json")
+        stored = FieldData.objects.get(user=user).area_hectares
+        self.assertAlmostEqual(response.json()["area_hectares"], stored)
+
+        with mock.patch("field.utils.calculate_areas_in_hectares") as compute:
+            result = client.get("/field/cc").json()
+        compute.assert_not_called()
+        self.assertEqual(result["area_hectare"], stored)
+
+    def test_bad_polygon_is_rejected_before_reset(self):
+        user = User.objects.create_user(username="farmer")
+        field = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        FieldObservation.objects.create(field=field, date="2024-06-01", ndvi=0.5)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+
+        for polygon in (
+            {"type": "MultiPolygon", "coordinates": [POLYGON["coordinates"]]},
+            {"type": "Polygon", "coordinates": [POLYGON["coordinates"][0][:2]]},
+            {"type": "Polygon", "coordinates": [[["77.2", 28.6]] * 4]},
+        ):
+            response = client.post("/field/set_polygon", {"polygon": polygon, "cropType": "Rice"}, format="json")
+            self.assertEqual(response.status_code, 400, polygon)
+
+        field.refresh_from_db()
+        self.assertEqual(field.polygon, POLYGON)
+        self.assertEqual(field.observations.count(), 1)
+
+
+def _square(x, y, size=0.01):
+    return {
+        "type": "Polygon",
+        "coordinates": [[[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]],
+    }
+
+
+class SpatialIndexTests(TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.fields = [(i, _square(rng.uniform(77, 78), rng.uniform(28, 29))) for i in range(500)]
+        get_field_index().reset()
+        self.addCleanup(get_field_index().reset)
+
+    def brute_force(self, fields, box):
+        return sorted(i for i, p in fields if polygon_geometry(p).intersects(shapely.box(*box)))
+
+    def test_queries_match_linear_scan(self):
+        index = FieldIndex()
+        index.load(self.fields)
+        box = (77.2, 28.2, 77.5, 28.6)
+
+        self.assertEqual(sorted(index.in_bbox(*box)), self.brute_force(self.fields, box))
+        target = polygon_geometry(self.fields[7][1])
+        self.assertEqual(
+            sorted(index.intersecting(self.fields[7][1])),
+            sorted(i for i, p in self.fields if polygon_geometry(p).intersects(target)),
+        )
+        point = shapely.Point(77.5, 28.5)
+        closest = sorted(self.fields, key=lambda f: polygon_geometry(f[1]).distance(point))
+        self.assertEqual(index.nearest(77.5, 28.5, k=3), [i for i, _ in closest[:3]])
+
+    def test_incremental_updates_before_and_after_rebuild(self):
+        for pending_limit in (1000, 0):
+            with self.subTest(pending_limit=pending_limit), \
+                    mock.patch("field.spatial.MIN_REBUILD_PENDING", pending_limit):
+                index = FieldIndex(rebuild_fraction=0.0 if pending_limit == 0 else 0.1)
+                index.load(self.fields)
+                fields = dict(self.fields)
+                moved = _square(77.3, 28.3)
+                index.add(3, moved)
+                index.add(1000, _square(77.31, 28.31))
+                index.remove(4)
+                fields.update({3: moved, 1000: _square(77.31, 28.31)})
+                del fields[4]
+                box = (77.0, 28.0, 78.0, 29.0)
+
+                self.assertEqual(sorted(index.in_bbox(*box)), self.brute_force(fields.items(), box))
+                self.assertEqual(len(index), len(fields))
+                self.assertEqual(index.nearest(77.305, 28.305, k=2), [3, 1000])
+
+    def test_index_follows_committed_saves_and_deletes(self):
+        user = User.objects.create_user(username="farmer")
+        index = get_field_index()
+        self.assertEqual(index.in_bbox(77.0, 28.0, 78.0, 29.0), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            field = FieldData.objects.create(user=user, cropType="Rice", polygon=POLYGON)
+        self.assertEqual(index.intersecting(POLYGON), [field.pk])
+
+        # Syncing observations or storing the area doesn't touch the index
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, \
+                mock.patch("field.spatial.polygon_bounds", wraps=polygon_bounds) as bounds:
+            field.save(update_fields=["observations_synced_until"])
+            field_area(field)
+        self.assertEqual(callbacks, [])
+        bounds.assert_not_called()
+        self.assertEqual(index._delta, {field.pk: polygon_geometry(POLYGON)})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            field.delete()
+        self.assertEqual(index.intersecting(POLYGON), [])
+
+    def test_save_polygon_stores_bounds_and_reports_overlaps(self):
+        neighbour = User.objects.create_user(username="neighbour")
+        FieldData.objects.create(user=neighbour, cropType="Rice", polygon=POLYGON)
+        user = User.objects.create_user(username="farmer")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+        shifted = {**POLYGON, "coordinates": [[[x + 0.01, y] for x, y in POLYGON["coordinates"][0]]]}
+
+        response = client.post("/field/set_polygon", {"polygon": shifted, "cropType": "Rice"}, format="json")
+        self.assertEqual(response.json()["overlapping_fields"], 1)
+        stored = FieldData.objects.get(user=user)
+        self.assertAlmostEqual(stored.min_lon, 77.2190)
+        self.assertAlmostEqual(stored.max_lat, 28.6339)
+        self.assertEqual(list(fields_in_bbox(77.0, 28.0, 77.215, 29.0)), [FieldData.objects.get(user=neighbour)])
+
+        with override_settings(FIELD_REJECT_OVERLAPS=True):
+            response = client.post("/field/set_polygon", {"polygon": POLYGON, "cropType": "Rice"}, format="json")
+        self.assertEqual(response.status_code, 409)
+
+
+class RiskBatchTests(TestCase):
+    def test_packed_batch_matches_single_sequences(self):
+        sequences = [
+            [[0.2 + 0.05 * t, 4.0, 29.0, 0.3] for t in range(length)]
+            for length in (3, 7, 1, 5)
+        ]
+
+        batch = predict_risk_batch([*sequences, []])
+
+        for seq, result in zip(sequences, batch):
+            single = predict_risk_from_values(seq)
+            self.assertAlmostEqual(result["risk_probability"], single["risk_probability"], places=5)
+            self.assertEqual(result["risk_level"], single["risk_level"])
+        self.assertIsNone(batch[-1]["risk_probability"])
+
+
+LOADS = []
+
+
+def slow_loader():
+    LOADS.append(threading.get_ident())
+    time.sleep(0.05)
+    return object()
+
+
+class ModelRegistryTests(TestCase):
+    def test_concurrent_first_use_loads_once(self):
+        registry = ModelRegistry()
+        registry.register("slow", "field.tests:slow_loader")
+        LOADS.clear()
+
+        self.assertFalse(registry.is_loaded("slow"))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            models = list(pool.map(lambda _: registry.get("slow"), range(8)))
+
+        self.assertEqual(len(LOADS), 1)
+        self.assertTrue(all(m is models[0] for m in models))
+        self.assertIn("load_seconds", registry.stats()["slow"])
+
+
+class CnnExportTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.paths = {"torchscript": os.path.join(self.root, "crop_health_model.ts.pt")}
+
+    def test_exported_runtime_matches_eager(self):
+        reference = cnn.load_model(cnn.MODEL_PATH, cnn.DEVICE)
+        export_torchscript(reference, self.paths["torchscript"])
+
+        with mock.patch.object(cnn, "RUNTIME", "torchscript"), mock.patch.dict(cnn.EXPORT_PATHS, self.paths):
+            model = cnn.load_default_model()
+            self.assertTrue(cnn.model_version().startswith("torchscript:"))
+
+        parity = check_parity(reference, model, load_fixtures())
+        self.assertEqual(parity_failures("torchscript", parity), [])
+        with self.assertRaises(FileNotFoundError):
+            load_exported("torchscript", os.path.join(self.root, "missing.pt"))
+
+    def test_export_outside_tolerance_is_discarded(self):
+        reference = cnn.load_model(cnn.MODEL_PATH, cnn.DEVICE)
+        export_torchscript(reference, self.paths["torchscript"])
+        installed = os.path.getmtime(self.paths["torchscript"])
+
+        # An export that flips every prediction
+        with mock.patch("models.cnn_export.EXPORT_PATHS", self.paths), \
+                mock.patch("models.cnn_export.load_exported", return_value=lambda batch: -reference(batch)), \
+                mock.patch("models.cnn_export.benchmark", return_value={"latency_ms": 0, "images_per_s": 0}), \
+                mock.patch("sys.stdout", StringIO()):
+            with self.assertRaises(SystemExit) as raised:
+                cnn_export_main(["--runtimes", "torchscript"])
+
+        self.assertIn("torchscript", str(raised.exception.code))
+        self.assertEqual(os.listdir(self.root), ["crop_health_model.ts.pt"])
+        self.assertEqual(os.path.getmtime(self.paths["torchscript"]), installed)
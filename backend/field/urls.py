@@ -1,5 +1,6 @@
 from django.urls import path
-from field.views import FieldDataView, SavePolygon, getCoord, AWDreport, CarbonCredit, PestPrediction, HealthScore
+from field.views import FieldDataView, SavePolygon, getCoord, AWDreport, CarbonCredit, PestPrediction, HealthScore, Dashboard, BatchFieldIndices, PestHeatmap, ZonalStats, ManagementZones, SeasonHistory
+from field.async_views import AsyncFieldDataView, AsyncAWDreport, AsyncCarbonCredit, AsyncPestPrediction, AsyncHealthScore
 
 urlpatterns = [
     path('ee', FieldDataView.as_view(), name='fieldData'),
@@ -9,4 +10,16 @@ urlpatterns = [
     path('cc', CarbonCredit.as_view(), name='CarbonCredit'),
     path('pestpredict', PestPrediction.as_view(), name='PestPrediction'),
     path('healthscore', HealthScore.as_view(), name='HealthScore'),
+    path('dashboard', Dashboard.as_view(), name='Dashboard'),
+    path('batch', BatchFieldIndices.as_view(), name='BatchFieldIndices'),
+    path('pest_heatmap', PestHeatmap.as_view(), name='PestHeatmap'),
+    path('zonal_stats', ZonalStats.as_view(), name='ZonalStats'),
+    path('zones', ManagementZones.as_view(), name='ManagementZones'),
+    path('seasons', SeasonHistory.as_view(), name='SeasonHistory'),
+    # Async variants for ASGI deployments
+    path('async/ee', AsyncFieldDataView.as_view(), name='asyncFieldData'),
+    path('async/awd', AsyncAWDreport.as_view(), name='asyncAWDreport'),
+    path('async/cc', AsyncCarbonCredit.as_view(), name='asyncCarbonCredit'),
+    path('async/pestpredict', AsyncPestPrediction.as_view(), name='asyncPestPrediction'),
+    path('async/healthscore', AsyncHealthScore.as_view(), name='asyncHealthScore'),
 ]
\ No newline at end of file
@@ -1,68 +1,143 @@
+import asyncio
+import contextvars
+import logging
 import ee
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from .models import FieldData
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from .models import FieldData, FieldObservation, Pest
+from .heatmap import count_report, tag_report
+from .cache import get_observation_cache, polygon_hash
+from .instrumentation import count, span
 
-from shapely.geometry import Polygon
-from pyproj import CRS, Transformer
-from shapely.ops import transform
+import numpy as np
+import shapely
+from pyproj import Transformer
 
-def fetchEEData(user, start_date="2024-06-01", end_date="2024-06-30"):
-    """
-    Fetch vegetation indices, rainfall, temperature, soil moisture,
-    and NDVI/NDWI time series for the logged-in user's field.
-    """
+logger = logging.getLogger(__name__)
 
-    # Fetch polygon for the user
-    field_data = get_object_or_404(FieldData, user=user)
-    coords = field_data.polygon
-    aoi = ee.Geometry(coords)
+# Cache dataset name for the combined fetchEEData payload
+FIELD_METRICS_DATASET = "field_metrics"
 
-    # --- Vegetation Indices ---
-    sentinel = (
+DEFAULT_START_DATE = "2024-06-01"
+DEFAULT_END_DATE = "2024-06-30"
+
+# Days behind today that stored scenes are still re-fetched: Sentinel-2
+# scenes are often ingested days after their acquisition date
+# (settings.S2_INGEST_MARGIN_DAYS)
+DEFAULT_INGEST_MARGIN_DAYS = 5
+
+# Sentinel-2 band aliases and per-index expressions. Adding an index here makes
+# it part of both the composite stats and the per-scene time series.
+S2_BANDS = {"BLUE": "B2", "GREEN": "B3", "RED": "B4", "NIR": "B8"}
+INDEX_EXPRESSIONS = {
+    "NDVI": "(NIR - RED) / (NIR + RED)",
+    "NDWI": "(GREEN - NIR) / (GREEN + NIR)",
+    "EVI": "2.5 * ((NIR - RED) / (NIR + 6*RED - 7.5*BLUE + 1))",
+    "SAVI": "((NIR - RED) / (NIR + RED + 0.5)) * (1.5)",
+}
+TIME_SERIES_INDICES = tuple(INDEX_EXPRESSIONS)
+
+# Time-series index -> FieldObservation column
+OBSERVATION_COLUMNS = {"NDVI": "ndvi", "NDWI": "ndwi", "EVI": "evi", "SAVI": "savi"}
+
+# Defaults for settings.S2_CLOUD_FILTER
+S2_CLOUD_DEFAULTS = {
+    "MAX_SCENE_CLOUD_PCT": 60,
+    "MASK": "SCL",
+    "MAX_FIELD_CLOUD_FRACTION": 0.7,
+}
+# Scene classification classes treated as cloud: shadow, medium/high cloud, cirrus
+SCL_CLOUD_CLASSES = (3, 8, 9, 10)
+# QA60 opaque-cloud and cirrus bits
+QA60_CLOUD_BITS = (1 << 10, 1 << 11)
+
+
+def getinfo(query):
+    """``query.getInfo()``, timed and counted as one Earth Engine round-trip."""
+    count("ee_calls")
+    with span("ee"):
+        return query.getInfo()
+
+
+def _index_image(img, indices=TIME_SERIES_INDICES):
+    """Compute the requested indices from a Sentinel-2 image as one multi-band image."""
+    bands = {alias: img.select(band).toFloat() for alias, band in S2_BANDS.items()}
+    return ee.Image.cat(
+        [img.expression(INDEX_EXPRESSIONS[name], bands).rename(name) for name in indices]
+    )
+
+
+# --- Cloud filtering ---
+
+def _cloud_settings():
+    return {**S2_CLOUD_DEFAULTS, **getattr(settings, "S2_CLOUD_FILTER", {})}
+
+
+def _s2_scenes(aoi, start_date, end_date):
+    """Sentinel-2 scenes over the AOI, minus those above the scene cloud cover limit."""
+    return (
         ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
         .filterBounds(aoi)
         .filterDate(start_date, end_date)
-        .median()
+        .filter(ee.Filter.lte("CLOUDY_PIXEL_PERCENTAGE", _cloud_settings()["MAX_SCENE_CLOUD_PCT"]))
     )
 
-    ndvi = sentinel.normalizedDifference(["B8", "B4"]).rename("NDVI")
-    evi = sentinel.expression(
-        "2.5 * ((NIR - RED) / (NIR + 6*RED - 7.5*BLUE + 1))",
-        {
-            "NIR": sentinel.select("B8"),
-            "RED": sentinel.select("B4"),
-            "BLUE": sentinel.select("B2"),
-        },
-    ).rename("EVI")
-    savi = sentinel.expression(
-        "((NIR - RED) / (NIR + RED + 0.5)) * (1.5)",
-        {"NIR": sentinel.select("B8"), "RED": sentinel.select("B4")},
-    ).rename("SAVI")
-
-    veg_stats = (
-        ee.Image.cat([ndvi, evi, savi])
-        .reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=aoi,
-            scale=10,
-            bestEffort=True,
-        )
-        .getInfo()
-        or {}
+
+def _cloud_band(img, mask):
+    """1 where the ``mask`` band ("SCL" or "QA60") flags cloud, else 0."""
+    if mask == "SCL":
+        scl = img.select("SCL")
+        cloud = scl.eq(SCL_CLOUD_CLASSES[0])
+        for cls in SCL_CLOUD_CLASSES[1:]:
+            cloud = cloud.Or(scl.eq(cls))
+        return cloud
+    if mask == "QA60":
+        qa = img.select("QA60")
+        return qa.bitwiseAnd(QA60_CLOUD_BITS[0]).neq(0).Or(qa.bitwiseAnd(QA60_CLOUD_BITS[1]).neq(0))
+    raise ValueError(f"Unknown S2 cloud mask {mask!r}; use 'SCL', 'QA60' or None")
+
+
+def _mask_clouds(img):
+    mask = _cloud_settings()["MASK"]
+    if not mask:
+        return img
+    return img.updateMask(_cloud_band(img, mask).Not())
+
+
+def _composite_index_image(aoi, start_date, end_date, indices=TIME_SERIES_INDICES):
+    """Indices of the median composite, cloudy pixels masked per scene first."""
+    return _index_image(_s2_scenes(aoi, start_date, end_date).map(_mask_clouds).median(), indices)
+
+
+def _field_queries(aoi, start_date, end_date):
+    """
+    Build the server-side Earth Engine objects behind fetchEEData, keyed by
+    section. Nothing is evaluated here; callers decide how to fetch them.
+    """
+
+    # --- Vegetation Indices ---
+    veg_stats = _composite_index_image(aoi, start_date, end_date, ("NDVI", "EVI", "SAVI")).reduceRegion(
+        reducer=ee.Reducer.mean(),
+        geometry=aoi,
+        scale=10,
+        bestEffort=True,
     )
 
     # --- Crop Type ---
     worldcover = ee.Image("ESA/WorldCover/v100/2020")
-    crop_class = (
-        worldcover.reduceRegion(
-            reducer=ee.Reducer.mode(),
-            geometry=aoi,
-            scale=10,
-            bestEffort=True,
-        ).getInfo()
-        or {}
+    crop_class = worldcover.reduceRegion(
+        reducer=ee.Reducer.mode(),
+        geometry=aoi,
+        scale=10,
+        bestEffort=True,
     )
-    crop_type = crop_class.get("Map")
 
     # --- Rainfall ---
     rainfall = (
@@ -71,10 +146,7 @@ def fetchEEData(user, start_date="2024-06-01", end_date="2024-06-30"):
         .filterDate(start_date, end_date)
         .mean()
         .reduceRegion(ee.Reducer.mean(), aoi, 5000)
-        .getInfo()
-        or {}
     )
-    rainfall_val = rainfall.get("precipitation")
 
     # --- Temperature ---
     lst = (
@@ -85,10 +157,7 @@ def fetchEEData(user, start_date="2024-06-01", end_date="2024-06-30"):
         .select("LST_Day_1km")
         .multiply(0.02)
         .reduceRegion(ee.Reducer.mean(), aoi, 1000)
-        .getInfo()
-        or {}
     )
-    temp_val = lst.get("LST_Day_1km")
 
     # --- Soil Moisture ---
     soil = (
@@ -97,106 +166,549 @@ def fetchEEData(user, start_date="2024-06-01", end_date="2024-06-30"):
         .mean()
         .select("volumetric_soil_water_layer_1")
         .reduceRegion(ee.Reducer.mean(), aoi, 10000)
-        .getInfo()
-        or {}
     )
-    soil_val = soil.get("volumetric_soil_water_layer_1")
 
-    # --- NDVI Time Series ---
-    ndvi_ts = (
-        ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
-        .filterBounds(aoi)
-        .filterDate(start_date, end_date)
-        .map(
-            lambda img: img.normalizedDifference(["B8", "B4"])
-            .rename("NDVI")
-            .set("date", img.date().format("YYYY-MM-dd"))
-        )
-        .select("NDVI")
-    )
+    return {
+        "veg_stats": veg_stats,
+        "crop_class": crop_class,
+        "rainfall": rainfall,
+        "lst": lst,
+        "soil": soil,
+    }
 
-    ndvi_series = ndvi_ts.map(
-        lambda img: ee.Feature(
-            None,
-            {
-                "date": img.get("date"),
-                "NDVI": img.reduceRegion(
-                    ee.Reducer.mean(), aoi, 10
-                ).get("NDVI"),
-            },
+
+def _scene_stats_image(img):
+    """
+    Cloud-masked indices of one scene plus a ``cloud_fraction`` band, so a
+    mean reduction gives both the clear-pixel indices and the share of the
+    field under cloud. Without a pixel mask the scene-wide cloud cover
+    property stands in for the latter.
+    """
+    mask = _cloud_settings()["MASK"]
+    if not mask:
+        return _index_image(img).set(
+            "cloud_fraction", ee.Number(img.get("CLOUDY_PIXEL_PERCENTAGE")).divide(100)
         )
+    cloud = _cloud_band(img, mask)
+    return _index_image(img.updateMask(cloud.Not())).addBands(cloud.rename("cloud_fraction"))
+
+
+def _scene_feature(img, aoi, geometry=None):
+    """One feature per scene: mean indices and cloud fraction over ``aoi``, plus its date."""
+    stats_image = _scene_stats_image(img)
+    feature = ee.Feature(geometry, stats_image.reduceRegion(ee.Reducer.mean(), aoi, 10))
+    if not _cloud_settings()["MASK"]:
+        feature = feature.set("cloud_fraction", stats_image.get("cloud_fraction"))
+    return feature.set("date", img.date().format("YYYY-MM-dd"))
+
+
+def _clear_scenes(features):
+    """Drop scenes where more of the field than MAX_FIELD_CLOUD_FRACTION is cloud."""
+    return features.filter(
+        ee.Filter.lte("cloud_fraction", _cloud_settings()["MAX_FIELD_CLOUD_FRACTION"])
     )
 
-    ndvi_list = ndvi_series.aggregate_array("NDVI").getInfo()
-    date_list = ndvi_series.aggregate_array("date").getInfo()
-    time_series = []
-    if ndvi_list and date_list:
-        for d, v in zip(date_list, ndvi_list):
-            if v is not None:
-                time_series.append({"date": d, "NDVI": v})
 
-    # --- NDWI Time Series ---
-    ndwi_ts = (
-        ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
-        .filterBounds(aoi)
-        .filterDate(start_date, end_date)
-        .map(
-            lambda img: img.normalizedDifference(["B3", "B8"])
-            .rename("NDWI")
-            .set("date", img.date().format("YYYY-MM-dd"))
-        )
-        .select("NDWI")
+def _index_rows_query(aoi, start_date, end_date):
+    """
+    Per-scene index values for the AOI as ``[date, cloud_fraction, *indices]``
+    rows, with one reduceRegion per scene. Scenes over the cloud limits are
+    dropped server-side.
+    """
+    index_series = _clear_scenes(
+        _s2_scenes(aoi, start_date, end_date).map(lambda img: _scene_feature(img, aoi))
     )
+    columns = ["date", "cloud_fraction", *TIME_SERIES_INDICES]
+    return index_series.reduceColumns(
+        ee.Reducer.toList(len(columns)), columns
+    ).get("list")
+
+
+def _windows_rows_query(aoi, windows):
+    """_index_rows_query over several date windows, as one list of rows."""
+    query = _index_rows_query(aoi, *windows[0])
+    for window in windows[1:]:
+        query = ee.List(query).cat(_index_rows_query(aoi, *window))
+    return query
+
+
+def _index_time_series(rows):
+    """
+    Turn ``[date, cloud_fraction, *TIME_SERIES_INDICES]`` rows into one dict
+    per acquisition date, averaging scenes (tiles) captured on the same day.
+    """
+    by_date = {}
+    for date, *values in rows or []:
+        by_date.setdefault(date, []).append(values)
+
+    series = []
+    for date in sorted(by_date):
+        scenes = by_date[date]
+        row = {"date": date}
+        for i, name in enumerate(TIME_SERIES_INDICES, start=1):
+            row[name] = sum(scene[i] for scene in scenes) / len(scenes)
+        row["cloud_fraction"] = sum(scene[0] for scene in scenes) / len(scenes)
+        series.append(row)
+    return series
+
+
+# --- Stored observations ---
+
+def settled_until(today=None):
+    """Scenes acquired before this day are assumed to be ingested in Earth Engine."""
+    margin = getattr(settings, "S2_INGEST_MARGIN_DAYS", DEFAULT_INGEST_MARGIN_DAYS)
+    return (today or date.today()) - timedelta(days=margin)
+
 
-    ndwi_series = ndwi_ts.map(
-        lambda img: ee.Feature(
-            None,
-            {
-                "date": img.get("date"),
-                "NDWI": img.reduceRegion(
-                    ee.Reducer.mean(), aoi, 10
-                ).get("NDWI"),
-            },
+def _missing_windows(field_data, start_date, end_date):
+    """
+    The parts of [start_date, end_date) that have not been synced yet: up to
+    one window before and one after the synced range. Already-synced days are
+    never re-queried; scenes in the future are left for a later refresh.
+    """
+    start = date.fromisoformat(str(start_date))
+    end = min(date.fromisoformat(str(end_date)), date.today())
+    synced_from = field_data.observations_synced_from
+    synced_until = field_data.observations_synced_until
+
+    if start >= end:
+        return []
+    if synced_from is None:
+        return [(start, end)]
+    # Keep the synced range contiguous: a request past either edge also
+    # fills the gap between it and the stored range.
+    windows = []
+    if start < synced_from:
+        windows.append((start, synced_from))
+    if end > synced_until:
+        windows.append((synced_until, end))
+    return windows
+
+
+def _store_observations(field_data, rows, windows):
+    """
+    Append fetched scenes and extend the field's synced range. The last
+    few days (settled_until) are stored but not marked as synced, so scenes
+    ingested late are picked up by the next refresh.
+    """
+    observations = [
+        FieldObservation(
+            field=field_data,
+            date=row["date"],
+            cloud_fraction=row["cloud_fraction"],
+            **{column: row[name] for name, column in OBSERVATION_COLUMNS.items()},
         )
+        for row in _index_time_series(rows)
+    ]
+    FieldObservation.objects.bulk_create(
+        observations,
+        update_conflicts=True,
+        unique_fields=["field", "date"],
+        update_fields=[*OBSERVATION_COLUMNS.values(), "cloud_fraction"],
     )
 
-    ndwi_list = ndwi_series.aggregate_array("NDWI").getInfo()
-    ndwi_date_list = ndwi_series.aggregate_array("date").getInfo()
-    ndwi_time_series = []
-    if ndwi_list and ndwi_date_list:
-        for d, v in zip(ndwi_date_list, ndwi_list):
-            if v is not None:
-                ndwi_time_series.append({"date": d, "NDWI": v})
+    settled = settled_until()
+    for start, end in windows:
+        end = min(end, settled)
+        if end <= start:
+            continue
+        synced_from = field_data.observations_synced_from
+        synced_until = field_data.observations_synced_until
+        field_data.observations_synced_from = min(start, synced_from) if synced_from else start
+        field_data.observations_synced_until = max(end, synced_until) if synced_until else end
+    field_data.save(update_fields=["observations_synced_from", "observations_synced_until"])
+
+
+def stored_time_series(field_data, start_date, end_date):
+    """Stored per-date index rows for [start_date, end_date), oldest first."""
+    observations = field_data.observations.filter(
+        date__gte=start_date, date__lt=end_date
+    ).order_by("date")
+    return [
+        {
+            "date": obs.date.isoformat(),
+            **{name: getattr(obs, column) for name, column in OBSERVATION_COLUMNS.items()},
+            "cloud_fraction": obs.cloud_fraction,
+        }
+        for obs in observations
+    ]
+
+
+def _rasters():
+    """The rasters module when the local raster store is enabled, else None."""
+    # Imported here: rasters builds on this module's Earth Engine helpers
+    from . import rasters
+    return rasters if rasters.raster_store_enabled() else None
+
+
+def _raster_rows(rasters, polygon, windows):
+    """Rows and tile fetches of rasters.index_rows over several windows."""
+    rows, fetched = [], 0
+    for window in windows:
+        window_rows, window_fetched = rasters.index_rows(polygon, *window)
+        rows.extend(window_rows)
+        fetched += window_fetched
+    return rows, fetched
+
+
+def _raster_sections(field_data, start_date, end_date, windows):
+    """veg_stats and index_rows computed from the local raster store instead of Earth Engine."""
+    rasters = _rasters()
+    sections = {"veg_stats": rasters.composite_stats(field_data.polygon, start_date, end_date)}
+    if windows:
+        sections["index_rows"], _ = _raster_rows(rasters, field_data.polygon, windows)
+    return sections
+
+
+def refresh_observations(field_data, start_date, end_date):
+    """
+    Incrementally sync the stored time series for [start_date, end_date):
+    only days that were never queried are fetched from Earth Engine.
+    Returns the number of Earth Engine round-trips made (0 or 1), or with
+    the raster store, the number of tile scenes it had to fetch.
+    """
+    windows = _missing_windows(field_data, start_date, end_date)
+    if not windows:
+        return 0
+    rasters = _rasters()
+    if rasters is not None:
+        rows, fetched = _raster_rows(rasters, field_data.polygon, windows)
+    else:
+        rows, fetched = getinfo(_windows_rows_query(ee.Geometry(field_data.polygon), windows)), 1
+    with span("db"):
+        _store_observations(field_data, rows, windows)
+    return fetched
+
+
+def reset_observations(field_data):
+    """Forget stored scenes and season summaries, e.g. after the field polygon changed."""
+    field_data.observations.all().delete()
+    field_data.season_summaries.all().delete()
+    field_data.observations_synced_from = None
+    field_data.observations_synced_until = None
+    field_data.save(update_fields=["observations_synced_from", "observations_synced_until"])
+
+
+def _build_response(results, index_series):
+    """Shape the fetched sections into the fetchEEData payload."""
+    veg_stats = results.get("veg_stats") or {}
+    crop_class = results.get("crop_class") or {}
+    rainfall = results.get("rainfall") or {}
+    lst = results.get("lst") or {}
+    soil = results.get("soil") or {}
 
     return {
         "NDVI": veg_stats.get("NDVI"),
         "EVI": veg_stats.get("EVI"),
         "SAVI": veg_stats.get("SAVI"),
-        "crop_type_class": crop_type,
-        "rainfall_mm": rainfall_val,
-        "temperature_K": temp_val,
-        "soil_moisture": soil_val,
-        "ndvi_time_series": time_series,
-        "ndwi_time_series": ndwi_time_series,
+        "crop_type_class": crop_class.get("Map"),
+        "rainfall_mm": rainfall.get("precipitation"),
+        "temperature_K": lst.get("LST_Day_1km"),
+        "soil_moisture": soil.get("volumetric_soil_water_layer_1"),
+        "ndvi_time_series": [{"date": r["date"], "NDVI": r["NDVI"]} for r in index_series],
+        "ndwi_time_series": [{"date": r["date"], "NDWI": r["NDWI"]} for r in index_series],
+        "index_time_series": index_series,
     }
 
 
-def calculate_area_in_hectares(coords_list):
-    
-    # Create a shapely Polygon object from the coordinates
-    polygon_geom = Polygon(coords_list)
+QUOTA_ERROR_MARKERS = ("quota", "too many concurrent", "rate limit", "429")
+
+
+def latest_ndvi(data):
+    """Most recent NDVI of a fetch_field_data payload, else the composite NDVI."""
+    series = data["ndvi_time_series"]
+    return series[-1]["NDVI"] if series else (data["NDVI"] or 0.0)
+
+
+def is_quota_error(exc):
+    """True for Earth Engine errors that are worth retrying after a pause."""
+    message = str(exc).lower()
+    return isinstance(exc, ee.EEException) and any(m in message for m in QUOTA_ERROR_MARKERS)
+
+
+def _build_queries(field_data, start_date, end_date, incremental=True):
+    """
+    All server-side queries for one field fetch, plus the time-series windows.
+    With the raster store the Sentinel-2 sections are left out; see
+    _raster_sections.
+    """
+    aoi = ee.Geometry(field_data.polygon)
+    queries = _field_queries(aoi, start_date, end_date)
+    if incremental:
+        windows = _missing_windows(field_data, start_date, end_date)
+    else:
+        windows = [(start_date, end_date)]
+    if _rasters() is not None:
+        del queries["veg_stats"]
+    elif windows:
+        queries["index_rows"] = _windows_rows_query(aoi, windows)
+    return queries, windows
+
+
+def request_field_data(field_data, start_date, end_date, batched=True, incremental=True):
+    """
+    Earth Engine half of a field fetch: run the queries and return the raw
+    sections with the time-series windows that were requested (empty when the
+    stored series already covers them). Reads no database state, so it is safe
+    to run from worker threads.
+
+    With ``batched`` every section is packed into one ``ee.Dictionary`` and
+    fetched with a single ``getInfo()`` round-trip; otherwise each section
+    is fetched on its own.
+    """
+    queries, windows = _build_queries(field_data, start_date, end_date, incremental)
+    if batched:
+        results = getinfo(ee.Dictionary(queries)) or {}
+    else:
+        results = {name: getinfo(query) for name, query in queries.items()}
+    if _rasters() is not None:
+        results.update(_raster_sections(field_data, start_date, end_date, windows))
+    return results, windows
+
+
+def save_field_data(field_data, start_date, end_date, results, windows,
+                    incremental=True, use_cache=True):
+    """
+    Database half of a field fetch: store new scenes, build the payload from
+    ``request_field_data`` results and put it in the observation cache.
+    """
+    if incremental:
+        if windows:
+            _store_observations(field_data, results.get("index_rows"), windows)
+        index_series = stored_time_series(field_data, start_date, end_date)
+    else:
+        index_series = _index_time_series(results.get("index_rows"))
+
+    response = _build_response(results, index_series)
+    if use_cache:
+        get_observation_cache().set(
+            polygon_hash(field_data.polygon), FIELD_METRICS_DATASET,
+            start_date, end_date, response,
+        )
+    return response
+
+
+def fetch_field_data(field_data, start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE,
+                     batched=True, use_cache=True, incremental=True):
+    """
+    Field metrics for ``field_data``, served from the observation cache when
+    ``use_cache`` is set. With ``incremental`` the time series is read from
+    stored observations, and only scenes outside the already-synced window
+    are requested.
+    """
+    if use_cache:
+        with span("cache"):
+            cached = get_observation_cache().get(
+                polygon_hash(field_data.polygon), FIELD_METRICS_DATASET, start_date, end_date
+            )
+        if cached is not None:
+            return cached
+
+    results, windows = request_field_data(
+        field_data, start_date, end_date, batched=batched, incremental=incremental
+    )
+    with span("db"):
+        return save_field_data(
+            field_data, start_date, end_date, results, windows,
+            incremental=incremental, use_cache=use_cache,
+        )
+
+
+def fetchEEData(user, start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE,
+                batched=True, use_cache=True, incremental=True):
+    """
+    Fetch vegetation indices, rainfall, temperature, soil moisture,
+    and NDVI/NDWI time series for the logged-in user's field.
+    See fetch_field_data for the options.
+    """
+
+    # Fetch polygon for the user
+    with span("db"):
+        field_data = get_object_or_404(FieldData, user=user)
+    return fetch_field_data(
+        field_data, start_date, end_date,
+        batched=batched, use_cache=use_cache, incremental=incremental,
+    )
+
+
+# --- Async path (ASGI) ---
+
+@lru_cache(maxsize=None)
+def _ee_executor():
+    """Shared pool that runs blocking getInfo() calls for the async views."""
+    workers = getattr(settings, "FIELD_EE_MAX_WORKERS", 16)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ee")
+
 
-    # Define the source (WGS 84 / EPSG:4326) and target (UTM Zone 43N / EPSG:32643)
-    # This projection converts the coordinates to a meter-based system.
-    project = Transformer.from_crs("EPSG:4326", "EPSG:32643", always_xy=True).transform
+async def _agetinfo(queries):
+    """Fetch every query concurrently; total latency is that of the slowest one."""
+    loop = asyncio.get_running_loop()
+    names = list(queries)
+    # each call gets a copy of the request context so its span is recorded
+    values = await asyncio.gather(*(
+        loop.run_in_executor(_ee_executor(), contextvars.copy_context().run, getinfo, queries[name])
+        for name in names
+    ))
+    return dict(zip(names, values))
 
-    # Apply the projection to the polygon
-    projected_polygon = transform(project, polygon_geom)
 
-    # Get the area in square meters from the projected polygon
-    area_sq_meters = projected_polygon.area
-    
+async def afetch_field_data(field_data, start_date=DEFAULT_START_DATE,
+                            end_date=DEFAULT_END_DATE, use_cache=True):
+    """
+    Async fetch_field_data: the independent sub-queries (indices, WorldCover,
+    rainfall, LST, soil moisture, time series) are awaited together instead of
+    being fetched one after another or as a single batch.
+    """
+    if use_cache:
+        cached = await sync_to_async(get_observation_cache().get)(
+            polygon_hash(field_data.polygon), FIELD_METRICS_DATASET, start_date, end_date
+        )
+        if cached is not None:
+            return cached
+
+    queries, windows = _build_queries(field_data, start_date, end_date)
+    if _rasters() is not None:
+        # Local zonal stats run alongside the remaining Earth Engine queries
+        results, local = await asyncio.gather(
+            _agetinfo(queries),
+            sync_to_async(_raster_sections, thread_sensitive=False)(
+                field_data, start_date, end_date, windows
+            ),
+        )
+        results.update(local)
+    else:
+        results = await _agetinfo(queries)
+    return await sync_to_async(save_field_data)(
+        field_data, start_date, end_date, results, windows, use_cache=use_cache
+    )
+
+
+async def arefresh_observations(field_data, start_date, end_date):
+    """Async refresh_observations."""
+    windows = _missing_windows(field_data, start_date, end_date)
+    if not windows:
+        return 0
+    if _rasters() is not None:
+        return await sync_to_async(refresh_observations)(field_data, start_date, end_date)
+    results = await _agetinfo(
+        {"index_rows": _windows_rows_query(ee.Geometry(field_data.polygon), windows)}
+    )
+    await sync_to_async(_store_observations)(field_data, results["index_rows"], windows)
+    return 1
+
+
+# --- Pest uploads ---
+
+@lru_cache(maxsize=1)
+def _upload_executor():
+    """Single writer that persists pest photos after the response is computed."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pest-upload")
+
+
+def find_pest_duplicate(image_hash):
+    """Most recent Pest with this image hash whose stored file still exists, or None."""
+    for pest in Pest.objects.filter(image_hash=image_hash).order_by("-pk")[:5]:
+        if pest.image and pest.image.storage.exists(pest.image.name):
+            return pest
+    return None
+
+
+def _create_pest(user_id, name, data, image_hash, result, model_version, stored_name=None):
+    # A duplicate points at the already-stored file instead of writing a copy
+    image = stored_name if stored_name else ContentFile(data, name=name)
+    with transaction.atomic():
+        # heatmap.py: locate the report and add it to its tile's daily count
+        pest = Pest.objects.create(
+            user_id=user_id, image=image, image_hash=image_hash,
+            result=result, model_version=model_version, **tag_report(user_id, result),
+        )
+        count_report(pest)
+    return pest
+
+
+def _save_pest(*args, **kwargs):
+    close_old_connections()
+    try:
+        return _create_pest(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def save_pest_upload(user, name, data, image_hash="", result=None, model_version="", stored_name=None):
+    """
+    Store an already-read pest photo with its CNN result. With PEST_ASYNC_SAVE
+    the write happens on a background thread and a Future is returned;
+    otherwise the Pest row. ``stored_name`` reuses a file saved earlier.
+    """
+    args = (user.pk, name, data, image_hash, result, model_version, stored_name)
+    if getattr(settings, "PEST_ASYNC_SAVE", True):
+        future = _upload_executor().submit(_save_pest, *args)
+        # The client already has its 201; a failed write must at least be logged
+        future.add_done_callback(lambda f: _log_failed_save(f, user.pk, name))
+        return future
+    return _create_pest(*args)
+
+
+def _log_failed_save(future, user_id, name):
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Saving pest upload %r for user %s failed", name, user_id, exc_info=exc)
+
+
+# --- Area ---
+
+def utm_epsg(lon, lat):
+    """EPSG code of the WGS 84 / UTM zone containing (lon, lat); works on arrays too."""
+    zone = (np.floor((np.asarray(lon) + 180) / 6).astype(int) % 60) + 1
+    return np.where(np.asarray(lat) >= 0, 32600, 32700) + zone
+
+
+@lru_cache(maxsize=None)
+def _utm_transformer(epsg):
+    """WGS 84 -> UTM transformer; building one parses the CRS database, so reuse them."""
+    return Transformer.from_crs("EPSG:4326", f"EPSG:{epsg}", always_xy=True)
+
+
+def _project(transformer):
+    def project(coords):
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+    return project
+
+
+def calculate_areas_in_hectares(coords_lists):
+    """
+    Areas of many polygons (outer rings as [[lon, lat], ...]) in hectares.
+    Each is projected to the UTM zone of its centroid; polygons sharing a
+    zone are projected in one vectorized shapely call.
+    """
+    if not len(coords_lists):
+        return np.zeros(0)
+    rings = [np.asarray(coords, dtype=float)[:, :2] for coords in coords_lists]
+    ring_index = np.repeat(np.arange(len(rings)), [len(ring) for ring in rings])
+    polygons = shapely.polygons(shapely.linearrings(np.concatenate(rings), indices=ring_index))
+
+    centroids = shapely.centroid(polygons)
+    epsgs = utm_epsg(shapely.get_x(centroids), shapely.get_y(centroids))
+    areas = np.empty(len(polygons))
+    for epsg in np.unique(epsgs):
+        in_zone = epsgs == epsg
+        projected = shapely.transform(polygons[in_zone], _project(_utm_transformer(int(epsg))))
+        areas[in_zone] = shapely.area(projected)
+
     # Convert square meters to hectares (1 hectare = 10,000 m²)
-    area_hectares = area_sq_meters / 10000
+    return areas / 10000
+
+
+def calculate_area_in_hectares(coords_list):
+    """Area of one polygon in hectares, in the UTM zone of its centroid."""
+    with span("area"):
+        return float(calculate_areas_in_hectares([coords_list])[0])
+
 
-    return area_hectares
\ No newline at end of file
+def field_area(field_data):
+    """Stored area of a field, computed and saved first for rows that predate it."""
+    if field_data.area_hectares is None:
+        field_data.area_hectares = calculate_area_in_hectares(field_data.polygon["coordinates"][0])
+        field_data.save(update_fields=["area_hectares"])
+    return field_data.area_hectares
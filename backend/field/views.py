@@ -1,29 +1,57 @@
 # views.py
+import hashlib
+import time
+from datetime import timedelta
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db import transaction
 
-from .models import FieldData, Pest
+from .models import FieldData
 from .serializers import (
-    FieldDataResponseSerializer
+    BatchFieldIndicesSerializer, FieldDataResponseSerializer, FieldWindowQuerySerializer,
+    ManagementZonesQuerySerializer, PestHeatmapQuerySerializer, SeasonHistoryQuerySerializer,
+    validate_polygon,
+)
+from .utils import (
+    fetchEEData, calculate_area_in_hectares, field_area, refresh_observations, reset_observations,
+    find_pest_duplicate, latest_ndvi, save_pest_upload, stored_time_series,
 )
-from .utils import fetchEEData, calculate_area_in_hectares
+from .cache import get_observation_cache, polygon_hash
+from .spatial import find_overlaps, polygon_bounds
+from .heatmap import outbreak_map
+from .zonal import management_zones, zonal_stats
+from .seasons import season_history
+from .batch import fetch_fields_indices
+from .instrumentation import span
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
-from models.health_score import get_health_score
-from models.lstm import predict_risk_from_values
+# Torch-backed models (cnn, lstm) are imported inside the views that use them,
+# so importing this module stays cheap; weights load via models.registry.
+from models.health_score import compute_health_score
 from models.cc import calculate_carbon_metrics
-from models.cnn import predict_health
 from models.awd import detect_awd_from_ndwi
 
+def _window(request):
+    """``(start, end)`` from the ``start``/``end`` or ``season``/``year`` query params; 400 if invalid."""
+    query = FieldWindowQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    return query.validated_data["start"], query.validated_data["end"]
+
+
 class FieldDataView(APIView):
     permission_classes=[IsAuthenticated]
 
     def get(self, request):
+        start, end = _window(request)
         try:
-            response_data = fetchEEData(request.user)
+            response_data = fetchEEData(request.user, start, end)
 
             resp_serializer = FieldDataResponseSerializer(data=response_data)
             resp_serializer.is_valid(raise_exception=True)
@@ -48,11 +76,37 @@ class SavePolygon(APIView):
                     {"error": "Polygon data is required"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            # Validate and derive everything before touching the stored field
+            try:
+                validate_polygon(polygon)
+                # Computed once here; CarbonCredit and friends read the stored value
+                area = calculate_area_in_hectares(polygon["coordinates"][0])
+                bounds = polygon_bounds(polygon)
+            except ValidationError as e:
+                return Response({"error": e.detail[0]}, status=status.HTTP_400_BAD_REQUEST)
+            except ValueError as e:
+                return Response({"error": f"Invalid polygon: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-            field_data, created = FieldData.objects.update_or_create(
-                user=request.user,
-                defaults={"polygon": polygon, "cropType": crop_type},
-            )
+            overlaps = find_overlaps(polygon, request.user)
+            if overlaps and getattr(settings, "FIELD_REJECT_OVERLAPS", False):
+                return Response(
+                    {
+                        "error": f"Polygon overlaps {len(overlaps)} existing field(s)",
+                        "overlapping_fields": len(overlaps),
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            with transaction.atomic():
+                previous = FieldData.objects.filter(user=request.user).first()
+                if previous is not None and previous.polygon != polygon:
+                    get_observation_cache().invalidate(polygon_hash(previous.polygon))
+                    reset_observations(previous)
+
+                field_data, created = FieldData.objects.update_or_create(
+                    user=request.user,
+                    defaults={"polygon": polygon, "cropType": crop_type, "area_hectares": area, **bounds},
+                )
 
             return Response(
                 {
@@ -60,6 +114,8 @@ class SavePolygon(APIView):
                     "created": created,
                     "polygon": field_data.polygon,
                     "cropType": field_data.cropType,
+                    "area_hectares": field_data.area_hectares,
+                    "overlapping_fields": len(overlaps),
                 },
                 status=status.HTTP_200_OK,
             )
@@ -94,23 +150,142 @@ class PestReport(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        uploaded = Pest.objects.create(
-            user = request.user,
-            image = request.FILES["image"]
+        # Predict from the upload in memory; the file is written afterwards
+        upload = request.FILES["image"]
+        data = upload.read()
+        image_hash = hashlib.sha256(data).hexdigest()
+
+        # cnn.py, batched with concurrent uploads
+        from models.cnn import model_version, predict_health_batched
+        version = model_version()
+
+        # Re-uploads of the same photo reuse its stored file, and its result
+        # too unless the weights have changed since
+        duplicate = find_pest_duplicate(image_hash)
+        if duplicate is not None and duplicate.model_version == version and duplicate.result:
+            result = duplicate.result
+        else:
+            result = predict_health_batched(data)
+
+        save_pest_upload(
+            request.user, upload.name, data, image_hash=image_hash, result=result,
+            model_version=version, stored_name=duplicate.image.name if duplicate else None,
         )
-        
-        # cnn.py
-        result = predict_health(uploaded.image.path)
 
         return Response(result, status=status.HTTP_201_CREATED)
     
 
+def _cached(field_data, dataset, start_date, end_date, compute):
+    """``compute()``, through the observation cache for this field, dataset and window."""
+    cache = get_observation_cache()
+    key = (polygon_hash(field_data.polygon), dataset, start_date, end_date)
+    with span("cache"):
+        cached = cache.get(*key)
+    if cached is not None:
+        return cached
+    result = compute()
+    cache.set(*key, result)
+    return result
+
+
+class ZonalStats(APIView):
+    """Mean, std, percentiles and histogram of each index over the user's field."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        start, end = _window(request)
+        field_data = get_object_or_404(FieldData, user=request.user)
+        # zonal.py
+        stats = _cached(
+            field_data, "zonal_stats", start, end,
+            lambda: zonal_stats(field_data.polygon, start, end),
+        )
+        return Response({"start": start, "end": end, "indices": stats})
+
+
+class ManagementZones(APIView):
+    """
+    The user's field as a grid of ``cell_m`` metre cells, as GeoJSON, each
+    with its index means and a zone (1 = lowest) ranked by ``index`` into
+    ``zones`` classes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = ManagementZonesQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        start, end = query.validated_data["start"], query.validated_data["end"]
+        options = {name: query.validated_data[name] for name in ("cell_m", "index", "zones")}
+
+        field_data = get_object_or_404(FieldData, user=request.user)
+        dataset = f"zones:{options['cell_m']}:{options['index']}:{options['zones']}"
+        try:
+            # zonal.py
+            result = _cached(
+                field_data, dataset, start, end,
+                lambda: management_zones(field_data.polygon, start, end, **options),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+
+class SeasonHistory(APIView):
+    """
+    The user's field over the last ``years`` occurrences of ``season``,
+    one aggregate per season, oldest first. Finished seasons are fetched
+    once and then read from SeasonSummary.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = SeasonHistoryQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        field_data = get_object_or_404(FieldData, user=request.user)
+        # seasons.py
+        history, fetched = season_history(field_data, **query.validated_data)
+        return Response({
+            "season": query.validated_data["season"],
+            "seasons": history,
+            "fetched_seasons": fetched,
+        })
+
+
+class PestHeatmap(APIView):
+    """
+    Pest reports per map tile for a region, from the pre-aggregated daily
+    tile counts. Query: ``bbox=min_lon,min_lat,max_lon,max_lat`` plus an
+    optional ``start``/``end`` (end exclusive; default the last 30 days).
+    """
+    permission_classes = [IsAuthenticated]
+    default_days = 30
+
+    def get(self, request):
+        query = PestHeatmapQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        end = query.validated_data.get("end") or timezone.localdate() + timedelta(days=1)
+        start = query.validated_data.get("start") or end - timedelta(days=self.default_days)
+        try:
+            result = outbreak_map(*query.validated_data["bbox"], start, end)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"start": start, "end": end, **result})
+
+
 class AWDreport(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        data = fetchEEData(request.user)
-        ndwi_data = data["ndwi_time_series"]
+        # Only the NDWI series is needed: sync new scenes, then read from storage
+        start, end = _window(request)
+        field_data = get_object_or_404(FieldData, user=request.user)
+        refresh_observations(field_data, start, end)
+        ndwi_data = stored_time_series(field_data, start, end)
 
         # awd.py
         report = detect_awd_from_ndwi(ndwi_series=ndwi_data)
@@ -124,9 +299,8 @@ class CarbonCredit(APIView):
         # awd.py
         # awd = detect_awd_from_ndwi(ndwi_series=ndwi_data)["awd_detected"]
 
-        polygon = get_polygon(user=request.user)
-        # utils.py
-        area = calculate_area_in_hectares(polygon['coordinates'][0])
+        # utils.py, stored at SavePolygon time
+        area = field_area(get_object_or_404(FieldData, user=request.user))
 
         # cc.py
         result = calculate_carbon_metrics(area_hectare=area, ndwi_based_awd=True)
@@ -137,7 +311,8 @@ class PestPrediction(APIView):
 
     def get(self, request):
         # lstm.py
-        data = fetchEEData(request.user)
+        from models.lstm import predict_risk_from_values
+        data = fetchEEData(request.user, *_window(request))
         result = predict_risk_from_values(data)
         return Response(result)
     
@@ -145,8 +320,134 @@ class HealthScore(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        data = fetchEEData(request.user)
+        data = fetchEEData(request.user, *_window(request))
 
         # health_score.py
-        result = get_health_score(image_path='../sample.jpg', ndvi_latest=data['ndwi_time_series'], sequence=data)
-        return Response(result)
\ No newline at end of file
+        from models.health_score import get_health_score
+        result = get_health_score(image_path='../sample.jpg', ndvi_latest=latest_ndvi(data), sequence=data)
+        return Response(result)
+
+
+# Sections of the /field/dashboard payload, selectable with ?parts=
+DASHBOARD_PARTS = ("ee", "awd", "cc", "risk", "health")
+
+
+def _timed(timings, stage, fn, *args, **kwargs):
+    started = time.perf_counter()
+    with span(f"dashboard.{stage}"):
+        result = fn(*args, **kwargs)
+    timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class Dashboard(APIView):
+    """
+    All field analytics from a single fetchEEData call, with per-stage
+    timings in milliseconds. ``?parts=awd,cc`` limits the payload; the
+    window params of the other field endpoints apply.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        requested = request.query_params.get("parts")
+        parts = (
+            [p.strip() for p in requested.split(",") if p.strip()]
+            if requested else list(DASHBOARD_PARTS)
+        )
+        unknown = sorted(set(parts) - set(DASHBOARD_PARTS))
+        if unknown:
+            return Response(
+                {"error": f"Unknown parts: {', '.join(unknown)}", "parts": DASHBOARD_PARTS},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        start, end = _window(request)
+        started = time.perf_counter()
+        timings = {}
+        payload = {}
+        field_data = get_object_or_404(FieldData, user=request.user)
+        data = _timed(timings, "fetch", fetchEEData, request.user, start, end)
+
+        if "ee" in parts:
+            payload["ee"] = data
+
+        if "awd" in parts or "cc" in parts:
+            # awd.py
+            awd = _timed(timings, "awd", detect_awd_from_ndwi, ndwi_series=data["ndwi_time_series"])
+            if "awd" in parts:
+                payload["awd"] = awd
+
+        if "cc" in parts:
+            # utils.py, cc.py
+            area = _timed(timings, "area", field_area, field_data)
+            payload["cc"] = _timed(
+                timings, "cc", calculate_carbon_metrics,
+                area_hectare=area, ndwi_based_awd=awd["awd_detected"],
+            )
+
+        if "risk" in parts or "health" in parts:
+            # lstm.py
+            from models.lstm import predict_risk_from_values
+            risk = _timed(timings, "risk", predict_risk_from_values, data)
+            if "risk" in parts:
+                payload["risk"] = risk
+
+        if "health" in parts:
+            # cnn.py, health_score.py
+            from models.cnn import predict_health
+            cnn = _timed(timings, "cnn", predict_health, '../sample.jpg')
+            ndvi_latest = latest_ndvi(data)
+            payload["health"] = {
+                "health_score": _timed(
+                    timings, "health", compute_health_score,
+                    cnn["probability"], ndvi_latest, risk["risk_probability"],
+                )
+            }
+
+        timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+        payload["timings_ms"] = timings
+        return Response(payload)
+
+
+class BatchFieldIndices(APIView):
+    """
+    Indices for many fields in one Earth Engine call per 1000 fields.
+
+    Body: ``{"fields": [{"id": ..., "polygon": {...}}, ...]}`` and/or
+    ``{"field_ids": [...]}`` for stored fields (staff only), with optional
+    ``start``/``end`` or ``season``/``year`` (as FieldWindowQuerySerializer)
+    and ``time_series``. Ids must be unique.
+    """
+    permission_classes = [IsAuthenticated]
+    max_fields = 10000
+
+    def post(self, request):
+        body = BatchFieldIndicesSerializer(data=request.data)
+        if not body.is_valid():
+            return Response(body.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = body.validated_data
+
+        fields = [(entry["id"], entry["polygon"]) for entry in data["fields"]]
+        unknown = []
+        if data["field_ids"]:
+            if not request.user.is_staff:
+                return Response(
+                    {"error": "Only staff can query stored fields"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            stored = dict(FieldData.objects.filter(pk__in=data["field_ids"]).values_list("pk", "polygon"))
+            fields.extend(stored.items())
+            unknown = [field_id for field_id in data["field_ids"] if field_id not in stored]
+        if len(fields) > self.max_fields:
+            return Response(
+                {"error": f"At most {self.max_fields} fields per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = fetch_fields_indices(
+            fields, start_date=data["start"], end_date=data["end"], time_series=data["time_series"],
+        ) if fields else {}
+        return Response({
+            "fields": [{"id": field_id, **metrics} for field_id, metrics in results.items()],
+            "unknown_field_ids": unknown,
+        })
@@ -0,0 +1,223 @@
+"""
+Zonal statistics: in-field distributions rather than one mean per index.
+
+``zonal_stats`` returns mean, standard deviation, percentiles, a fixed
+histogram and the pixel count of every index over a field's median
+composite. Remotely that is a single reduceRegion with one combined
+reducer; with the raster store (rasters.py) it is computed locally from
+the field's pixels.
+
+``management_zones`` splits a field into a grid of square cells, averages
+the indices per cell and ranks cells into zones by quantile of one index,
+for variable-rate input maps. Remotely it is one reduceRegions over the
+cells; locally each pixel is binned into its cell.
+"""
+import math
+
+import ee
+import numpy as np
+import shapely
+
+from .spatial import polygon_geometry
+from .utils import TIME_SERIES_INDICES, _composite_index_image, _rasters, getinfo
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Histogram range and bins, shared by all indices (EVI can leave [-1, 1];
+# such pixels are counted but fall outside the histogram)
+HISTOGRAM_RANGE = (-1.0, 1.0)
+HISTOGRAM_BINS = 20
+
+METRES_PER_DEGREE = 111_320
+
+# Zone cells per request; a 10 m grid over a 25 ha field
+MAX_ZONE_CELLS = 2500
+
+
+def _stats_reducer():
+    low, high = HISTOGRAM_RANGE
+    return (
+        ee.Reducer.mean()
+        .combine(ee.Reducer.stdDev(), sharedInputs=True)
+        .combine(ee.Reducer.percentile(list(PERCENTILES)), sharedInputs=True)
+        .combine(ee.Reducer.fixedHistogram(low, high, HISTOGRAM_BINS), sharedInputs=True)
+        .combine(ee.Reducer.count(), sharedInputs=True)
+    )
+
+
+def _index_stats(mean, std, percentiles, counts, pixels):
+    low, high = HISTOGRAM_RANGE
+    return {
+        "mean": mean,
+        "std": std,
+        "percentiles": dict(zip(map(str, PERCENTILES), percentiles)),
+        "histogram": {"min": low, "max": high, "counts": counts},
+        "pixels": pixels,
+    }
+
+
+def _remote_stats(polygon, start_date, end_date):
+    aoi = ee.Geometry(polygon)
+    info = getinfo(
+        _composite_index_image(aoi, start_date, end_date).reduceRegion(
+            reducer=_stats_reducer(), geometry=aoi, scale=10, bestEffort=True,
+        )
+    ) or {}
+    stats = {}
+    for name in TIME_SERIES_INDICES:
+        histogram = info.get(f"{name}_histogram") or []
+        stats[name] = _index_stats(
+            info.get(f"{name}_mean"),
+            info.get(f"{name}_stdDev"),
+            [info.get(f"{name}_p{p}") for p in PERCENTILES],
+            [int(count) for _, count in histogram] or [0] * HISTOGRAM_BINS,
+            info.get(f"{name}_count") or 0,
+        )
+    return stats
+
+
+def _local_stats(composite):
+    stats = {}
+    for name, values in zip(TIME_SERIES_INDICES, composite):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            stats[name] = _index_stats(None, None, [None] * len(PERCENTILES), [0] * HISTOGRAM_BINS, 0)
+            continue
+        counts, _ = np.histogram(values, bins=HISTOGRAM_BINS, range=HISTOGRAM_RANGE)
+        stats[name] = _index_stats(
+            float(values.mean()),
+            float(values.std()),
+            # nearest-rank, as ee.Reducer.percentile
+            np.percentile(values, PERCENTILES, method="inverted_cdf").tolist(),
+            counts.tolist(),
+            int(len(values)),
+        )
+    return stats
+
+
+def zonal_stats(polygon, start_date, end_date):
+    """``{index: {mean, std, percentiles, histogram, pixels}}`` over the field."""
+    rasters = _rasters()
+    if rasters is None:
+        return _remote_stats(polygon, start_date, end_date)
+    composite = rasters.composite_pixels(polygon, start_date, end_date)
+    if composite is None:
+        return _local_stats(np.empty((len(TIME_SERIES_INDICES), 0)))
+    return _local_stats(composite)
+
+
+# --- Management zones ---
+
+class ZoneGrid:
+    """Square cells of ``cell_m`` metres over a field's bounding box, clipped to the field."""
+
+    def __init__(self, polygon, cell_m):
+        self.geometry = polygon_geometry(polygon)
+        self.min_lon, self.min_lat, max_lon, max_lat = self.geometry.bounds
+        mid_lat = math.radians((self.min_lat + max_lat) / 2)
+        self.dy = cell_m / METRES_PER_DEGREE
+        self.dx = cell_m / (METRES_PER_DEGREE * math.cos(mid_lat))
+        self.nx = max(1, math.ceil((max_lon - self.min_lon) / self.dx))
+        self.ny = max(1, math.ceil((max_lat - self.min_lat) / self.dy))
+        if self.nx * self.ny > MAX_ZONE_CELLS:
+            raise ValueError(
+                f"{cell_m} m cells would split this field into {self.nx * self.ny} cells "
+                f"(at most {MAX_ZONE_CELLS}); use larger cells"
+            )
+
+        i, j = np.meshgrid(np.arange(self.nx), np.arange(self.ny))
+        i, j = i.ravel(), j.ravel()
+        west, south = self.min_lon + i * self.dx, self.min_lat + j * self.dy
+        boxes = shapely.box(west, south, west + self.dx, south + self.dy)
+        clipped = shapely.intersection(boxes, self.geometry)
+        keep = shapely.area(clipped) > 0
+        self.ids = (j * self.nx + i)[keep]
+        self.cells = clipped[keep]
+
+    def cell_of(self, lons, lats):
+        i = np.clip(((lons - self.min_lon) / self.dx).astype(int), 0, self.nx - 1)
+        j = np.clip(((lats - self.min_lat) / self.dy).astype(int), 0, self.ny - 1)
+        return j * self.nx + i
+
+
+def _remote_cell_means(polygon, grid, start_date, end_date):
+    aoi = ee.Geometry(polygon)
+    cells = ee.FeatureCollection([
+        ee.Feature(ee.Geometry(shapely.geometry.mapping(cell)), {"cell": int(cell_id)})
+        for cell_id, cell in zip(grid.ids.tolist(), grid.cells)
+    ])
+    columns = ["cell", *TIME_SERIES_INDICES]
+    rows = getinfo(
+        _composite_index_image(aoi, start_date, end_date)
+        .reduceRegions(collection=cells, reducer=ee.Reducer.mean(), scale=10)
+        .reduceColumns(ee.Reducer.toList(len(columns)), columns)
+        .get("list")
+    ) or []
+    return {cell_id: dict(zip(TIME_SERIES_INDICES, values)) for cell_id, *values in rows}
+
+
+def _local_cell_means(rasters, polygon, grid, start_date, end_date):
+    composite = rasters.composite_pixels(polygon, start_date, end_date)
+    if composite is None:
+        return {}
+    lons, lats = rasters.get_raster_store().field_coords(polygon)
+    cell = grid.cell_of(lons, lats)
+    n = grid.nx * grid.ny
+    means = {}
+    for name, values in zip(TIME_SERIES_INDICES, composite):
+        valid = ~np.isnan(values)
+        totals = np.bincount(cell[valid], weights=values[valid], minlength=n)
+        counts = np.bincount(cell[valid], minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[name] = totals / counts
+    return {
+        int(cell_id): {name: means[name][cell_id] for name in TIME_SERIES_INDICES}
+        for cell_id in grid.ids
+        if not np.isnan(means[TIME_SERIES_INDICES[0]][cell_id])
+    }
+
+
+def _zone_classes(values, zones):
+    """Zone 1..``zones`` per value by quantile rank (1 = lowest); None stays None."""
+    known = np.array([v for v in values if v is not None], dtype=float)
+    if not len(known):
+        return [None] * len(values)
+    edges = np.quantile(known, np.linspace(0, 1, zones + 1)[1:-1])
+    return [None if v is None else int(np.searchsorted(edges, v, side="right")) + 1 for v in values]
+
+
+def management_zones(polygon, start_date, end_date, cell_m=30, index="NDVI", zones=3):
+    """
+    GeoJSON FeatureCollection of the field's grid cells with the mean of
+    every index and a ``zone`` ranking cells by ``index`` into ``zones`` classes.
+    """
+    if index not in TIME_SERIES_INDICES:
+        raise ValueError(f"Unknown index {index!r}; use one of {', '.join(TIME_SERIES_INDICES)}")
+    grid = ZoneGrid(polygon, cell_m)
+    rasters = _rasters()
+    if rasters is None:
+        cell_means = _remote_cell_means(polygon, grid, start_date, end_date)
+    else:
+        cell_means = _local_cell_means(rasters, polygon, grid, start_date, end_date)
+
+    values = [cell_means.get(int(cell_id), {}).get(index) for cell_id in grid.ids]
+    classes = _zone_classes(values, zones)
+    features = []
+    for cell_id, cell, zone in zip(grid.ids.tolist(), grid.cells, classes):
+        means = cell_means.get(cell_id, {})
+        features.append({
+            "type": "Feature",
+            "geometry": shapely.geometry.mapping(cell),
+            "properties": {
+                "cell": cell_id,
+                "zone": zone,
+                **{name: None if means.get(name) is None else float(means[name]) for name in TIME_SERIES_INDICES},
+            },
+        })
+    return {
+        "type": "FeatureCollection",
+        "cell_m": cell_m,
+        "index": index,
+        "zones": zones,
+        "features": features,
+    }
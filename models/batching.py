@@ -0,0 +1,67 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads and runs them through
+    ``batch_fn`` together. A batch is dispatched once it holds
+    ``max_batch_size`` items or the oldest item has waited ``max_latency_ms``
+    since it was submitted.
+
+    ``batch_fn`` takes a list of items and returns one result per item.
+    ``batch_sizes`` keeps the sizes of the last ``history`` batches.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_latency_ms=5.0, history=1024):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.batch_sizes = deque(maxlen=history)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue ``item``; the returned Future resolves to its result."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="microbatcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # The queue is FIFO, so the first item is the oldest
+        deadline = batch[0][2] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            futures = [future for _, future, _ in batch]
+            self.batch_sizes.append(len(batch))
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
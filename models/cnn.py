@@ -1,8 +1,25 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import torch
 import torch.nn as nn
 from torchvision import models, transforms
 from PIL import Image
 
+from models.batching import MicroBatcher
+from models.registry import registry
+
+# Stage timing when running inside the Django project (field/instrumentation.py)
+try:
+    from field.instrumentation import span
+except ImportError:
+    from contextlib import nullcontext as span
+
 def load_model(model_path="models\crop_health_model.pth", device="cpu"):
     model = models.mobilenet_v2(weights=None)
     model.classifier[1] = nn.Linear(model.last_channel, 1)
@@ -17,24 +34,169 @@ transform = transforms.Compose([
                          [0.229, 0.224, 0.225])
 ])
 
+# Fast path for uploads: JPEG draft-mode decode straight to ~224px, then
+# normalization into reused float buffers. Same maths as ``transform``.
+INPUT_SIZE = (224, 224)
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+_SCALE = 1.0 / (255.0 * _STD)
+_SHIFT = -_MEAN / _STD
+_buffers = threading.local()
+
+def _scratch():
+    """Per-thread (H, W, 3) float32 buffer for normalization."""
+    if not hasattr(_buffers, "hwc"):
+        _buffers.hwc = np.empty((*INPUT_SIZE[::-1], 3), dtype=np.float32)
+    return _buffers.hwc
+
+def preprocess(source, out=None):
+    """
+    Decode ``source`` (path, bytes or file-like) into a normalized (3, 224, 224)
+    tensor. JPEGs are decoded at a reduced DCT scale, so a 12MP photo never
+    materializes at full resolution. Writes into ``out`` when given.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        img.draft("RGB", INPUT_SIZE)
+        img = img.convert("RGB").resize(INPUT_SIZE, Image.BILINEAR)
+        pixels = np.asarray(img)
+
+    hwc = _scratch()
+    np.multiply(pixels, _SCALE, out=hwc, casting="unsafe")
+    hwc += _SHIFT
+    if out is None:
+        out = torch.empty(3, *INPUT_SIZE[::-1])
+    out.copy_(torch.from_numpy(hwc).permute(2, 0, 1))
+    return out
+
 DEVICE = "cpu"
-MODEL_PATH = "../models/crop_health_model.pth"
-model = load_model(MODEL_PATH, DEVICE)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crop_health_model.pth")
 
-# Inference function
-def predict_health(img_path, device=DEVICE):
-    img = Image.open(img_path).convert("RGB")
-    img = transform(img).unsqueeze(0).to(device)
+# Inference runtime: "eager" (default), "torchscript", "int8" or "onnx".
+# The exported variants are built by models/cnn_export.py.
+RUNTIME = os.environ.get("CNN_RUNTIME", "eager")
+EXPORT_PATHS = {
+    "torchscript": MODEL_PATH.replace(".pth", ".ts.pt"),
+    "int8": MODEL_PATH.replace(".pth", ".int8.pt"),
+    "onnx": MODEL_PATH.replace(".pth", ".onnx"),
+}
 
-    with torch.no_grad():
-        output = model(img)
-        prob = torch.sigmoid(output).item()
+# Loaded on first use through the registry (models/registry.py)
+def load_default_model():
+    if RUNTIME == "eager":
+        return load_model(MODEL_PATH, DEVICE)
+    from models.cnn_export import load_exported
+    return load_exported(RUNTIME, EXPORT_PATHS[RUNTIME])
 
+# Identifies the weights behind a prediction, for caching results by image hash.
+# Re-hashed whenever the active weights file is replaced.
+_version = {}
+
+def model_version():
+    path = MODEL_PATH if RUNTIME == "eager" else EXPORT_PATHS[RUNTIME]
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _version.get("key") != key:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _version.update(key=key, value=f"{RUNTIME}:{digest.hexdigest()[:16]}")
+    return _version["value"]
+
+def _health_result(prob):
     return {
         "probability": float(prob),
         "class": "Healthy" if prob > 0.5 else "Infested"
     }
 
+# Inference function; ``img_path`` may also be the upload's bytes or file object
+def predict_health(img_path, device=DEVICE):
+    if not hasattr(_buffers, "batch"):
+        _buffers.batch = torch.empty(1, 3, *INPUT_SIZE[::-1])
+    with span("cnn.preprocess"):
+        img = preprocess(img_path, out=_buffers.batch[0]).unsqueeze(0).to(device)
+
+    model = registry.get("cnn")
+    with span("cnn.inference"), torch.no_grad():
+        output = model(img)
+        prob = torch.sigmoid(output).item()
+
+    return _health_result(prob)
+
+# Batched inference: one forward pass for many preprocessed images
+def _predict_tensors(tensors, device=DEVICE):
+    batch = torch.stack(tensors).to(device)
+    model = registry.get("cnn")
+    with span("cnn.batch_inference"), torch.no_grad():
+        probs = torch.sigmoid(model(batch)).squeeze(1).tolist()
+    return [_health_result(p) for p in probs]
+
+# Concurrent callers share forward passes; tune with CNN_MAX_BATCH_SIZE / CNN_BATCH_LATENCY_MS
+health_batcher = MicroBatcher(
+    _predict_tensors,
+    max_batch_size=int(os.environ.get("CNN_MAX_BATCH_SIZE", 16)),
+    max_latency_ms=float(os.environ.get("CNN_BATCH_LATENCY_MS", 5)),
+)
+
+def predict_health_async(img_path):
+    """
+    Preprocess on the calling thread, then queue the image on the shared
+    micro-batcher. Returns a Future resolving to the predict_health result.
+    """
+    with span("cnn.preprocess"):
+        tensor = preprocess(img_path)
+    return health_batcher.submit(tensor)
+
+def predict_health_batched(img_path):
+    future = predict_health_async(img_path)
+    # queueing + the shared forward pass
+    with span("cnn.inference"):
+        return future.result()
+
+def benchmark(img_path, concurrency_levels=(1, 2, 4, 8, 16), requests=64):
+    """Print images/sec for per-image vs micro-batched inference at each concurrency."""
+    print(f"{'concurrency':>11} {'single':>10} {'batched':>10}  mean batch")
+    for concurrency in concurrency_levels:
+        rates = []
+        health_batcher.batch_sizes.clear()
+        for fn in (predict_health, predict_health_batched):
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                started = time.perf_counter()
+                list(pool.map(fn, [img_path] * requests))
+                rates.append(requests / (time.perf_counter() - started))
+        sizes = health_batcher.batch_sizes
+        print(f"{concurrency:>11} {rates[0]:>8.1f}/s {rates[1]:>8.1f}/s  {sum(sizes) / len(sizes):.1f}")
+
+def _reference_preprocess(data):
+    """The original pipeline: full decode, then the torchvision transform."""
+    return transform(Image.open(io.BytesIO(data)).convert("RGB"))
+
+def benchmark_decode(img_path, sizes=((1600, 1200), (4000, 3000), (6000, 4000)), repeats=10):
+    """Print ms/image for full-decode + transform vs preprocess() on upscaled JPEGs."""
+    base = Image.open(img_path).convert("RGB")
+    print(f"{'size':>11} {'MP':>5} {'full':>9} {'draft':>9} {'max|dx|':>8}")
+    for size in sizes:
+        buf = io.BytesIO()
+        base.resize(size, Image.BICUBIC).save(buf, format="JPEG", quality=90)
+        data = buf.getvalue()
+        timings = []
+        for fn in (_reference_preprocess, preprocess):
+            fn(data)
+            started = time.perf_counter()
+            for _ in range(repeats):
+                fn(data)
+            timings.append((time.perf_counter() - started) / repeats * 1000)
+        diff = float((_reference_preprocess(data) - preprocess(data)).abs().max())
+        print(f"{size[0]:>5}x{size[1]:<5} {size[0] * size[1] / 1e6:>5.1f} "
+              f"{timings[0]:>7.1f}ms {timings[1]:>7.1f}ms {diff:>8.3f}")
+
+# Benchmark (from backend/): PYTHONPATH=.. python -m models.cnn
+if __name__ == "__main__":
+    benchmark_decode("../sample.jpg")
+    benchmark("../sample.jpg")
+
 # # Testing
 # if __name__ == "__main__":
 #     device = "cuda" if torch.cuda.is_available() else "cpu"
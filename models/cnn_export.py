@@ -0,0 +1,264 @@
+"""
+Exported and quantized CPU runtimes for the crop-health CNN.
+
+    PYTHONPATH=.. python -m models.cnn_export [--fixtures DIR] [--calibration DIR]   # from backend/
+
+builds, next to the fp32 weights:
+  - crop_health_model.ts.pt    TorchScript (traced fp32)
+  - crop_health_model.int8.pt  TorchScript, static int8 (fused conv/bn/relu)
+  - crop_health_model.onnx     ONNX fp32 (served with onnxruntime, optional)
+
+Each export is checked against the fp32 eager model on the fixture images
+and only replaces the previous file when it is within PARITY_TOLERANCES;
+otherwise it is discarded and the command exits non-zero. int8 is
+calibrated on a separate image set (--calibration), never on the fixtures
+it is evaluated on. Pick the runtime with CNN_RUNTIME (see cnn.py).
+Dynamic quantization is not offered: it only covers Linear layers, which are
+a negligible share of MobileNetV2's compute.
+"""
+import argparse
+import glob
+import os
+import time
+
+import torch
+import torch.nn as nn
+from PIL import Image, ImageEnhance, ImageOps
+from torchvision.models.quantization import mobilenet_v2 as quantizable_mobilenet_v2
+
+from models.cnn import DEVICE, EXPORT_PATHS, MODEL_PATH, load_model, transform
+
+QUANT_ENGINE = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+
+# Largest infected-probability gap and smallest class agreement vs the fp32
+# eager model for an export to be installed
+PARITY_TOLERANCES = {
+    "torchscript": {"max_abs_diff": 1e-4, "class_agreement": 1.0},
+    "onnx": {"max_abs_diff": 1e-4, "class_agreement": 1.0},
+    "int8": {"max_abs_diff": 0.05, "class_agreement": 0.98},
+}
+
+
+class OnnxModel:
+    """onnxruntime session with the same tensor-in/tensor-out call as the torch models."""
+
+    def __init__(self, path):
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        output = self.session.run(None, {self.input_name: batch.cpu().numpy()})[0]
+        return torch.from_numpy(output)
+
+
+def load_exported(runtime, path):
+    """Load an exported runtime written by this module."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} not found; run 'python -m models.cnn_export' to build the {runtime} runtime"
+        )
+    if runtime == "onnx":
+        return OnnxModel(path)
+    if runtime == "int8":
+        torch.backends.quantized.engine = QUANT_ENGINE
+    model = torch.jit.load(path, map_location=DEVICE)
+    model.eval()
+    return model
+
+
+def _example_input(batch_size=1):
+    return torch.randn(batch_size, 3, 224, 224)
+
+
+def export_torchscript(model, path):
+    with torch.no_grad():
+        traced = torch.jit.trace(model, _example_input())
+    traced = torch.jit.freeze(traced)
+    traced.save(path)
+    return path
+
+
+def export_onnx(model, path):
+    torch.onnx.export(
+        model, _example_input(), path,
+        input_names=["image"], output_names=["logit"],
+        dynamic_axes={"image": {0: "batch"}, "logit": {0: "batch"}},
+        dynamo=False,
+    )
+    return path
+
+
+def export_int8(model_path, calibration, path):
+    """Post-training static quantization, calibrated on ``calibration`` tensors."""
+    torch.backends.quantized.engine = QUANT_ENGINE
+    qmodel = quantizable_mobilenet_v2(weights=None, quantize=False)
+    qmodel.classifier[1] = nn.Linear(qmodel.last_channel, 1)
+    qmodel.load_state_dict(torch.load(model_path, map_location="cpu"))
+    qmodel.eval()
+    qmodel.fuse_model(is_qat=False)
+    qmodel.qconfig = torch.ao.quantization.get_default_qconfig(QUANT_ENGINE)
+    torch.ao.quantization.prepare(qmodel, inplace=True)
+    with torch.no_grad():
+        for batch in calibration.split(8):
+            qmodel(batch)
+    torch.ao.quantization.convert(qmodel, inplace=True)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(qmodel, _example_input())
+    traced.save(path)
+    return path
+
+
+def _load_dir(directory):
+    paths = sorted(
+        p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(directory, f"*.{ext}"))
+    )
+    if not paths:
+        raise FileNotFoundError(f"No jpg/png images in {directory}")
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def _sample_image():
+    return Image.open(os.path.join(os.path.dirname(MODEL_PATH), "..", "sample.jpg")).convert("RGB")
+
+
+def load_fixtures(fixtures_dir=None):
+    """
+    Preprocessed fixture images as one (N, 3, 224, 224) tensor. Without a
+    directory, flips and top-left crops of the repo's sample.jpg are used.
+    """
+    if fixtures_dir:
+        images = _load_dir(fixtures_dir)
+    else:
+        base = _sample_image()
+        w, h = base.size
+        images = []
+        for scale in (1.0, 0.8, 0.6, 0.4):
+            crop = base.crop((0, 0, int(w * scale), int(h * scale)))
+            images += [crop, ImageOps.mirror(crop), ImageOps.flip(crop), crop.rotate(90, expand=True)]
+    return torch.stack([transform(img) for img in images])
+
+
+def load_calibration(calibration_dir=None):
+    """
+    int8 calibration images as one tensor. Without a directory, bottom-right
+    and centre crops of sample.jpg with brightness/contrast changes, none of
+    which are in the default fixtures. Pass a directory of real, held-out
+    leaf photos for a calibration that generalises.
+    """
+    if calibration_dir:
+        images = _load_dir(calibration_dir)
+    else:
+        base = _sample_image()
+        w, h = base.size
+        images = []
+        for scale in (0.9, 0.7, 0.5):
+            cw, ch = int(w * scale), int(h * scale)
+            for left, top in ((w - cw, h - ch), ((w - cw) // 2, (h - ch) // 2)):
+                crop = base.crop((left, top, left + cw, top + ch))
+                for factor in (0.7, 1.3):
+                    images += [
+                        ImageEnhance.Brightness(crop).enhance(factor),
+                        ImageEnhance.Contrast(crop).enhance(factor),
+                    ]
+    return torch.stack([transform(img) for img in images])
+
+
+def check_parity(reference, candidate, images):
+    """Max absolute probability gap and class agreement of ``candidate`` vs ``reference``."""
+    with torch.no_grad():
+        ref = torch.sigmoid(reference(images)).squeeze(1)
+        out = torch.sigmoid(candidate(images)).squeeze(1)
+    return {
+        "max_abs_diff": float((ref - out).abs().max()),
+        "class_agreement": float(((ref > 0.5) == (out > 0.5)).float().mean()),
+    }
+
+
+def parity_failures(runtime, parity):
+    """Human-readable reasons ``parity`` is outside PARITY_TOLERANCES[runtime]; empty when within."""
+    tolerance = PARITY_TOLERANCES[runtime]
+    failures = []
+    if parity["max_abs_diff"] > tolerance["max_abs_diff"]:
+        failures.append(f"max|dp| {parity['max_abs_diff']:.4f} > {tolerance['max_abs_diff']}")
+    if parity["class_agreement"] < tolerance["class_agreement"]:
+        failures.append(f"agreement {parity['class_agreement']:.2f} < {tolerance['class_agreement']}")
+    return failures
+
+
+def benchmark(model, images, batch_size=16, repeats=20):
+    """Median single-image latency (ms) and batched throughput (images/s)."""
+    with torch.no_grad():
+        single = images[:1]
+        model(single)
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            model(single)
+            latencies.append((time.perf_counter() - started) * 1000)
+        batch = images[:batch_size]
+        model(batch)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            model(batch)
+        throughput = repeats * len(batch) / (time.perf_counter() - started)
+    latencies.sort()
+    return {"latency_ms": latencies[len(latencies) // 2], "images_per_s": throughput}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", help="Directory of fixture images (default: sample.jpg variants)")
+    parser.add_argument("--calibration", help="Directory of int8 calibration images, disjoint "
+                                              "from the fixtures (default: other sample.jpg variants)")
+    parser.add_argument("--runtimes", nargs="+", default=list(EXPORT_PATHS), choices=list(EXPORT_PATHS))
+    args = parser.parse_args(argv)
+
+    reference = load_model(MODEL_PATH, DEVICE)
+    images = load_fixtures(args.fixtures)
+
+    print(f"{'runtime':<12} {'max|dp|':>8} {'agree':>6} {'lat ms':>8} {'img/s':>8}")
+    fp32 = benchmark(reference, images)
+    print(f"{'eager':<12} {0.0:>8.4f} {1.0:>6.2f} {fp32['latency_ms']:>8.2f} {fp32['images_per_s']:>8.1f}")
+
+    failed = []
+    for runtime in args.runtimes:
+        path = EXPORT_PATHS[runtime]
+        # Built beside the installed file, which is only replaced once parity holds
+        staged = path + ".new"
+        if runtime == "torchscript":
+            export_torchscript(reference, staged)
+        elif runtime == "int8":
+            export_int8(MODEL_PATH, load_calibration(args.calibration), staged)
+        elif runtime == "onnx":
+            export_onnx(reference, staged)
+
+        try:
+            candidate = load_exported(runtime, staged)
+        except ImportError as e:
+            os.remove(staged)
+            print(f"{runtime:<12} skipped, can't verify it ({e})")
+            continue
+        parity = check_parity(reference, candidate, images)
+        perf = benchmark(candidate, images)
+        print(
+            f"{runtime:<12} {parity['max_abs_diff']:>8.4f} {parity['class_agreement']:>6.2f} "
+            f"{perf['latency_ms']:>8.2f} {perf['images_per_s']:>8.1f}"
+        )
+
+        failures = parity_failures(runtime, parity)
+        if failures:
+            os.remove(staged)
+            failed.append(f"{runtime}: {', '.join(failures)}")
+            continue
+        os.replace(staged, path)
+        print(f"wrote {path} ({os.path.getsize(path) / 2**20:.1f} MiB)")
+
+    if failed:
+        raise SystemExit("Parity check failed, exports discarded:\n  " + "\n  ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,4 @@
 import numpy as np
-from models.cnn import predict_health
-from models.lstm import predict_risk_from_values
 
 #Fusion Function
 def compute_health_score(p_cnn_healthy, ndvi_raw, risk_prob, w1=0.4, w2=0.35, w3=0.25):
@@ -14,6 +12,10 @@ def get_health_score(image_path, ndvi_latest, sequence):
     """
     Returns final fused health score (0..1)
     """
+    # Imported here so compute_health_score stays free of torch
+    from models.cnn import predict_health
+    from models.lstm import predict_risk_from_values
+
     # CNN
     cnn_result = predict_health(image_path)
     p_cnn_healthy = cnn_result['probability']
@@ -1,8 +1,19 @@
+import os
+
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_sequence
 import joblib
 import numpy as np
 
+from models.registry import registry
+
+# Stage timing when running inside the Django project (field/instrumentation.py)
+try:
+    from field.instrumentation import span
+except ImportError:
+    from contextlib import nullcontext as span
+
 class RiskLSTM(nn.Module):
     def __init__(self, input_size=4, hidden_size=64, num_layers=2, dropout=0.1):
         super().__init__()
@@ -15,10 +26,15 @@ class RiskLSTM(nn.Module):
         out = out[:, -1, :] 
         out = self.fc(out)
         return self.act(out)
+    def forward_packed(self, packed):
+        # h_n[-1] is the top layer's output at each sequence's last real step
+        _, (h_n, _) = self.lstm(packed)
+        return self.act(self.fc(h_n[-1]))
 
 DEVICE = "cpu"
-MODEL_PATH = "../models/risk_lstm_final.pth"
-SCALER_PATH = "../models/risk_scaler.save"
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(MODELS_DIR, "risk_lstm_final.pth")
+SCALER_PATH = os.path.join(MODELS_DIR, "risk_scaler.save")
 
 def load_risk_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH, device=DEVICE):
     model = RiskLSTM(input_size=4, hidden_size=64, num_layers=2).to(device)
@@ -28,15 +44,12 @@ def load_risk_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH, device=DEVIC
     scaler = joblib.load(scaler_path)
     return model, scaler
 
-risk_model, risk_scaler = load_risk_model(MODEL_PATH, SCALER_PATH, DEVICE)
+# Loaded on first use through the registry (models/registry.py)
+def load_default_model():
+    return load_risk_model(MODEL_PATH, SCALER_PATH, DEVICE)
 
-# Inference function
-def predict_risk_from_values(sequence, device=DEVICE):
-    """
-    sequence: 
-      - Case 1: list of [ndvi, rainfall, temp, humidity]
-      - Case 2: backend JSON dict (with ndvi_time_series, etc.)
-    """
+def _sequence_array(sequence):
+    """[ndvi, rainfall, temp, humidity] rows for either predict_risk_from_values input."""
     if isinstance(sequence, dict):
         payload = sequence
         ndvi_series = payload.get("ndvi_time_series", [])
@@ -54,16 +67,56 @@ def predict_risk_from_values(sequence, device=DEVICE):
     else:
         seq_array = sequence
 
-    seq_array = np.array(seq_array).astype(np.float32)
+    return np.array(seq_array).astype(np.float32)
+
+def _risk_result(prob):
+    return {
+        "risk_probability": prob,
+        "risk_level": "High" if prob > 0.5 else "Low"
+    }
+
+# Inference function
+def predict_risk_from_values(sequence, device=DEVICE):
+    """
+    sequence: 
+      - Case 1: list of [ndvi, rainfall, temp, humidity]
+      - Case 2: backend JSON dict (with ndvi_time_series, etc.)
+    """
+    risk_model, risk_scaler = registry.get("risk_lstm")
+    seq_array = _sequence_array(sequence)
     seq_scaled = risk_scaler.transform(seq_array)
 
     input_tensor = torch.tensor(seq_scaled).unsqueeze(0).to(device)  # (1, seq_len, features)
 
-    with torch.no_grad():
+    with span("lstm.inference"), torch.no_grad():
         prob = float(risk_model(input_tensor).cpu().item())
 
-    return {
-        "risk_probability": prob,
-        "risk_level": "High" if prob > 0.5 else "Low"
-    }
+    return _risk_result(prob)
+
+# Batch inference for many fields (e.g. nightly scoring)
+def predict_risk_batch(sequences, device=DEVICE):
+    """
+    Risk for many variable-length sequences (same inputs as
+    predict_risk_from_values) in one scaler call and one packed LSTM pass.
+    Empty sequences get None values.
+    """
+    arrays = [_sequence_array(seq).reshape(-1, 4) for seq in sequences]
+    results = [{"risk_probability": None, "risk_level": None} for _ in arrays]
+    keep = [i for i, arr in enumerate(arrays) if len(arr)]
+    if not keep:
+        return results
+
+    risk_model, risk_scaler = registry.get("risk_lstm")
+    lengths = [len(arrays[i]) for i in keep]
+    scaled = risk_scaler.transform(np.concatenate([arrays[i] for i in keep])).astype(np.float32)
+    chunks = np.split(scaled, np.cumsum(lengths)[:-1])
+
+    padded = pad_sequence([torch.from_numpy(c) for c in chunks], batch_first=True).to(device)
+    packed = pack_padded_sequence(padded, lengths, batch_first=True, enforce_sorted=False)
+
+    with span("lstm.batch_inference"), torch.no_grad():
+        probs = risk_model.forward_packed(packed).squeeze(1).cpu().tolist()
 
+    for i, prob in zip(keep, probs):
+        results[i] = _risk_result(float(prob))
+    return results
@@ -0,0 +1,95 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None if it can't be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide, lazily loaded models. Loaders are registered as
+    ``"module:function"`` strings so neither torch nor the weights are
+    imported until a model is first requested. Loading is thread-safe and
+    happens once per process; warm up before forking workers to share the
+    weights copy-on-write.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._load_locks[name] = threading.Lock()
+
+    def names(self):
+        return list(self._loaders)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        """The loaded model for ``name``, loading it on first use."""
+        try:
+            return self._models[name]
+        except KeyError:
+            pass
+        with self._load_locks[name]:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+        return self._models[name]
+
+    def _load(self, name):
+        module_name, func_name = self._loaders[name].split(":")
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        loaded = getattr(importlib.import_module(module_name), func_name)()
+        load_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        self._stats[name] = {"load_seconds": round(load_seconds, 3), "rss_delta_bytes": rss_delta}
+        logger.info("Loaded model %s in %.2fs (rss +%s bytes)", name, load_seconds, rss_delta)
+        return loaded
+
+    def warm_up(self, names=None):
+        """Load ``names`` (default: all registered models) now."""
+        for name in names or self.names():
+            self.get(name)
+
+    def stats(self):
+        """Load time and resident-memory growth for every registered model."""
+        return {
+            name: {"loaded": self.is_loaded(name), **self._stats.get(name, {})}
+            for name in self.names()
+        }
+
+    def unload(self, name):
+        with self._load_locks[name]:
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+
+registry = ModelRegistry()
+registry.register("cnn", "models.cnn:load_default_model")
+registry.register("risk_lstm", "models.lstm:load_default_model")